@@ -0,0 +1,263 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from sqlalchemy.engine import make_url
+
+from PollApp.database import SQLALCHEMY_DATABASE_URL, get_async_session
+from PollApp.leaderboard import read_leaderboard
+
+# at most one push per competition every LEADERBOARD_PUSH_INTERVAL seconds, however many ballots land
+LEADERBOARD_PUSH_INTERVAL = float(os.getenv("LEADERBOARD_PUSH_INTERVAL", "0.5"))
+# "local" fans out inside this worker; "postgres" relays changes to every worker through LISTEN/NOTIFY
+LEADERBOARD_PUBSUB = os.getenv("LEADERBOARD_PUBSUB", "local")
+# a subscriber this many pushes behind is dropped; it gets a fresh snapshot when it reconnects
+LEADERBOARD_SUBSCRIBER_BACKLOG = int(os.getenv("LEADERBOARD_SUBSCRIBER_BACKLOG", "32"))
+
+logger = logging.getLogger(__name__)
+
+_session_scope = asynccontextmanager(get_async_session)
+
+
+class LocalPubSub:
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    async def start(self):
+        pass
+
+    async def publish(self, competition_id: int, scored_ids):
+        self.deliver(competition_id, scored_ids)
+
+    async def close(self):
+        pass
+
+
+class PostgresPubSub:
+    """Relays changes between workers over one dedicated asyncpg connection per worker."""
+
+    CHANNEL = "leaderboard"
+    # NOTIFY payloads are capped at 8000 bytes; larger changes are sent as "everything changed"
+    MAX_PAYLOAD = 7900
+
+    def __init__(self, deliver, url: str):
+        self.deliver = deliver
+        parsed = make_url(url).set(drivername="postgresql").difference_update_query(["options"])
+        self.dsn = parsed.render_as_string(hide_password=False)
+        self._connection = None
+        self._lock = asyncio.Lock()
+
+    async def _connected(self):
+        if self._connection is not None and not self._connection.is_closed():
+            return self._connection
+
+        import asyncpg
+
+        reconnecting = self._connection is not None
+        self._connection = await asyncpg.connect(self.dsn)
+        await self._connection.add_listener(self.CHANNEL, self._on_notify)
+        self._connection.add_termination_listener(self._on_terminate)
+        if reconnecting:
+            # notifications sent while we were away are gone; resend every watched leaderboard
+            self.deliver(None, None)
+        return self._connection
+
+    async def start(self):
+        async with self._lock:
+            await self._connected()
+
+    async def publish(self, competition_id: int, scored_ids):
+        payload = json.dumps({"c": competition_id, "s": sorted(scored_ids)})
+        if len(payload) > self.MAX_PAYLOAD:
+            payload = json.dumps({"c": competition_id, "s": None})
+        async with self._lock:
+            connection = await self._connected()
+            await connection.execute("SELECT pg_notify($1, $2)", self.CHANNEL, payload)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        message = json.loads(payload)
+        self.deliver(message["c"], message["s"])
+
+    def _on_terminate(self, connection):
+        asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while True:
+            try:
+                await self.start()
+                return
+            except Exception:
+                logger.warning("leaderboard LISTEN connection lost, retrying", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def close(self):
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+        self._connection = None
+
+
+class LeaderboardBroadcaster:
+    """Pushes leaderboard changes to every subscriber of a competition, coalesced per interval.
+
+    Writers only announce which participants changed; one flusher task per worker
+    reads their new totals once and hands the same encoded message to every
+    subscriber, so database load follows the write rate rather than the viewer count.
+    """
+
+    def __init__(self, interval: float, backlog: int, pubsub: str = "local"):
+        self.interval = interval
+        self.backlog = backlog
+        self.pubsub_name = pubsub
+        self.pubsub = None
+        self._subscribers: dict[int, set[asyncio.Queue]] = {}
+        self._joining: dict[int, set[asyncio.Queue]] = {}
+        # competition -> changed scored ids, or None when the whole leaderboard must be resent
+        self._dirty: dict[int, set[int] | None] = {}
+        self._loop = None
+        self._wake = None
+        self._task = None
+        self.flushes = 0
+        self.messages = 0
+        self.dropped = 0
+
+    async def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # a new event loop (tests, benchmarks) starts from a clean slate
+        self._loop = loop
+        self._subscribers, self._joining, self._dirty = {}, {}, {}
+        self._wake = asyncio.Event()
+        self._task = loop.create_task(self._run())
+        if self.pubsub_name == "postgres":
+            self.pubsub = PostgresPubSub(self._deliver, SQLALCHEMY_DATABASE_URL)
+        else:
+            self.pubsub = LocalPubSub(self._deliver)
+        await self.pubsub.start()
+
+    async def subscribe(self, competition_id: int) -> asyncio.Queue:
+        """Queue of encoded messages for ``competition_id``; a snapshot comes first, ``None`` means disconnect."""
+        await self._ensure_started()
+        queue = asyncio.Queue(self.backlog)
+        self._subscribers.setdefault(competition_id, set()).add(queue)
+        self._joining.setdefault(competition_id, set()).add(queue)
+        self._wake.set()
+        return queue
+
+    def unsubscribe(self, competition_id: int, queue: asyncio.Queue):
+        for registry in (self._subscribers, self._joining):
+            queues = registry.get(competition_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del registry[competition_id]
+
+    @asynccontextmanager
+    async def listen(self, competition_id: int):
+        queue = await self.subscribe(competition_id)
+        try:
+            yield queue
+        finally:
+            self.unsubscribe(competition_id, queue)
+
+    async def publish(self, competition_id: int, scored_ids):
+        """Announce that the totals of ``scored_ids`` changed; call after the transaction commits."""
+        try:
+            await self._ensure_started()
+            await self.pubsub.publish(competition_id, set(scored_ids))
+        except Exception:
+            # the ballot is already committed; viewers catch up on the next change or reconnect
+            logger.exception("could not publish leaderboard change for competition %s", competition_id)
+
+    def _deliver(self, competition_id, scored_ids):
+        targets = list(self._subscribers) if competition_id is None else [competition_id]
+        for target in targets:
+            if target not in self._subscribers:
+                continue  # nobody watches it in this worker
+            pending = self._dirty.get(target, set())
+            self._dirty[target] = None if scored_ids is None or pending is None else pending | set(scored_ids)
+        self._wake.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            started = loop.time()
+            try:
+                await self._flush()
+            except Exception:
+                logger.exception("leaderboard push failed")
+            # whatever arrives meanwhile is folded into the next push
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
+
+    async def _flush(self):
+        dirty, self._dirty = self._dirty, {}
+        joining, self._joining = self._joining, {}
+        competitions = [c for c in dict.fromkeys([*joining, *dirty]) if c in self._subscribers]
+        if not competitions:
+            return
+        self.flushes += 1
+
+        async with _session_scope() as session:
+            for competition_id in competitions:
+                changed = dirty.get(competition_id, set())
+                new = joining.get(competition_id, set())
+
+                if changed is None or new:
+                    entries = await read_leaderboard(session, competition_id)
+                    subscribers = self._subscribers.get(competition_id, set())
+                    self._send(competition_id, subscribers if changed is None else new & subscribers,
+                               self._encode("snapshot", competition_id, entries))
+                    if not changed:
+                        continue
+                    entries = [entry for entry in entries if entry["id"] in changed]
+                else:
+                    entries = await read_leaderboard(session, competition_id, changed)
+                    subscribers = self._subscribers.get(competition_id, set())
+
+                removed = sorted(changed - {entry["id"] for entry in entries})
+                self._send(competition_id, subscribers - new, self._encode("delta", competition_id, entries, removed))
+
+    @staticmethod
+    def _encode(kind: str, competition_id: int, entries: list[dict], removed: list[int] | None = None) -> str:
+        message = {"type": kind, "competition_id": competition_id, "entries": entries}
+        if removed is not None:
+            message["removed"] = removed
+        return json.dumps(message)
+
+    def _send(self, competition_id: int, queues, message: str):
+        for queue in list(queues):
+            try:
+                queue.put_nowait(message)
+                self.messages += 1
+            except asyncio.QueueFull:
+                # too far behind to catch up incrementally: cut it loose, it resyncs on reconnect
+                self.unsubscribe(competition_id, queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "pubsub": self.pubsub_name,
+            "interval": self.interval,
+            "competitions": len(self._subscribers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "flushes": self.flushes,
+            "messages": self.messages,
+            "dropped": self.dropped,
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self.pubsub is not None:
+            await self.pubsub.close()
+        self._loop = None
+
+
+broadcaster = LeaderboardBroadcaster(LEADERBOARD_PUSH_INTERVAL, LEADERBOARD_SUBSCRIBER_BACKLOG, LEADERBOARD_PUBSUB)
@@ -0,0 +1,114 @@
+"""Brotli or gzip for response bodies above a size threshold, as the client's Accept-Encoding allows.
+
+Plain ASGI like the other middleware. Only bodies sent in one piece are
+compressed; a response streamed in chunks (exports, server-sent events)
+passes through untouched, since holding it back to compress would defeat
+the streaming. Responses that already carry a Content-Encoding are left
+alone too: the response cache compresses each cached body once per encoding
+and sends that. Brotli needs the optional ``brotli`` package; without it
+only gzip is offered.
+"""
+import gzip
+import os
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+# smaller bodies go out as they are: below about a packet, compressing saves nothing worth the CPU
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# bodies this large are compressed in a worker thread rather than on the event loop
+THREADED_SIZE = 256 * 1024
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+UNCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# in order of preference
+OFFERED = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """The first of ``OFFERED`` the client accepts (``q`` above 0, by name or ``*``), or None."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        weight = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding.strip():
+            weights[coding.strip().lower()] = weight
+    for coding in OFFERED:
+        if weights.get(coding, weights.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def _compress(coding: str, body: bytes) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+async def compress(coding: str, body: bytes) -> bytes:
+    if len(body) >= THREADED_SIZE:
+        return await run_in_threadpool(_compress, coding, body)
+    return _compress(coding, body)
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _compressible(headers: Headers, body: bytes) -> bool:
+        content_type = headers.get("content-type", "")
+        return (
+            len(body) >= COMPRESSION_MINIMUM_SIZE
+            and "content-encoding" not in headers
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+            and not content_type.startswith(UNCOMPRESSIBLE_TYPES)
+        )
+
+    async def __call__(self, scope, receive, send):
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", "")) if scope["type"] == "http" else None
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # held back until the body shows whether this response gets compressed
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=list(start["headers"]))
+            if not message.get("more_body", False) and self._compressible(headers, body):
+                body = await compress(coding, body)
+                headers["Content-Encoding"] = coding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                start = {**start, "headers": headers.raw}
+                message = {**message, "body": body}
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
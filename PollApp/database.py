@@ -1,7 +1,18 @@
 from sqlmodel import create_engine, SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+from PollApp.instrumentation import instrument_engine
+from PollApp.metrics import Histogram
+
 load_dotenv()
 
 # sqlite_file_name = "pollsapp7.db"
@@ -13,17 +24,272 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={
-    "options": "-csearch_path=public"
-})
+# DATABASE_ASYNC=true serves the routers from a native async driver (asyncpg / aiosqlite).
+# Otherwise the sync engine is used and every query is pushed to the threadpool.
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Comma-separated read replicas of DATABASE_URL; read-only handlers are spread over them (PollApp/replicas.py).
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+ASYNC_DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("ASYNC_DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+
+# Pool sizing: workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay under the server's connection cap
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _connect_args(url: str) -> dict:
+    if _is_sqlite(url):
+        return {"check_same_thread": False}
+    return {"options": "-csearch_path=public"}
+
+
+def _execution_options(url: str) -> dict:
+    # SQLite has no schemas, so drop the "public" schema the models are declared in
+    if _is_sqlite(url):
+        return {"schema_translate_map": {"public": None}}
+    return {}
+
+
+def _to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    # asyncpg takes search_path through server_settings, not the libpq "options" parameter
+    parsed = parsed.set(drivername="postgresql+asyncpg").difference_update_query(["options"])
+    return parsed.render_as_string(hide_password=False)
+
+
+class _InstrumentedPoolMixin:
+    """Records how long each checkout waited for a connection, and how many timed out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_time = Histogram(POOL_WAIT_BUCKETS)
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_time.observe(time.perf_counter() - started)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_args(url: str, poolclass) -> dict:
+    # in-memory SQLite keeps its single-connection pool; everything else gets a sized queue pool
+    if _is_sqlite(url) and make_url(url).database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+if DATABASE_ASYNC:
+    ASYNC_DATABASE_URL = ASYNC_DATABASE_URL or _to_async_url(SQLALCHEMY_DATABASE_URL)
+    ASYNC_DATABASE_REPLICA_URLS = ASYNC_DATABASE_REPLICA_URLS or [_to_async_url(url) for url in DATABASE_REPLICA_URLS]
+
+# Engines are created on first use rather than at import, so a cold start does not load
+# the DB driver before it can answer; ``engine`` / ``async_engine`` still import as before.
+_engines: dict[str, object] = {}
+_engines_lock = threading.Lock()
+
+
+def _create_engine(url: str, use_async: bool):
+    if use_async:
+        engine = create_async_engine(
+            url,
+            connect_args={} if _is_sqlite(url) else {"server_settings": {"search_path": "public"}},
+            execution_options=_execution_options(url),
+            **_pool_args(url, InstrumentedAsyncQueuePool),
+        )
+        instrument_engine(engine.sync_engine)
+    else:
+        engine = create_engine(
+            url,
+            connect_args=_connect_args(url),
+            execution_options=_execution_options(url),
+            **_pool_args(url, InstrumentedQueuePool),
+        )
+        instrument_engine(engine)
+    return engine
+
+
+def _engine(name: str, url: str, use_async: bool):
+    engine = _engines.get(name)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(name)
+            if engine is None:
+                engine = _engines[name] = _create_engine(url, use_async)
+    return engine
+
+
+def get_engine():
+    return _engine("sync", SQLALCHEMY_DATABASE_URL, False)
+
+
+def get_async_engine():
+    """The async engine, or None unless DATABASE_ASYNC is on."""
+    if not DATABASE_ASYNC:
+        return None
+    return _engine("async", ASYNC_DATABASE_URL, True)
+
+
+def get_replica_engine(index: int):
+    """Engine for ``DATABASE_REPLICA_URLS[index]``; async when DATABASE_ASYNC is on, like the sessions it serves."""
+    if DATABASE_ASYNC:
+        return _engine(f"replica{index}", ASYNC_DATABASE_REPLICA_URLS[index], True)
+    return _engine(f"replica{index}", DATABASE_REPLICA_URLS[index], False)
+
+
+def created_engines() -> dict:
+    """Engines that exist so far, by name ("sync", "async", "replica0", ...), without creating any."""
+    return dict(_engines)
+
+
+async def dispose_engines():
+    for db_engine in list(_engines.values()):
+        if isinstance(db_engine, AsyncEngine):
+            await db_engine.dispose()
+        else:
+            db_engine.dispose()
+
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def pool_stats(db_engine) -> dict:
+    pool = db_engine.pool
+    stats = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "timeout": DB_POOL_TIMEOUT,
+        })
+    if isinstance(pool, _InstrumentedPoolMixin):
+        stats["timeouts"] = pool.timeouts
+        stats["wait_seconds"] = pool.wait_time.snapshot()
+    return stats
+
+
+def dialect_insert(session, model):
+    """``INSERT`` for the session's dialect, so callers get ``on_conflict_do_*`` on PostgreSQL and SQLite."""
+    if session.bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model)
 
 
 def create_db_and_tables():
-    from PollApp.models import User, Competitions, CompetitionParticipants, ParticipantScores, Polls
+    from PollApp.models import User, Competitions, CompetitionParticipants, ParticipantScores, Polls, \
+        ParticipantScoreTotals, IdempotencyKeys, CompetitionRankingSettings, CompetitionVersions, \
+        CompetitionBallots
 
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(get_engine())
 
 
 def get_session():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+    with Session(get_engine()) as session:
+        yield session
+
+
+class ThreadedSession:
+    """Awaitable facade over a sync ``Session``, mirroring the ``AsyncSession`` API.
+
+    Lets handlers be written once against ``await session.exec(...)`` while the
+    blocking DBAPI calls run in the threadpool instead of on the event loop.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    @property
+    def bind(self):
+        return self.sync_session.bind
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def exec(self, statement, **kwargs):
+        return await run_in_threadpool(self.sync_session.exec, statement, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def refresh(self, instance, **kwargs):
+        await run_in_threadpool(self.sync_session.refresh, instance, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def connection(self):
+        return await run_in_threadpool(self.sync_session.connection)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+def open_session(db_engine):
+    """``AsyncSession`` on an async engine, ``ThreadedSession`` on a sync one; the caller closes it."""
+    # same expire_on_commit in both modes, so they behave alike after a commit
+    if isinstance(db_engine, AsyncEngine):
+        return AsyncSession(db_engine, expire_on_commit=False)
+    return ThreadedSession(Session(db_engine, expire_on_commit=False))
+
+
+async def get_async_session():
+    session = open_session(get_async_engine() or get_engine())
+    try:
+        yield session
+    finally:
+        await session.close()
@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+import os
+from contextlib import aclosing
+
+from sqlalchemy import Float, cast, func
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.responses import StreamingResponse
+
+from PollApp.database import get_async_engine, get_engine
+from PollApp.models import ParticipantScores, ParticipantScoreTotals, User
+
+# rows fetched per round trip from the server-side cursor, and encoded per response chunk
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "json": "application/json",
+}
+
+
+def scores_statement(competition_id: int):
+    scorer = aliased(User)
+    scored = aliased(User)
+    return (
+        select(
+            ParticipantScores.id,
+            ParticipantScores.scorer_id,
+            scorer.username.label("scorer_username"),
+            ParticipantScores.scored_id,
+            scored.username.label("scored_username"),
+            ParticipantScores.score,
+            ParticipantScores.feedback,
+        )
+        .join(scorer, scorer.id == ParticipantScores.scorer_id)
+        .join(scored, scored.id == ParticipantScores.scored_id)
+        .where(ParticipantScores.competition_id == competition_id)
+        # grouped per participant in a stable order; the index only finds the competition's rows, and
+        # the planner sorts them (one in-memory sort, ~10 ms for 10k rows, small next to sending them)
+        .order_by(ParticipantScores.scored_id, ParticipantScores.id)
+    )
+
+
+def totals_statement(competition_id: int):
+    return (
+        select(
+            ParticipantScoreTotals.scored_id,
+            User.username,
+            ParticipantScoreTotals.total_score,
+            ParticipantScoreTotals.score_count,
+            (cast(ParticipantScoreTotals.total_score, Float)
+             / func.nullif(ParticipantScoreTotals.score_count, 0)).label("average_score"),
+        )
+        .join(User, User.id == ParticipantScoreTotals.scored_id)
+        .where(ParticipantScoreTotals.competition_id == competition_id)
+        .order_by(ParticipantScoreTotals.total_score.desc(), ParticipantScoreTotals.scored_id)
+    )
+
+
+def _sync_batches(statement):
+    with get_engine().connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(statement)
+        yield from result.partitions()
+
+
+async def _batches(statement):
+    """Rows of ``statement`` in batches, read through a server-side cursor on its own connection."""
+    async_engine = get_async_engine()
+    if async_engine is not None:
+        async with async_engine.connect() as connection:
+            result = await connection.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for rows in result.partitions():
+                yield rows
+        return
+
+    batches = _sync_batches(statement)
+    try:
+        async for rows in iterate_in_threadpool(batches):
+            yield rows
+    finally:
+        # reached through aclose() when a download is abandoned: the connection goes back now, not at collection
+        await run_in_threadpool(batches.close)
+
+
+def _encode_csv(columns, rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+async def stream_export(statement, fmt: str):
+    """Encode the rows of ``statement`` as ``ndjson``, ``csv`` or a ``json`` array, one chunk per batch."""
+    columns = [column.name for column in statement.selected_columns]
+    first = True
+
+    if fmt == "json":
+        yield "["
+
+    async with aclosing(_batches(statement)) as batches:
+        async for rows in batches:
+            if fmt == "csv":
+                yield _encode_csv(columns, rows, header=first)
+            elif fmt == "json":
+                yield ("" if first else ",") + ",".join(json.dumps(dict(zip(columns, row))) for row in rows)
+            else:
+                yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+            first = False
+
+    if fmt == "csv" and first:
+        yield _encode_csv(columns, [], header=True)
+    elif fmt == "json":
+        yield "]"
+
+
+class ExportResponse(StreamingResponse):
+    """Streams ``stream_export``; closes it as soon as the response ends, finished or not.
+
+    Starlette abandons the body iterator when the client disconnects, leaving the
+    export's connection and server-side cursor checked out until the generator
+    is collected.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
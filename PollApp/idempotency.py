@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import time
+
+import orjson
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, update
+from sqlmodel import select
+
+from PollApp.database import dialect_insert
+from PollApp.models import IdempotencyKeys
+
+# how long a stored response keeps answering retries of its Idempotency-Key
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+
+
+def request_hash(path: str, body) -> str:
+    """Fingerprint of what was asked for, so a key reused for a different request is refused."""
+    encoded = json.dumps([path, jsonable_encoder(body)], sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def _replay(stored: IdempotencyKeys, fingerprint: str) -> Response:
+    if stored.request_hash != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return Response(content=stored.response, status_code=stored.status_code, media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"})
+
+
+def _select(user_id: int, key: str):
+    return select(IdempotencyKeys).where(IdempotencyKeys.user_id == user_id, IdempotencyKeys.key == key)
+
+
+async def lookup(session, user_id: int, key: str, fingerprint: str) -> Response | None:
+    """The stored response for ``key`` if a request with it already completed, else ``None``.
+
+    A plain read, so call it first: a retry is answered without any validation
+    or write work.
+    """
+    stored = (await session.exec(_select(user_id, key))).first()
+    if stored is None or stored.created_at < time.time() - IDEMPOTENCY_KEY_TTL:
+        return None
+    return _replay(stored, fingerprint)
+
+
+async def claim(session, user_id: int, key: str, fingerprint: str) -> Response | None:
+    """Claim ``key`` for this request and return ``None``, or replay whoever claimed it first.
+
+    Call right before the request's writes. The claim is part of the caller's
+    transaction and :func:`save` fills in the response before it commits, so
+    the key and the rows it produced land together. A concurrent duplicate
+    blocks on the key until the first request commits (and then replays it) or
+    rolls back (and then runs).
+    """
+    cutoff = time.time() - IDEMPOTENCY_KEY_TTL
+    # this user's expired keys go on every first execution, so the table stays one window deep
+    await session.exec(delete(IdempotencyKeys).where(IdempotencyKeys.user_id == user_id,
+                                                      IdempotencyKeys.created_at < cutoff))
+    table = IdempotencyKeys.__table__
+    claimed = (await session.exec(
+        dialect_insert(session, table)
+        .values(user_id=user_id, key=key, request_hash=fingerprint, created_at=time.time())
+        .on_conflict_do_nothing(index_elements=["user_id", "key"])
+        .returning(table.c.key)
+    )).first()
+    if claimed is not None:
+        return None
+
+    stored = (await session.exec(_select(user_id, key).execution_options(populate_existing=True))).first()
+    if stored is None or stored.status_code is None:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+    return _replay(stored, fingerprint)
+
+
+async def save(session, user_id: int, key: str, status_code: int, payload):
+    """Store the response for a claimed key; call before the request's transaction commits."""
+    # encoded like the app's default ORJSONResponse, so a replay is byte-for-byte the first response
+    body = orjson.dumps(jsonable_encoder(payload), option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+    await session.exec(
+        update(IdempotencyKeys)
+        .where(IdempotencyKeys.user_id == user_id, IdempotencyKeys.key == key)
+        .values(status_code=status_code, response=body)
+    )
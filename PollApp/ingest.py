@@ -0,0 +1,395 @@
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+
+from sqlalchemy.exc import DataError, IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from PollApp.database import dialect_insert, get_async_session
+from PollApp.leaderboard import apply_ballot_deltas, apply_score_deltas, ballot_deltas, score_deltas
+from PollApp.models import ParticipantScores
+
+# score submissions answer 202 and their rows are written in batches behind the response
+SCORE_INGEST = os.getenv("SCORE_INGEST", "").lower() in ("1", "true", "yes")
+# a batch is written once it holds this many score rows...
+SCORE_INGEST_BATCH_SIZE = int(os.getenv("SCORE_INGEST_BATCH_SIZE", "2000"))
+# ...or once its oldest submission has waited this many seconds
+SCORE_INGEST_FLUSH_INTERVAL = float(os.getenv("SCORE_INGEST_FLUSH_INTERVAL", "0.05"))
+# every worker keeps an append-only spool here; a submission is on disk before its 202 goes out
+SCORE_INGEST_SPOOL_DIR = os.getenv("SCORE_INGEST_SPOOL_DIR", "score-spool")
+# off trades crash safety (the OS still has the data, a power cut may not) for fewer disk flushes
+SCORE_INGEST_FSYNC = os.getenv("SCORE_INGEST_FSYNC", "true").lower() in ("1", "true", "yes")
+# submission statuses kept per worker for GET /competitions/participant/score/submissions/{id}
+SCORE_INGEST_STATUS_SIZE = int(os.getenv("SCORE_INGEST_STATUS_SIZE", "100000"))
+
+logger = logging.getLogger(__name__)
+
+_session_scope = asynccontextmanager(get_async_session)
+
+ROW_FIELDS = ("scored_id", "score", "feedback")
+
+
+def submission_id_for(user_id: int, idempotency_key: str) -> str:
+    """Stable submission id for a keyed request, so a retry maps onto the submission it repeats."""
+    return hashlib.blake2b(f"{user_id}:{idempotency_key}".encode(), digest_size=16).hexdigest()
+
+
+class Spool:
+    """Append-only JSON-lines file of accepted submissions and of the ones already written.
+
+    Each worker holds an exclusive lock on its own file, so a spool nobody
+    holds belongs to a worker that died and can be replayed by another.
+    """
+
+    def __init__(self, directory: str, fsync: bool):
+        self.directory = directory
+        self.fsync = fsync
+        self.path = None
+        self._file = None
+
+    def open(self):
+        import fcntl
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"worker-{os.getpid()}-{uuid.uuid4().hex[:8]}.spool")
+        self._file = open(self.path, "ab")
+        fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def append(self, records: list[dict]):
+        self._file.write(b"".join(json.dumps(record, separators=(",", ":")).encode() + b"\n" for record in records))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def truncate(self):
+        # everything in it has been written to the database
+        self._file.truncate(0)
+        self._file.seek(0)
+
+    def recover(self) -> list[dict]:
+        """Adopt the unwritten submissions of every abandoned spool and delete those files."""
+        import fcntl
+
+        pending = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.spool"))):
+            if path == self.path:
+                continue
+            with open(path, "rb") as orphan:
+                try:
+                    fcntl.flock(orphan, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # a live worker's spool
+                submissions, done = {}, set()
+                for line in orphan:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from the crash; it was never acknowledged
+                    if record["op"] == "submit":
+                        submissions[record["id"]] = record
+                    else:
+                        done.update(record["ids"])
+                adopted = [record for submission_id, record in submissions.items() if submission_id not in done]
+                if adopted:
+                    # ours first, so a crash during recovery loses nothing either
+                    self.append(adopted)
+                    pending.extend(adopted)
+                os.unlink(path)
+        return pending
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ScoreIngestQueue:
+    """Write-behind queue for score submissions.
+
+    ``submit`` returns once the submission is in this worker's spool; one task
+    appends whatever arrived meanwhile with a single fsync. A second task writes
+    queued submissions in multi-row inserts of up to ``batch_size`` rows, one
+    transaction per batch, and marks them done in the spool, so a slow database
+    delays the writes but not the 202s. Inserts skip rows that already exist,
+    so replaying a spool after a crash is harmless.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, spool_dir: str, fsync: bool = True,
+                 status_size: int = 100000, enabled: bool = False):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_dir = spool_dir
+        self.fsync = fsync
+        self.status_size = status_size
+        self.spool = None
+        self._spooling: list[tuple[dict, asyncio.Future]] = []
+        self._queue: list[dict] = []
+        self._queued_rows = 0
+        self._flushing = False
+        self._statuses: OrderedDict[str, dict] = OrderedDict()
+        self._loop = None
+        self._wake = None
+        self._queued = None
+        self._spool_lock = None
+        self._tasks = []
+        self.accepted = 0
+        self.batches = 0
+        self.rows_written = 0
+        self.rows_skipped = 0
+        self.failed = 0
+        self.spool_writes = 0
+
+    async def start(self):
+        """Open this worker's spool and replay abandoned ones; runs on first use if not called at startup."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # a new event loop (tests, benchmarks) starts over; the old spool is recovered like a crashed one
+        if self.spool is not None:
+            self.spool.close()
+        self._loop = loop
+        self._spooling, self._queue, self._queued_rows, self._flushing = [], [], 0, False
+        self._wake, self._queued, self._spool_lock = asyncio.Event(), asyncio.Event(), asyncio.Lock()
+        self.spool = Spool(self.spool_dir, self.fsync)
+        await run_in_threadpool(self.spool.open)
+        recovered = await run_in_threadpool(self.spool.recover)
+        for record in recovered:
+            self._track(record, "queued")
+            self._enqueue(record)
+        if recovered:
+            logger.warning("replaying %d score submissions from abandoned spools", len(recovered))
+        self._tasks = [loop.create_task(self._run_spooler()), loop.create_task(self._run_flusher())]
+
+    async def submit(self, competition_id: int, scorer_id: int, rows: list[dict],
+                     submission_id: str | None = None) -> dict:
+        """Queue ``rows`` (participant_scores values) durably and return the submission's status."""
+        await self.start()
+        if submission_id is not None and submission_id in self._statuses:
+            return self._statuses[submission_id]  # a retry of something already accepted
+
+        record = {
+            "op": "submit",
+            "id": submission_id or uuid.uuid4().hex,
+            "competition_id": competition_id,
+            "scorer_id": scorer_id,
+            "accepted_at": time.time(),
+            "rows": [[row[field] for field in ROW_FIELDS] for row in rows],
+        }
+        status = self._track(record, "queued")
+        spooled = self._loop.create_future()
+        self._spooling.append((record, spooled))
+        self._wake.set()
+        await spooled
+        self.accepted += 1
+        return status
+
+    def status(self, submission_id: str) -> dict | None:
+        return self._statuses.get(submission_id)
+
+    def _track(self, record: dict, state: str) -> dict:
+        status = {
+            "submission_id": record["id"],
+            "competition_id": record["competition_id"],
+            "scorer_id": record["scorer_id"],
+            "status": state,
+            "rows": len(record["rows"]),
+        }
+        self._statuses[record["id"]] = status
+        while len(self._statuses) > self.status_size:
+            self._statuses.popitem(last=False)
+        return status
+
+    def _enqueue(self, record: dict):
+        self._queue.append(record)
+        self._queued_rows += len(record["rows"])
+        self._queued.set()
+
+    async def _run_spooler(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            try:
+                await self._spool_pending()
+            except Exception:
+                logger.exception("could not append to the score ingestion spool")
+
+    async def _run_flusher(self):
+        while True:
+            # checked here rather than after a flush, so a batch put back by a failed write is retried
+            if not self._queue:
+                self._queued.clear()
+                await self._queued.wait()
+            # a batch fills up or its oldest submission has waited long enough, whichever comes first
+            deadline = self._queue[0]["accepted_at"] + self.flush_interval
+            while self._queued_rows < self.batch_size and time.time() < deadline:
+                self._queued.clear()
+                try:
+                    await asyncio.wait_for(self._queued.wait(), max(0.0, deadline - time.time()))
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await self._flush()
+            except Exception:
+                logger.exception("score ingestion failed; retrying")
+                await asyncio.sleep(1)
+
+    async def _spool_pending(self):
+        async with self._spool_lock:
+            pending, self._spooling = self._spooling, []
+            if not pending:
+                return
+            try:
+                await run_in_threadpool(self.spool.append, [record for record, _ in pending])
+            except asyncio.CancelledError:
+                self._spooling[:0] = pending  # written on close; a duplicate line replays harmlessly
+                raise
+            except Exception as exc:
+                for record, spooled in pending:
+                    self._statuses.pop(record["id"], None)
+                    if not spooled.done():
+                        spooled.set_exception(exc)
+                raise
+            self.spool_writes += 1
+            for record, spooled in pending:
+                self._enqueue(record)
+                if not spooled.done():
+                    spooled.set_result(None)
+
+    async def _flush(self):
+        batch, size = [], 0
+        while self._queue and (not batch or size + len(self._queue[0]["rows"]) <= self.batch_size):
+            record = self._queue.pop(0)
+            batch.append(record)
+            size += len(record["rows"])
+        self._queued_rows -= size
+        self._flushing = True
+        try:
+            try:
+                written = await self._write(batch)
+            except (IntegrityError, DataError):
+                # a bad submission (say, its competition was deleted) must not hold up the rest
+                written = defaultdict(set)
+                for record in batch:
+                    try:
+                        for competition_id, scored_ids in (await self._write([record])).items():
+                            written[competition_id] |= scored_ids
+                    except (IntegrityError, DataError) as exc:
+                        logger.error("dropping score submission %s: %s", record["id"], exc.orig)
+                        self._statuses.get(record["id"], {}).update(status="failed")
+                        self.failed += 1
+        except BaseException:
+            # keep them for the retry (or for close); rows already written are skipped then
+            self._queue[:0] = batch
+            self._queued_rows += size
+            raise
+        finally:
+            self._flushing = False
+
+        async with self._spool_lock:
+            await run_in_threadpool(self.spool.append, [{"op": "done", "ids": [record["id"] for record in batch]}])
+            if not self._queue:
+                await run_in_threadpool(self.spool.truncate)
+        self.batches += 1
+
+        # imported here: the routers import this module
+        from PollApp.broadcast import broadcaster
+        from PollApp.response_cache import response_cache
+
+        for competition_id, scored_ids in written.items():
+            await response_cache.invalidate(competition_id)
+            await broadcaster.publish(competition_id, scored_ids)
+
+    async def _write(self, batch: list[dict]) -> dict[int, set[int]]:
+        """Insert one batch in one transaction; returns the scored ids written per competition."""
+        values = [
+            {"competition_id": record["competition_id"], "scorer_id": record["scorer_id"],
+             **dict(zip(ROW_FIELDS, row))}
+            for record in batch for row in record["rows"]
+        ]
+        table = ParticipantScores.__table__
+        if not values:
+            return {}
+        async with _session_scope() as session:
+            statement = (
+                dialect_insert(session, table)
+                .values(values)
+                .on_conflict_do_nothing(index_elements=["competition_id", "scorer_id", "scored_id"])
+                .returning(table.c.competition_id, table.c.scorer_id, table.c.scored_id, table.c.score)
+            )
+            inserted = (await session.exec(statement)).all()
+            by_competition = defaultdict(list)
+            for row in inserted:
+                by_competition[row.competition_id].append(row)
+            for competition_id, rows in sorted(by_competition.items()):
+                await apply_score_deltas(session, competition_id, score_deltas(rows))
+                await apply_ballot_deltas(session, competition_id, ballot_deltas(rows))
+            await session.commit()
+
+        stored = {(row.competition_id, row.scorer_id, row.scored_id) for row in inserted}
+        for record in batch:
+            created = sum(1 for row in record["rows"]
+                          if (record["competition_id"], record["scorer_id"], row[0]) in stored)
+            status = self._statuses.get(record["id"])
+            if status is not None and status["status"] == "queued":
+                status.update(status="stored", count=created, skipped=len(record["rows"]) - created)
+        self.rows_written += len(inserted)
+        self.rows_skipped += len(values) - len(inserted)
+        return {competition_id: {row.scored_id for row in rows} for competition_id, rows in by_competition.items()}
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "fsync": self.fsync,
+            "spool": self.spool.path if self.spool is not None else None,
+            "queued_submissions": len(self._queue) + len(self._spooling),
+            "queued_rows": self._queued_rows,
+            "accepted": self.accepted,
+            "batches": self.batches,
+            "rows_written": self.rows_written,
+            "rows_skipped": self.rows_skipped,
+            "failed": self.failed,
+            "spool_writes": self.spool_writes,
+        }
+
+    async def drain(self, timeout: float = 10.0):
+        """Wait until everything accepted so far is in the database, or ``timeout`` passes."""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        deadline = time.monotonic() + timeout
+        while (self._spooling or self._queue or self._flushing) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+
+    async def close(self):
+        if self._loop is asyncio.get_running_loop():
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            # whatever the tasks had in hand; anything still left is replayed by the next worker to start
+            deadline = time.monotonic() + 10
+            try:
+                await self._spool_pending()
+                while self._queue and time.monotonic() < deadline:
+                    await self._flush()
+            except Exception:
+                logger.exception("could not drain the score ingestion queue")
+        self._tasks = []
+        if self.spool is not None:
+            if not self._queue and not self._spooling and self.spool.path is not None:
+                os.unlink(self.spool.path)
+            self.spool.close()
+            self.spool = None
+        self._loop = None
+
+
+score_ingest = ScoreIngestQueue(SCORE_INGEST_BATCH_SIZE, SCORE_INGEST_FLUSH_INTERVAL, SCORE_INGEST_SPOOL_DIR,
+                                SCORE_INGEST_FSYNC, SCORE_INGEST_STATUS_SIZE, enabled=SCORE_INGEST)
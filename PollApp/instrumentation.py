@@ -0,0 +1,215 @@
+import logging
+import os
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from PollApp import startup
+from PollApp.metrics import Counter, Histogram, LabeledHistogram, render_histogram, render_samples, render_value
+
+# statements slower than this are logged with their route; 0 turns the slow-query log off
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+# warn when one request runs the same statement more than this many times; 0 turns the N+1 detector off
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "0"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+logger = logging.getLogger(__name__)
+
+ROUTE_LABELS = ("method", "route")
+
+request_duration = LabeledHistogram(LATENCY_BUCKETS)
+response_size = LabeledHistogram(SIZE_BUCKETS)
+request_queries = LabeledHistogram(QUERY_COUNT_BUCKETS)
+request_db_time = LabeledHistogram(LATENCY_BUCKETS)
+requests_total = Counter()
+query_duration = Histogram(QUERY_LATENCY_BUCKETS)
+slow_queries = 0
+n_plus_one_warnings = Counter()
+in_flight = 0
+
+
+class RequestStats:
+    __slots__ = ("path", "queries", "db_time", "statements")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = StatementCounter() if N_PLUS_ONE_THRESHOLD else None
+
+
+# mutated in place, so queries run in the threadpool (sync engine) still land on the request that issued them
+_current_request: ContextVar[RequestStats | None] = ContextVar("pollapp_request_stats", default=None)
+
+
+def _route_of(scope) -> str:
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+def instrument_engine(sync_engine):
+    """Time every statement on ``sync_engine`` (pass ``AsyncEngine.sync_engine`` for the async engine)."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._pollapp_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        global slow_queries
+        elapsed = time.perf_counter() - context._pollapp_started
+        query_duration.observe(elapsed)
+
+        stats = _current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            if stats.statements is not None:
+                stats.statements[statement] += 1
+
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            slow_queries += 1
+            logger.warning("slow query (%.1f ms) during %s: %s", elapsed * 1000,
+                           stats.path if stats is not None else "background task",
+                           " ".join(statement.split())[:1000])
+
+
+class MetricsMiddleware:
+    """Per-route latency, response size, SQL count and DB time for every HTTP request.
+
+    Plain ASGI rather than ``BaseHTTPMiddleware``, so streaming responses pass
+    straight through and the request's context reaches the endpoint.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global in_flight
+        stats = RequestStats(scope["path"])
+        token = _current_request.set(stats)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight -= 1
+            _current_request.reset(token)
+
+            labels = (scope["method"], _route_of(scope))
+            request_duration.observe(labels, elapsed)
+            response_size.observe(labels, size)
+            request_queries.observe(labels, stats.queries)
+            request_db_time.observe(labels, stats.db_time)
+            requests_total.inc((*labels, str(status)))
+            startup.answered()
+
+            if stats.statements:
+                for statement, count in stats.statements.items():
+                    if count > N_PLUS_ONE_THRESHOLD:
+                        n_plus_one_warnings.inc((labels[1],))
+                        logger.warning("possible N+1: %s %s ran the same statement %d times: %s",
+                                       labels[0], labels[1], count, " ".join(statement.split())[:300])
+
+
+def render_request_metrics() -> str:
+    return "\n".join([
+        render_histogram("http_request_duration_seconds", "Request latency by route.", request_duration, ROUTE_LABELS),
+        render_samples("http_requests_total", "Requests by route and status.", requests_total,
+                       (*ROUTE_LABELS, "status")),
+        render_value("http_requests_in_flight", "Requests currently being served.", in_flight),
+        render_histogram("http_response_size_bytes", "Response body size by route.", response_size, ROUTE_LABELS),
+        render_histogram("http_request_db_queries", "SQL statements issued per request.", request_queries,
+                         ROUTE_LABELS),
+        render_histogram("http_request_db_seconds", "Time spent in SQL per request.", request_db_time, ROUTE_LABELS),
+        render_histogram("db_query_duration_seconds", "Latency of individual SQL statements.", query_duration),
+        render_value("db_slow_queries_total", f"Statements slower than {SLOW_QUERY_MS:g} ms.", slow_queries, "counter"),
+        render_samples("db_n_plus_one_warnings_total", "Requests that repeated one statement too often.",
+                       n_plus_one_warnings, ("route",)),
+    ])
+
+
+def render_metrics() -> str:
+    """Everything ``/metrics`` serves: request metrics plus pool, cache and push-channel state."""
+    from PollApp.broadcast import broadcaster
+    from PollApp.database import created_engines, pool_stats
+    from PollApp.ingest import score_ingest
+    from PollApp.rate_limit import rate_limiter
+    from PollApp.replicas import replicas
+    from PollApp.response_cache import response_cache
+    from PollApp.token_cache import token_cache
+
+    # only engines that exist: a scrape must not be what opens the first connection pool
+    engines = {name: getattr(db_engine, "sync_engine", db_engine) for name, db_engine in created_engines().items()}
+    pools = {name: (db_engine.pool, pool_stats(db_engine)) for name, db_engine in engines.items()}
+    waits = {(name,): pool.wait_time for name, (pool, _) in pools.items() if hasattr(pool, "wait_time")}
+
+    cache = response_cache.stats()
+    tokens = token_cache.stats()
+    live = broadcaster.stats()
+    ingest = score_ingest.stats()
+    reads = replicas.stats()
+    limits = rate_limiter.stats()
+
+    return "\n".join([
+        render_request_metrics(),
+        render_samples("db_pool_checked_out", "Connections currently checked out.",
+                       {(name,): stats.get("checked_out", 0) for name, (_, stats) in pools.items()},
+                       ("engine",), "gauge"),
+        render_samples("db_pool_overflow", "Connections open beyond pool_size.",
+                       {(name,): max(0, stats.get("overflow", 0)) for name, (_, stats) in pools.items()},
+                       ("engine",), "gauge"),
+        render_samples("db_pool_timeouts_total", "Checkouts that gave up waiting for a connection.",
+                       {(name,): stats.get("timeouts", 0) for name, (_, stats) in pools.items()}, ("engine",)),
+        render_histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection.", waits, ("engine",)),
+        render_samples("response_cache_lookups_total", "Response cache lookups by result.",
+                       {("hit",): cache["hits"], ("miss",): cache["misses"]}, ("result",)),
+        render_value("response_cache_not_modified_total", "Responses answered with 304.",
+                     cache["not_modified"], "counter"),
+        render_value("response_cache_invalidations_total", "Competition invalidations.",
+                     cache["invalidations"], "counter"),
+        render_value("response_cache_entries", "Cached responses held by this worker.", cache.get("entries", 0)),
+        render_value("response_cache_bytes", "Bytes of cached response bodies held by this worker.",
+                     cache.get("bytes", 0)),
+        render_samples("token_cache_lookups_total", "Verified-token cache lookups by result.",
+                       {("hit",): tokens["hits"], ("miss",): tokens["misses"]}, ("result",)),
+        render_value("leaderboard_subscribers", "Open live leaderboard connections.", live["subscribers"]),
+        render_value("leaderboard_pushes_total", "Coalesced leaderboard pushes.", live["flushes"], "counter"),
+        render_value("leaderboard_messages_total", "Messages queued to subscribers.", live["messages"], "counter"),
+        render_value("score_ingest_queued_rows", "Accepted score rows not yet written.", ingest["queued_rows"]),
+        render_value("score_ingest_batches_total", "Batched score inserts.", ingest["batches"], "counter"),
+        render_samples("score_ingest_rows_total", "Queued score rows by outcome.",
+                       {("written",): ingest["rows_written"], ("skipped",): ingest["rows_skipped"]}, ("result",)),
+        render_samples("db_replica_reads_total", "Read sessions served by each replica.",
+                       {(str(index),): replica["reads"] for index, replica in enumerate(reads["replicas"])},
+                       ("replica",)),
+        render_samples("db_replica_failures_total", "Replica connections that failed.",
+                       {(str(index),): replica["failures"] for index, replica in enumerate(reads["replicas"])},
+                       ("replica",)),
+        render_samples("db_primary_reads_total", "Read sessions served by the primary, by reason.",
+                       {(reason,): count for reason, count in reads["primary_reads"].items()}, ("reason",)),
+        render_samples("rate_limit_rejections_total", "Requests answered 429, by policy.",
+                       {(name,): count for name, count in limits["limited"].items()}, ("policy",)),
+    ]) + "\n"
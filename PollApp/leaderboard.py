@@ -0,0 +1,174 @@
+import time
+from collections import Counter, defaultdict
+
+from sqlalchemy import delete, insert, func, null, update
+from sqlmodel import select
+
+from PollApp.database import dialect_insert
+from PollApp.models import CompetitionBallots, CompetitionRankingSettings, ParticipantScores, \
+    ParticipantScoreTotals, User
+
+
+async def apply_score_deltas(session, competition_id: int, deltas: dict[int, tuple[int, int]]):
+    """Add ``(score, count)`` deltas per scored user to the competition's running totals.
+
+    Runs in the caller's transaction, so the totals commit (or roll back) together
+    with the ``participant_scores`` rows that produced them.
+    """
+    if not deltas:
+        return
+
+    # rows are upserted in scored_id order so concurrent ballots lock them in the same order
+    statement = dialect_insert(session, ParticipantScoreTotals.__table__).values([
+        {"competition_id": competition_id, "scored_id": scored_id, "total_score": total, "score_count": count}
+        for scored_id, (total, count) in sorted(deltas.items())
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=["competition_id", "scored_id"],
+        set_={
+            "total_score": statement.table.c.total_score + statement.excluded.total_score,
+            "score_count": statement.table.c.score_count + statement.excluded.score_count,
+        },
+    )
+    await session.exec(statement)
+
+    if any(count < 0 for _, count in deltas.values()):
+        await session.exec(
+            delete(ParticipantScoreTotals).where(
+                ParticipantScoreTotals.competition_id == competition_id,
+                ParticipantScoreTotals.score_count <= 0,
+            )
+        )
+
+
+async def apply_ballot_deltas(session, competition_id: int, deltas: dict[int, int]):
+    """Add scored-count deltas per judge to the competition's ballot status.
+
+    Like ``apply_score_deltas``, in the caller's transaction. A judge whose
+    count goes up is stamped with the current time; one left with no scores
+    loses their row.
+    """
+    added = {scorer_id: count for scorer_id, count in deltas.items() if count > 0}
+    removed = {scorer_id: count for scorer_id, count in deltas.items() if count < 0}
+
+    if added:
+        submitted_at = time.time()
+        statement = dialect_insert(session, CompetitionBallots.__table__).values([
+            {"competition_id": competition_id, "user_id": scorer_id, "scored_count": count,
+             "submitted_at": submitted_at}
+            for scorer_id, count in sorted(added.items())
+        ])
+        await session.exec(statement.on_conflict_do_update(
+            index_elements=["competition_id", "user_id"],
+            set_={
+                "scored_count": statement.table.c.scored_count + statement.excluded.scored_count,
+                "submitted_at": statement.excluded.submitted_at,
+            },
+        ))
+
+    for scorer_id, count in sorted(removed.items()):
+        await session.exec(
+            update(CompetitionBallots)
+            .where(CompetitionBallots.competition_id == competition_id, CompetitionBallots.user_id == scorer_id)
+            .values(scored_count=CompetitionBallots.scored_count + count)
+        )
+    if removed:
+        await session.exec(
+            delete(CompetitionBallots).where(
+                CompetitionBallots.competition_id == competition_id,
+                CompetitionBallots.scored_count <= 0,
+            )
+        )
+
+
+async def read_leaderboard(session, competition_id: int, scored_ids=None) -> list[dict]:
+    """Leaderboard entries from the maintained totals, best first; only ``scored_ids`` when given."""
+    statement = (
+        select(
+            ParticipantScoreTotals.scored_id,
+            User.username,
+            ParticipantScoreTotals.total_score,
+            ParticipantScoreTotals.score_count,
+        )
+        .join(User, User.id == ParticipantScoreTotals.scored_id)
+        .where(ParticipantScoreTotals.competition_id == competition_id)
+        .order_by(ParticipantScoreTotals.total_score.desc(), ParticipantScoreTotals.scored_id)
+    )
+    if scored_ids is not None:
+        statement = statement.where(ParticipantScoreTotals.scored_id.in_(sorted(scored_ids)))
+
+    return [
+        {
+            "id": scored_id,
+            "username": username,
+            "total_score": total_score,
+            "score_count": score_count,
+            "average_score": total_score / score_count if score_count else 0,
+        }
+        for scored_id, username, total_score, score_count in (await session.exec(statement)).all()
+    ]
+
+
+async def read_ranking_settings(session, competition_id: int) -> tuple[str, float]:
+    """``(method, trim)`` the competition is ranked by; by total score unless its creator chose otherwise."""
+    settings = await session.get(CompetitionRankingSettings, competition_id)
+    if settings is None:
+        return "total", CompetitionRankingSettings.model_fields["trim"].default
+    return settings.method, settings.trim
+
+
+def score_deltas(scores) -> dict[int, tuple[int, int]]:
+    """Fold ``ParticipantScores``-like rows into ``{scored_id: (total, count)}``."""
+    deltas: dict[int, list[int]] = defaultdict(lambda: [0, 0])
+    for score in scores:
+        deltas[score.scored_id][0] += score.score
+        deltas[score.scored_id][1] += 1
+    return {scored_id: (total, count) for scored_id, (total, count) in deltas.items()}
+
+
+def ballot_deltas(scores) -> dict[int, int]:
+    """Count ``ParticipantScores``-like rows per judge, as ``{scorer_id: count}``."""
+    return dict(Counter(score.scorer_id for score in scores))
+
+
+def rebuild_score_totals(connection, competition_id: int | None = None):
+    """Recompute the totals from ``participant_scores`` (backfills, repairs and benchmarks)."""
+    clear = delete(ParticipantScoreTotals)
+    source = (
+        select(
+            ParticipantScores.competition_id,
+            ParticipantScores.scored_id,
+            func.sum(ParticipantScores.score),
+            func.count(),
+        )
+        .group_by(ParticipantScores.competition_id, ParticipantScores.scored_id)
+    )
+    if competition_id is not None:
+        clear = clear.where(ParticipantScoreTotals.competition_id == competition_id)
+        source = source.where(ParticipantScores.competition_id == competition_id)
+
+    connection.execute(clear)
+    connection.execute(
+        insert(ParticipantScoreTotals).from_select(
+            ["competition_id", "scored_id", "total_score", "score_count"], source
+        )
+    )
+
+
+def rebuild_ballots(connection, competition_id: int | None = None):
+    """Recompute the ballot status from ``participant_scores``; submission times are not recorded there."""
+    clear = delete(CompetitionBallots)
+    source = (
+        select(ParticipantScores.competition_id, ParticipantScores.scorer_id, func.count(), null())
+        .group_by(ParticipantScores.competition_id, ParticipantScores.scorer_id)
+    )
+    if competition_id is not None:
+        clear = clear.where(CompetitionBallots.competition_id == competition_id)
+        source = source.where(ParticipantScores.competition_id == competition_id)
+
+    connection.execute(clear)
+    connection.execute(
+        insert(CompetitionBallots).from_select(
+            ["competition_id", "user_id", "scored_count", "submitted_at"], source
+        )
+    )
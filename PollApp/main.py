@@ -1,24 +1,54 @@
+# first, so the startup report covers every import below
+from PollApp import startup
+
+import logging
+import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from PollApp.database import create_db_and_tables
-from PollApp.routers import auth, polls, admin, user, competitions, competition_participants, participant_scores
-from PollApp.models import User, Competitions, CompetitionParticipants, ParticipantScores, Polls
+from PollApp.database import dispose_engines
+from PollApp.broadcast import broadcaster
+from PollApp.compression import CompressionMiddleware
+from PollApp.ingest import score_ingest
+from PollApp.instrumentation import MetricsMiddleware, render_metrics
+from PollApp.passwords import warm_up as warm_up_password_hashing
+from PollApp.replicas import StickyPrimaryMiddleware
+from PollApp.routers import auth, admin, user, competitions, competition_participants, participant_scores
+from PollApp.schema import SCHEMA_MODE, prepare_schema
+
+startup.mark("imports")
+
+# bearer token /metrics requires; unset serves it to anyone who can reach the app
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
-print("🔥 FastAPI app starting...")
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # runs ONCE at startup, after uvicorn starts
-    create_db_and_tables()
+    prepare_schema()
+    startup.mark(f"schema ({SCHEMA_MODE})")
+    if not METRICS_TOKEN:
+        logger.warning("METRICS_TOKEN is not set; /metrics (route latencies, SQL counts, pool and replica state) "
+                       "is served without authentication")
+    if score_ingest.enabled:
+        # writes what a crashed worker had accepted but not stored
+        await score_ingest.start()
+        startup.mark("score ingest")
+    startup.ready()
+    # in the background: the first login should not pay for passlib's backend detection
+    warm_up_password_hashing()
     yield
+    # before the broadcaster: the last batches still announce their changes
+    await score_ingest.close()
+    await broadcaster.close()
+    await dispose_engines()
 
-print("🔥 FastAPI app starting...2")
-
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 origins = [
     "http://localhost:3000",
@@ -32,11 +62,22 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(StickyPrimaryMiddleware)
+app.add_middleware(CompressionMiddleware)
+# added last so it wraps everything else, CORS included
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 def root():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics(authorization: str | None = Header(default=None)):
+    # Prometheus scrapes without cookies; METRICS_TOKEN, when set, is expected as a bearer token
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 app.include_router(auth.router)
 # app.include_router(polls.router)
 app.include_router(admin.router)
@@ -44,5 +85,4 @@ app.include_router(user.router)
 app.include_router(competitions.router)
 app.include_router(competition_participants.router)
 app.include_router(participant_scores.router)
-
-print("🔥 FastAPI app starting...3")
+startup.mark("app")
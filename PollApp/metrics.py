@@ -0,0 +1,111 @@
+import threading
+
+
+class Histogram:
+    """Cumulative bucketed histogram, Prometheus-style (``le`` upper bounds plus ``+Inf``)."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative = {}
+        running = 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+            running += count
+            cumulative[bound] = running
+
+        return {"buckets": cumulative, "count": running, "sum": total}
+
+
+class Counter:
+    """Monotonic counter per label set."""
+
+    def __init__(self):
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def items(self) -> list[tuple[tuple, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class LabeledHistogram:
+    """One ``Histogram`` per label set, all sharing the same buckets."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._histograms: dict[tuple, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        histogram = self._histograms.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(labels, Histogram(self.buckets))
+        histogram.observe(value)
+
+    def items(self) -> list[tuple[tuple, Histogram]]:
+        with self._lock:
+            return list(self._histograms.items())
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render_samples(name: str, help_text: str, samples, label_names: tuple = (), kind: str = "counter") -> str:
+    """Prometheus text for a ``Counter`` or any ``{label values: number}`` mapping."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in sorted(samples.items()):
+        lines.append(f"{name}{_label_text(label_names, labels)} {value}")
+    return "\n".join(lines)
+
+
+def render_value(name: str, help_text: str, value: float, kind: str = "gauge") -> str:
+    return f"# HELP {name} {help_text}\n# TYPE {name} {kind}\n{name} {value}"
+
+
+def render_histogram(name: str, help_text: str, histograms, label_names: tuple = ()) -> str:
+    """Prometheus text for a ``LabeledHistogram`` (or ``{labels: Histogram}``), or a bare ``Histogram``."""
+    if isinstance(histograms, Histogram):
+        histograms = [((), histograms)]
+    else:
+        histograms = sorted(histograms.items())
+
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in histograms:
+        snapshot = histogram.snapshot()
+        for bound, count in snapshot["buckets"].items():
+            bucket_labels = _label_text(label_names, labels, 'le="' + bound + '"')
+            lines.append(f"{name}_bucket{bucket_labels} {count}")
+        lines.append(f"{name}_sum{_label_text(label_names, labels)} {snapshot['sum']}")
+        lines.append(f"{name}_count{_label_text(label_names, labels)} {snapshot['count']}")
+    return "\n".join(lines)
@@ -1,5 +1,6 @@
-from typing import List
+from typing import List, Literal
 
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship
 
 
@@ -42,7 +43,10 @@ class CompetitionsRequest(SQLModel):
 
 class CompetitionParticipants(SQLModel, table=True):
     __tablename__ = "competition_participants"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        UniqueConstraint("competition_id", "user_id", name="uq_competition_participants_competition_user"),
+        {'schema': 'public'},
+    )
 
     id: int | None = Field(default=None, primary_key=True)
 
@@ -55,9 +59,20 @@ class CompetitionParticipants(SQLModel, table=True):
 class CompetitionParticipantsRequest(SQLModel):
     user_ids: List[int]
 
+class CompetitionParticipantsImportRequest(SQLModel):
+    user_ids: List[int] = []
+    usernames: List[str] = []
+
 class ParticipantScores(SQLModel, table=True):
     __tablename__ = "participant_scores"
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        # one score per judge and participant; its (competition_id, scorer_id) prefix serves "has polled"
+        UniqueConstraint("competition_id", "scorer_id", "scored_id", name="uq_participant_scores_competition_scorer_scored"),
+        Index("ix_participant_scores_competition_scored", "competition_id", "scored_id"),
+        # ids never reused after a delete (PostgreSQL's sequences never do), so the ranking engine's
+        # "rows above the newest id held" are always new rows
+        {'schema': 'public', 'sqlite_autoincrement': True},
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     competition_id: int = Field(foreign_key="public.competitions.id")
@@ -74,6 +89,62 @@ class ParticipantScores(SQLModel, table=True):
         sa_relationship_kwargs={"foreign_keys": "[ParticipantScores.scored_id]"}
     )
 
+class ParticipantScoreTotals(SQLModel, table=True):
+    __tablename__ = "participant_score_totals"
+    __table_args__ = {'schema': 'public'}
+
+    competition_id: int = Field(foreign_key="public.competitions.id", primary_key=True)
+    scored_id: int = Field(foreign_key="public.users.id", primary_key=True)
+    total_score: int = 0
+    score_count: int = 0
+
+class CompetitionBallots(SQLModel, table=True):
+    __tablename__ = "competition_ballots"
+    __table_args__ = {'schema': 'public'}
+
+    # one row per judge who has scored anyone in the competition, kept with the scores
+    competition_id: int = Field(foreign_key="public.competitions.id", primary_key=True)
+    user_id: int = Field(foreign_key="public.users.id", primary_key=True)
+    scored_count: int = 0
+    # time.time() of the judge's latest stored scores; null for ballots backfilled from before it was kept
+    submitted_at: float | None = None
+
+class CompetitionVersions(SQLModel, table=True):
+    __tablename__ = "competition_versions"
+    __table_args__ = {'schema': 'public'}
+
+    # bumped after every committed write to the competition's participants, scores or ranking
+    competition_id: int = Field(foreign_key="public.competitions.id", primary_key=True)
+    version: int = 0
+
+class IdempotencyKeys(SQLModel, table=True):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = {'schema': 'public'}
+
+    user_id: int = Field(foreign_key="public.users.id", primary_key=True)
+    key: str = Field(primary_key=True, max_length=255)
+    request_hash: str
+    created_at: float
+    # null while the request that claimed the key is still running
+    status_code: int | None = None
+    response: str | None = None
+
+RankingMethod = Literal["total", "mean", "median", "trimmed_mean", "zscore", "borda", "borda_average"]
+
+class CompetitionRankingSettings(SQLModel, table=True):
+    __tablename__ = "competition_ranking_settings"
+    __table_args__ = {'schema': 'public'}
+
+    # no row: ranked by total score
+    competition_id: int = Field(foreign_key="public.competitions.id", primary_key=True)
+    method: str = "total"
+    # share of each participant's highest and lowest scores dropped by trimmed_mean
+    trim: float = 0.1
+
+class CompetitionRankingRequest(SQLModel):
+    method: RankingMethod
+    trim: float = Field(default=0.1, ge=0, lt=0.5)
+
 class ScoreRequest(SQLModel):
     score: int
     feedback: str
@@ -93,21 +164,55 @@ class PollRequest(SQLModel):
     poll: int = Field(gt=0, le=1000)
 
 
+# Response models. Handlers on hot paths build plain dicts from row tuples and encode them with
+# orjson themselves, so these document the responses rather than validate them on every request.
+
 class ParticipantRead(SQLModel):
     id: int
-    name: str
+    user_id: int | None
+    username: str | None
 
 class CompetitionRead(SQLModel):
     id: int
     title: str
+    desc: str
     participants: List[ParticipantRead] = []
 
+class CompetitionDetail(SQLModel):
+    competitions: CompetitionRead
+
+class CompetitionProgress(SQLModel):
+    id: int
+    title: str
+    desc: str
+    creator_id: int
+    participant_count: int
+    scored_count: int
+    completion: float
+    submitted_at: float | None = None
+
+class MyCompetitions(SQLModel):
+    has_been_polled: List[CompetitionProgress]
+    not_yet_voted: List[CompetitionProgress]
+
 class ParticipantTotalScore(SQLModel):
-    scored_id: int
+    id: int
     username: str
     total_score: int
+    score_count: int
+    average_score: float
+    # only when ranked by a method other than the total
+    ranking_score: float | None = None
+    # only with include_feedback
+    scores: list[int] | None = None
+    feedbacks: list[str] | None = None
+
+class ParticipantFeedback(SQLModel):
+    id: int
     scores: list[int]
     feedbacks: list[str]
+    limit: int
+    offset: int
 
 class ScoreItem(SQLModel):
     participant_id: int
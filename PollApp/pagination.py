@@ -0,0 +1,76 @@
+import os
+from typing import Annotated
+
+from fastapi import HTTPException, Query, status
+from pydantic import create_model
+from sqlmodel import select
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+
+class PageParams:
+    """``limit`` / ``after`` / ``fields`` query parameters shared by the list endpoints.
+
+    ``after`` is the ``next_after`` of the previous page; ``fields`` is a comma
+    separated list of columns to return (``id`` is always included).
+    """
+
+    def __init__(
+        self,
+        limit: Annotated[int, Query(gt=0, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+        after: Annotated[int | None, Query(ge=0)] = None,
+        fields: Annotated[str | None, Query()] = None,
+    ):
+        self.limit = limit
+        self.after = after
+        self.fields = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+
+
+def _columns(model, requested: list[str] | None, exclude: tuple[str, ...]):
+    available = {column.name: column for column in model.__table__.columns if column.name not in exclude}
+    if requested is None:
+        return list(available.values())
+
+    unknown = sorted(set(requested) - set(available))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}",
+        )
+    names = ["id"] + [name for name in dict.fromkeys(requested) if name != "id"]
+    return [available[name] for name in names]
+
+
+def page_model(model, exclude: tuple[str, ...] = ()):
+    """Response model documenting a ``keyset_page`` of ``model``; fields are optional, as ``fields=`` may drop them."""
+    item = create_model(
+        f"{model.__name__}Item",
+        **{column.name: (model.model_fields[column.name].annotation | None, None)
+           for column in model.__table__.columns if column.name not in exclude},
+    )
+    return create_model(f"{model.__name__}Page", items=(list[item], ...), limit=(int, ...), next_after=(int | None, None))
+
+
+async def keyset_page(session, model, page: PageParams, *where, exclude: tuple[str, ...] = ()) -> dict:
+    """One page of ``model`` rows ordered by primary key, selecting only the requested columns.
+
+    Seeks past ``page.after`` instead of using ``OFFSET``, so every page costs
+    the same index range scan however deep the client has paged.
+    """
+    columns = _columns(model, page.fields, exclude)
+    statement = select(*columns).where(*where)
+    if page.after is not None:
+        statement = statement.where(model.id > page.after)
+    # one extra row tells whether another page exists without a COUNT(*)
+    statement = statement.order_by(model.id).limit(page.limit + 1)
+
+    rows = (await session.exec(statement)).all()
+    names = [column.name for column in columns]
+    items = [dict(zip(names, row)) for row in rows[:page.limit]]
+
+    return {
+        "items": items,
+        "limit": page.limit,
+        "next_after": items[-1]["id"] if len(rows) > page.limit else None,
+    }
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from PollApp.metrics import Histogram
+
+# bcrypt cost factor; hashes made with any other cost are transparently rehashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# how many hashes may run at once; further logins queue instead of starving the worker's CPU
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+
+HASH_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_queue_time = Histogram(HASH_BUCKETS)
+_hash_time = Histogram(HASH_BUCKETS)
+_in_flight = 0
+
+
+@lru_cache(maxsize=None)
+def crypt_context():
+    # passlib is imported, and its bcrypt backend detected, on first use rather than at boot
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=['bcrypt'],
+        deprecated='auto',
+        bcrypt__default_rounds=BCRYPT_ROUNDS,
+        bcrypt__min_rounds=BCRYPT_ROUNDS,
+        bcrypt__max_rounds=BCRYPT_ROUNDS,
+    )
+
+
+def warm_up():
+    """Load passlib and pick the bcrypt backend on the hashing pool, so the first login does not wait for it."""
+    return _executor.submit(lambda: crypt_context().handler("bcrypt").get_backend())
+
+
+async def _run(fn, *args):
+    # bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+    global _in_flight
+    submitted = time.perf_counter()
+
+    def job():
+        started = time.perf_counter()
+        _queue_time.observe(started - submitted)
+        try:
+            return fn(*args)
+        finally:
+            _hash_time.observe(time.perf_counter() - started)
+
+    _in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, job)
+    finally:
+        _in_flight -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(lambda: crypt_context().hash(password))
+
+
+async def verify_password(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Check ``password``; also returns a replacement hash when the stored one uses an outdated cost."""
+    return await _run(lambda: crypt_context().verify_and_update(password, hashed_password))
+
+
+def hashing_stats() -> dict:
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "rounds": BCRYPT_ROUNDS,
+        "in_flight": _in_flight,
+        "queue_seconds": _queue_time.snapshot(),
+        "hash_seconds": _hash_time.snapshot(),
+    }
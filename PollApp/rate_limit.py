@@ -0,0 +1,230 @@
+"""Token-bucket rate limits per route, keyed by the caller's user id or client IP.
+
+Each policy is a bucket of ``capacity`` tokens that refills evenly over
+``period`` seconds; a request takes a token, and one that finds the bucket
+empty is answered 429 with ``Retry-After`` set to when the next token is due.
+Applied as a route dependency, ``dependencies=[rate_limit("login")]``, so a
+throttled request is turned away before it opens a session or hashes a
+password.
+
+Per-IP policies key on the peer address. Behind a proxy or load balancer
+that is the proxy's, and every client shares one bucket, until
+``RATE_LIMIT_TRUSTED_PROXIES`` is set to the number of proxies that append to
+X-Forwarded-For; a worker that sees that header while it is 0 logs a warning.
+
+Buckets live in this worker unless ``RATE_LIMIT_URL`` points at Redis, where
+every worker draws from the same bucket. A shared store that cannot be reached
+lets requests through rather than taking logins down with it.
+"""
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Annotated, NamedTuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+# 0 turns every limit off
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") not in ("0", "false", "False")
+# proxies in front of the app that append to X-Forwarded-For; 0 trusts none and uses the peer address,
+# which behind a proxy puts every client in the proxy's login and register buckets
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+# redis://... shares buckets between workers; unset keeps them in this process
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL")
+# buckets kept per worker by the in-memory store, least recently used dropped first
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitPolicy(NamedTuple):
+    name: str
+    capacity: int
+    period: float
+    # "ip" or "user"
+    per: str
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+
+def _policy(name: str, per: str, default: str) -> RateLimitPolicy | None:
+    """``RATE_LIMIT_<NAME>`` as "<requests>/<seconds>"; "0" or empty turns the policy off."""
+    spec = os.getenv(f"RATE_LIMIT_{name.upper()}", default).strip()
+    if spec in ("", "0"):
+        return None
+    capacity, _, period = spec.partition("/")
+    return RateLimitPolicy(name, int(capacity), float(period or 1), per)
+
+
+POLICIES = {
+    # bcrypt per attempt: a credential-stuffing client is held to a few hashes a minute
+    "login": _policy("login", "ip", "10/60"),
+    "register": _policy("register", "ip", "5/300"),
+    # a request takes one token whatever it carries, so single scores and ballots get buckets of their own.
+    # A judge scoring one participant at a time spends a token per participant: the bucket holds a whole
+    # 300-member competition and refills at 5/s, faster than anyone scores by hand, while still capping a
+    # script hammering the insert path
+    "scores": _policy("scores", "user", "300/60"),
+    # a ballot covers every participant at once; a few dozen a minute leaves room for resubmitted corrections
+    "ballots": _policy("ballots", "user", "30/60"),
+}
+
+
+_warned_forwarded = False
+
+
+def client_ip(request: Request) -> str:
+    global _warned_forwarded
+
+    if RATE_LIMIT_TRUSTED_PROXIES:
+        forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        # each trusted proxy appended the address it was reached from; the outermost one saw the client
+        if len(forwarded) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return forwarded[-RATE_LIMIT_TRUSTED_PROXIES]
+    elif not _warned_forwarded and "x-forwarded-for" in request.headers:
+        # once per worker: the header comes with every request behind a proxy
+        _warned_forwarded = True
+        logger.warning(
+            "request from %s carries X-Forwarded-For but RATE_LIMIT_TRUSTED_PROXIES is 0; per-IP rate limits "
+            "treat every client behind that proxy as one, set it to the number of proxies in front of the app",
+            request.client.host if request.client is not None else "unknown",
+        )
+    return request.client.host if request.client is not None else "unknown"
+
+
+class InMemoryRateLimitStore:
+    shared = False
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # key -> [tokens, monotonic time they were counted at]
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    async def take(self, key: str, capacity: int, rate: float) -> float:
+        """Take a token from ``key``'s bucket; 0 if there was one, else seconds until there will be."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [capacity, now]
+            if len(self._buckets) > self.maxsize:
+                # only the longest idle buckets go, and most of those would have refilled anyway
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "keys": len(self._buckets), "max_keys": self.maxsize}
+
+
+# refill, take and store in one round trip, on Redis's clock so workers' clocks need not agree
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(bucket[1]) or capacity
+local at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitStore:
+    shared = True
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+            from redis.exceptions import RedisError
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_URL requires the 'redis' package")
+        self._redis = redis.from_url(url)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+        self._errors = RedisError
+        self.failures = 0
+
+    async def take(self, key: str, capacity: int, rate: float) -> float:
+        try:
+            return float(await self._take(keys=[f"rate-limit:{key}"], args=[capacity, rate]))
+        except self._errors:
+            self.failures += 1
+            logger.warning("rate limit store unavailable; letting %s through", key, exc_info=True)
+            return 0.0
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "failures": self.failures}
+
+
+class RateLimiter:
+    def __init__(self, store, enabled: bool = True):
+        self.store = store
+        self.enabled = enabled
+        self.allowed = 0
+        self.limited = {name: 0 for name in POLICIES}
+
+    async def check(self, policy: RateLimitPolicy | None, key: str):
+        if not self.enabled or policy is None:
+            return
+        wait = await self.store.take(f"{policy.name}:{key}", policy.capacity, policy.rate)
+        if not wait:
+            self.allowed += 1
+            return
+        self.limited[policy.name] = self.limited.get(policy.name, 0) + 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+
+    def stats(self) -> dict:
+        return {
+            **self.store.stats(),
+            "enabled": self.enabled,
+            "policies": {name: policy and policy._asdict() for name, policy in POLICIES.items()},
+            "allowed": self.allowed,
+            "limited": dict(self.limited),
+        }
+
+
+rate_limiter = RateLimiter(
+    RedisRateLimitStore(RATE_LIMIT_URL) if RATE_LIMIT_URL else InMemoryRateLimitStore(RATE_LIMIT_MAX_KEYS),
+    RATE_LIMIT_ENABLED,
+)
+
+
+def rate_limit(name: str):
+    """Route dependency enforcing ``POLICIES[name]`` for the caller's IP or user id."""
+    policy = POLICIES[name]
+
+    if policy is not None and policy.per == "user":
+        # imported here: the auth router itself is limited by IP and imports this module
+        from PollApp.routers.auth import get_current_user
+
+        async def limit_user(user: Annotated[dict, Depends(get_current_user)]):
+            await rate_limiter.check(policy, f"user:{user.get('id')}")
+
+        return Depends(limit_user)
+
+    async def limit_ip(request: Request):
+        await rate_limiter.check(policy, f"ip:{client_ip(request)}")
+
+    return Depends(limit_ip)
@@ -0,0 +1,146 @@
+import logging
+import math
+import os
+import threading
+import time
+
+from fastapi import Request
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+from PollApp.database import DATABASE_REPLICA_URLS, get_async_engine, get_engine, get_replica_engine, open_session
+
+# how far behind the primary a replica may be; a client that just wrote reads from the primary for
+# this long, and cached responses built from a replica are kept no longer than this
+DATABASE_REPLICA_MAX_LAG = float(os.getenv("DATABASE_REPLICA_MAX_LAG", "2"))
+# a replica that failed to connect is skipped for this many seconds, then tried again
+DATABASE_REPLICA_RETRY_SECONDS = float(os.getenv("DATABASE_REPLICA_RETRY_SECONDS", "10"))
+
+STICKY_COOKIE = "read_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRouter:
+    """Round-robin over healthy read replicas, falling back to the primary.
+
+    Health is checked passively: a replica whose connection fails when a
+    read session is opened is skipped for ``retry_seconds`` and the read goes
+    to the next one (or the primary), so the request itself does not fail.
+    """
+
+    def __init__(self, urls: list[str], retry_seconds: float, max_lag: float, enabled: bool = True):
+        self.enabled = enabled
+        self.urls = urls
+        self.retry_seconds = retry_seconds
+        self.max_lag = max_lag
+        self._next = 0
+        self._down_until = [0.0] * len(urls)
+        self._lock = threading.Lock()
+        self.reads = [0] * len(urls)
+        self.failures = [0] * len(urls)
+        self.primary_reads = {"sticky": 0, "fallback": 0, "disabled": 0}
+
+    def _candidates(self) -> list[int]:
+        """Healthy replicas in the order to try them; the turn passes to the one after the first."""
+        now = time.monotonic()
+        with self._lock:
+            order = [(self._next + offset) % len(self.urls) for offset in range(len(self.urls))]
+            healthy = [index for index in order if self._down_until[index] <= now]
+            if healthy:
+                self._next = (healthy[0] + 1) % len(self.urls)
+        return healthy
+
+    def _mark_down(self, index: int, exc: Exception):
+        self.failures[index] += 1
+        self._down_until[index] = time.monotonic() + self.retry_seconds
+        logger.warning("read replica %d unavailable for %.0fs: %s", index, self.retry_seconds, exc)
+
+    async def open(self, sticky: bool):
+        """A read session and the replica serving it (None for the primary)."""
+        if not self.enabled or not self.urls:
+            self.primary_reads["disabled"] += 1
+        elif sticky:
+            self.primary_reads["sticky"] += 1
+        else:
+            for index in self._candidates():
+                session = open_session(get_replica_engine(index))
+                try:
+                    # check out a connection now (the pool pings it) so a dead replica costs a retry, not a 500
+                    await session.connection()
+                except (DBAPIError, OSError) as exc:
+                    await session.close()
+                    self._mark_down(index, exc)
+                    continue
+                self.reads[index] += 1
+                return session, index
+            self.primary_reads["fallback"] += 1
+        return open_session(get_async_engine() or get_engine()), None
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "max_lag": self.max_lag,
+            "replicas": [
+                {
+                    "url": make_url(url).render_as_string(hide_password=True),
+                    "healthy": self._down_until[index] <= now,
+                    "reads": self.reads[index],
+                    "failures": self.failures[index],
+                }
+                for index, url in enumerate(self.urls)
+            ],
+            "primary_reads": dict(self.primary_reads),
+        }
+
+
+def _is_sticky(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_session(request: Request):
+    """Session for read-only handlers: a replica, unless the caller wrote within the last ``max_lag`` seconds."""
+    session, replica = await replicas.open(_is_sticky(request))
+    request.state.read_replica = replica
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+def read_cache_ttl(request: Request) -> float | None:
+    """How long a response built from this request's read session may be cached; None for no limit."""
+    return replicas.max_lag if getattr(request.state, "read_replica", None) is not None else None
+
+
+class StickyPrimaryMiddleware:
+    """After a successful write, pins the client's reads to the primary until replicas have caught up.
+
+    A cookie rather than worker memory, so it holds whichever worker serves the next read.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not (replicas.enabled and replicas.urls):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + replicas.max_lag
+                cookie = (f"{STICKY_COOKIE}={until:.3f}; Max-Age={math.ceil(replicas.max_lag)}; Path=/; "
+                          "HttpOnly; SameSite=lax")
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+replicas = ReplicaRouter(DATABASE_REPLICA_URLS, DATABASE_REPLICA_RETRY_SECONDS, DATABASE_REPLICA_MAX_LAG)
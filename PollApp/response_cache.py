@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import orjson
+from fastapi import Request, Response
+
+from PollApp.compression import COMPRESSION_MINIMUM_SIZE, compress, negotiate
+from PollApp.versions import bump_version
+
+# number of cached responses kept per worker; 0 disables the cache
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+# upper bound on staleness when another worker handled the write (local backend only)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+# redis://... shares entries and invalidations between workers
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    version: int
+    # the body compressed per Content-Encoding, filled the first time a client asks for one
+    compressed: dict[str, bytes]
+
+    @classmethod
+    def encode(cls, payload, competition_id: int, version: int, variant: str) -> "CachedResponse":
+        # same encoding as the app's default ORJSONResponse, so cached and uncached bodies are identical
+        body = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        return cls(body, version_etag(competition_id, version, variant), version, {})
+
+    async def response(self, request: Request) -> Response:
+        headers = _headers(self.etag)
+        coding = negotiate(request.headers.get("accept-encoding", ""))
+        if coding is None or len(self.body) < COMPRESSION_MINIMUM_SIZE:
+            return Response(content=self.body, media_type="application/json", headers=headers)
+
+        # compressed once per cached version, not on every hit
+        body = self.compressed.get(coding)
+        if body is None:
+            body = self.compressed[coding] = await compress(coding, self.body)
+        headers.update({"Content-Encoding": coding, "Vary": "Accept-Encoding"})
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+def version_etag(competition_id: int, version: int, variant: str) -> str:
+    # weak: the same version is one resource whether it goes out compressed or not
+    return f'W/"{competition_id}.{version}.{variant}"'
+
+
+def _headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+class InMemoryResponseBackend:
+    """LRU of encoded responses with a TTL and a generation counter per competition."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[int, str], tuple[CachedResponse, float]] = OrderedDict()
+        self._generations: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+    async def generation(self, competition_id: int) -> int:
+        return self._generations.get(competition_id, 0)
+
+    async def get(self, competition_id: int, variant: str) -> CachedResponse | None:
+        key = (competition_id, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    async def set(self, competition_id: int, variant: str, cached: CachedResponse, generation: int,
+                  ttl: float | None = None):
+        key = (competition_id, variant)
+        with self._lock:
+            # a write landed while this response was being built; don't cache what it invalidated
+            if self._generations.get(competition_id, 0) != generation:
+                return
+            self._drop(key)
+            self._entries[key] = (cached, time.monotonic() + min(self.ttl, ttl if ttl is not None else self.ttl))
+            self.bytes += len(cached.body)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    async def invalidate(self, competition_id: int):
+        with self._lock:
+            self._generations[competition_id] = self._generations.get(competition_id, 0) + 1
+            for key in [key for key in self._entries if key[0] == competition_id]:
+                self._drop(key)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry[0].body)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "entries": len(self._entries), "maxsize": self.maxsize, "bytes": self.bytes}
+
+
+class RedisResponseBackend:
+    """Entries live in one hash per competition generation; invalidating bumps the generation."""
+
+    def __init__(self, url: str, ttl: float):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_URL requires the 'redis' package")
+        self._redis = redis.from_url(url)
+        self.ttl = max(1, int(ttl))
+
+    async def generation(self, competition_id: int) -> int:
+        return int(await self._redis.get(f"response-cache-generation:{competition_id}") or 0)
+
+    async def get(self, competition_id: int, variant: str) -> CachedResponse | None:
+        generation = await self.generation(competition_id)
+        etag, body, version, expires = await self._redis.hmget(
+            f"response-cache:{competition_id}:{generation}",
+            f"{variant}:etag", f"{variant}:body", f"{variant}:version", f"{variant}:expires",
+        )
+        if etag is None or body is None or version is None or (expires and float(expires) <= time.time()):
+            return None
+        return CachedResponse(body, etag.decode(), int(version), {})
+
+    async def set(self, competition_id: int, variant: str, cached: CachedResponse, generation: int,
+                  ttl: float | None = None):
+        # a stale generation's hash is simply never read again and expires on its own
+        key = f"response-cache:{competition_id}:{generation}"
+        # the hash expires as a whole, so a shorter-lived entry carries its own deadline
+        expires = time.time() + ttl if ttl is not None and ttl < self.ttl else ""
+        async with self._redis.pipeline(transaction=False) as pipeline:
+            pipeline.hset(key, mapping={f"{variant}:etag": cached.etag, f"{variant}:body": cached.body,
+                                        f"{variant}:version": cached.version, f"{variant}:expires": expires})
+            pipeline.expire(key, self.ttl)
+            await pipeline.execute()
+
+    async def invalidate(self, competition_id: int):
+        await self._redis.incr(f"response-cache-generation:{competition_id}")
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class ResponseCache:
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    async def respond(self, request: Request, competition_id: int, variant: str, build, version,
+                      ttl: float | None = None) -> Response:
+        """Serve ``variant`` of ``competition_id`` from the cache, or from ``await build()`` on a miss.
+
+        ``await version()`` is the competition's current version (``PollApp.versions``). A request
+        whose If-None-Match names it gets a 304 without a cache lookup or a ``build``; a cached entry
+        from an older version (another worker took the write) is rebuilt rather than served.
+        ``ttl`` shortens how long this fill is kept, e.g. when ``build`` read from a replica that may lag.
+        """
+        current = None
+        if request.headers.get("if-none-match"):
+            current = await version()
+            etag = version_etag(competition_id, current, variant)
+            if _etag_matches(request.headers.get("if-none-match"), etag):
+                self.not_modified += 1
+                return Response(status_code=304, headers=_headers(etag))
+
+        cached = await self.backend.get(competition_id, variant) if self.enabled else None
+        if cached is not None and current is not None and cached.version != current:
+            cached = None
+        if cached is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            generation = await self.backend.generation(competition_id)
+            if current is None:
+                # read before the data, so the response is never labelled newer than what it shows
+                current = await version()
+            cached = CachedResponse.encode(await build(), competition_id, current, variant)
+            if self.enabled:
+                await self.backend.set(competition_id, variant, cached, generation, ttl)
+        return await cached.response(request)
+
+    async def invalidate(self, competition_id: int):
+        """Drop everything cached for ``competition_id`` and bump its version; call after the write commits."""
+        self.invalidations += 1
+        await self.backend.invalidate(competition_id)
+        await bump_version(competition_id)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            **self.backend.stats(),
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache(
+    RedisResponseBackend(RESPONSE_CACHE_URL, RESPONSE_CACHE_TTL) if RESPONSE_CACHE_URL
+    else InMemoryResponseBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL),
+    enabled=RESPONSE_CACHE_SIZE > 0,
+)
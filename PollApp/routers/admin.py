@@ -1,10 +1,20 @@
 from typing import Annotated
 
 from fastapi import Depends, Path, HTTPException, status, APIRouter
-from sqlmodel import Session, select
+from fastapi.responses import ORJSONResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from PollApp.database import get_session
+from PollApp.database import created_engines, get_async_session, get_async_engine, get_engine, pool_stats
 from PollApp.models import Polls
+from PollApp.pagination import PageParams, keyset_page, page_model
+from PollApp.passwords import hashing_stats
+from PollApp.token_cache import token_cache
+from PollApp.broadcast import broadcaster
+from PollApp.response_cache import response_cache
+from PollApp.ingest import score_ingest
+from PollApp.replicas import replicas
+from PollApp.rate_limit import rate_limiter
 from .auth import get_current_user
 
 router = APIRouter(
@@ -12,16 +22,15 @@ router = APIRouter(
     tags=['admin']
 )
 
-db_dependency = Annotated[Session, Depends(get_session)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_session)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
-@router.get("/poll", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, session: db_dependency):
+@router.get("/poll", status_code=status.HTTP_200_OK, response_model=page_model(Polls))
+async def read_all(user: user_dependency, page: Annotated[PageParams, Depends()], session: db_dependency):
     if user is None or user.get('role') != 'admin':
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
-    statement = select(Polls)
-    return session.exec(statement).all()
+    return ORJSONResponse(await keyset_page(session, Polls, page))
 
 
 @router.delete("/poll/{poll_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -30,9 +39,82 @@ async def delete_todo(poll_id: Annotated[int, Path(title="The ID of the poll to
                       session: db_dependency):
     if user is None or user.get('role') != 'admin':
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
-    poll_model = session.exec(select(Polls).where(Polls.id == poll_id)).one_or_none()
+    poll_model = (await session.exec(select(Polls).where(Polls.id == poll_id))).one_or_none()
     if poll_model is None:
         raise HTTPException(status_code=404, detail='Poll not found.')
-    session.delete(poll_model)
-    session.commit()
-    return
\ No newline at end of file
+    await session.delete(poll_model)
+    await session.commit()
+    return
+
+
+@router.get("/pool", status_code=status.HTTP_200_OK)
+async def read_pool_stats(user: user_dependency):
+    if user is None or user.get('role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+    stats = {"sync": pool_stats(get_engine())}
+    async_engine = get_async_engine()
+    if async_engine is not None:
+        stats["async"] = pool_stats(async_engine.sync_engine)
+    for name, db_engine in created_engines().items():
+        if name.startswith("replica"):
+            stats[name] = pool_stats(getattr(db_engine, "sync_engine", db_engine))
+    return stats
+
+
+@router.get("/password-hashing", status_code=status.HTTP_200_OK)
+async def read_password_hashing_stats(user: user_dependency):
+    if user is None or user.get('role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+    return hashing_stats()
+
+
+@router.get("/token-cache", status_code=status.HTTP_200_OK)
+async def read_token_cache_stats(user: user_dependency):
+    if user is None or user.get('role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+    return token_cache.stats()
+
+
+@router.get("/live", status_code=status.HTTP_200_OK)
+async def read_live_stats(user: user_dependency):
+    if user is None or user.get('role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+    return broadcaster.stats()
+
+
+@router.get("/response-cache", status_code=status.HTTP_200_OK)
+async def read_response_cache_stats(user: user_dependency):
+    if user is None or user.get('role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+    return response_cache.stats()
+
+
+@router.get("/ingest", status_code=status.HTTP_200_OK)
+async def read_ingest_stats(user: user_dependency):
+    if user is None or user.get('role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+    return score_ingest.stats()
+
+
+@router.get("/replicas", status_code=status.HTTP_200_OK)
+async def read_replica_stats(user: user_dependency):
+    if user is None or user.get('role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+    return replicas.stats()
+
+
+@router.get("/rate-limit", status_code=status.HTTP_200_OK)
+async def read_rate_limit_stats(user: user_dependency):
+    if user is None or user.get('role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+    return rate_limiter.stats()
+
+
+@router.get("/ranking", status_code=status.HTTP_200_OK)
+async def read_ranking_stats(user: user_dependency):
+    if user is None or user.get('role') != 'admin':
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+    # imported here: NumPy is only loaded once a competition is ranked by something other than its total
+    from PollApp.ranking import ranking_engine
+
+    return ranking_engine.stats()
@@ -6,11 +6,14 @@ import jwt
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Form, Request
 from jose import JWTError
 from sqlmodel import SQLModel, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from jwt.exceptions import InvalidTokenError, ExpiredSignatureError
 
 from PollApp.models import User
-from PollApp.database import get_session
-from passlib.context import CryptContext
+from PollApp.database import get_async_session
+from PollApp.passwords import hash_password, verify_password
+from PollApp.rate_limit import rate_limit
+from PollApp.token_cache import token_cache
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 
 router = APIRouter(
@@ -21,7 +24,6 @@ router = APIRouter(
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = 'HS256'
 
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl='auth/token')
 
 class CreateUserRequest(SQLModel):
@@ -34,13 +36,21 @@ class Token(SQLModel):
     access_token: str
     token_type: str
 
-def authenticate_user(username: str, password: str, session: Session = Depends(get_session)):
+async def authenticate_user(username: str, password: str, session: AsyncSession = Depends(get_async_session)):
     statement = select(User).where(User.username == username)
-    user = session.exec(statement).one_or_none()
+    user = (await session.exec(statement)).one_or_none()
     if user is None:
         return False
-    if not bcrypt_context.verify(password, user.hashed_password):
+    # hand the connection back to the pool while bcrypt runs
+    await session.commit()
+    valid, new_hash = await verify_password(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        # cost factor changed since this hash was made
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
     return user
 
 
@@ -50,7 +60,8 @@ def create_access_token(username: str, user_id: int, role: str, expires_delta: t
     encode.update({'exp': expires})
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def verify_token(token: str):
+def decode_token(token: str) -> tuple[dict, float]:
+    """Verify ``token`` and return the user payload together with its ``exp`` timestamp."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
@@ -68,14 +79,18 @@ def verify_token(token: str):
             "username": username,
             "id": user_id,
             "role": role,
-        }
+        }, payload['exp']
 
-    except JWTError:
+    except (JWTError, InvalidTokenError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
 
+def verify_token(token: str):
+    payload, _ = decode_token(token)
+    return payload
+
 
 # async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
 #     try:
@@ -91,27 +106,29 @@ def verify_token(token: str):
 #         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
 #                             detail='Could not validate user.')
 
-def get_current_user(request: Request):
+async def get_current_user(request: Request):
     token = request.cookies.get("access_token")
 
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    payload = verify_token(token)
+    payload = await token_cache.get(token, decode_token)
+    if payload is None:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
     return payload
 
-@router.post("/register")
-async def create_user(response: Response, create_user_request: CreateUserRequest, session: Session = Depends(get_session)):
+@router.post("/register", dependencies=[rate_limit("register")])
+async def create_user(response: Response, create_user_request: CreateUserRequest, session: AsyncSession = Depends(get_async_session)):
     user = User(
         username=create_user_request.username,
         email=create_user_request.email,
-        hashed_password=bcrypt_context.hash(create_user_request.password),
+        hashed_password=await hash_password(create_user_request.password),
         role=create_user_request.role
     )
 
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
 
     access_token = create_access_token(
         user.username,
@@ -132,12 +149,12 @@ async def create_user(response: Response, create_user_request: CreateUserRequest
     return {"message": "User created successfully"}
 
 
-@router.post("/token")
+@router.post("/token", dependencies=[rate_limit("login")])
 async def login_for_access_token(response: Response,
                                  form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
                                  remember: bool = Form(False),
-                                 session: Session = Depends(get_session)):
-    user = authenticate_user(form_data.username, form_data.password, session)
+                                 session: AsyncSession = Depends(get_async_session)):
+    user = await authenticate_user(form_data.username, form_data.password, session)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail='Could not validate user.')
@@ -169,7 +186,15 @@ async def login_for_access_token(response: Response,
     return {"message": "Login successful"}
 
 @router.post("/logout")
-def logout(response: Response):
+async def logout(request: Request, response: Response):
+    token = request.cookies.get("access_token")
+    if token:
+        try:
+            _, expires_at = decode_token(token)
+            await token_cache.revoke(token, expires_at)
+        except HTTPException:
+            pass  # already invalid, nothing to revoke
+
     response.delete_cookie(
         key="access_token",
         path="/",
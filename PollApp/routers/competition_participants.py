@@ -1,9 +1,13 @@
 from typing import Annotated
 
 from fastapi import Depends, HTTPException, Path, status, APIRouter
+from fastapi.responses import ORJSONResponse
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from PollApp.database import get_session
+from PollApp.database import get_async_session
+from PollApp.pagination import PageParams, keyset_page, page_model
+from PollApp.response_cache import response_cache
 from PollApp.models import Polls, PollRequest, Competitions, CompetitionsRequest, CompetitionParticipantsRequest, \
     CompetitionParticipants
 from .auth import get_current_user
@@ -18,25 +22,26 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, session: Session = Depends(get_session)):
+@router.get("/", status_code=status.HTTP_200_OK, response_model=page_model(CompetitionParticipants))
+async def read_all(user: user_dependency, page: Annotated[PageParams, Depends()],
+                   session: AsyncSession = Depends(get_async_session)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
 
-    statement = select(CompetitionParticipants)
-    return session.exec(statement).all()
+    return ORJSONResponse(await keyset_page(session, CompetitionParticipants, page))
 
 @router.delete("/{participant_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_poll(participant_id: Annotated[int, Path(title="The ID of the participant to delete", gt=0)],
                       user: user_dependency,
-                      session: Session = Depends(get_session)):
+                      session: AsyncSession = Depends(get_async_session)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
 
     statement = select(CompetitionParticipants).where(CompetitionParticipants.id == participant_id)
-    participant_model = session.exec(statement).one_or_none()
+    participant_model = (await session.exec(statement)).one_or_none()
     if participant_model is None:
         raise HTTPException(status_code=404, detail='Poll not found.')
-    session.delete(participant_model)
-    session.commit()
+    await session.delete(participant_model)
+    await session.commit()
+    await response_cache.invalidate(participant_model.competition_id)
     return None
\ No newline at end of file
@@ -1,15 +1,28 @@
-from collections import defaultdict
+import asyncio
+import csv
+import io
 from random import shuffle
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import Depends, HTTPException, Path, status, APIRouter
+from fastapi import Depends, HTTPException, Path, Query, Request, UploadFile, WebSocket, status, APIRouter
 from sqlmodel import Session, select, func, and_
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import selectinload, outerjoin
-
-from PollApp.database import get_session
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from PollApp.database import get_async_session, dialect_insert
+from PollApp.leaderboard import read_leaderboard, read_ranking_settings
+from PollApp.broadcast import broadcaster
+from PollApp.response_cache import response_cache
+from PollApp.versions import current_version
+from PollApp.export import MEDIA_TYPES, ExportResponse, scores_statement, stream_export, totals_statement
+from PollApp.pagination import PageParams, keyset_page, page_model
+from PollApp.replicas import get_read_session, read_cache_ttl
 from PollApp.models import Polls, PollRequest, Competitions, CompetitionsRequest, CompetitionParticipants, \
-    CompetitionRead, CompetitionParticipantsRequest, ParticipantTotalScore, ParticipantScores, User, \
-    ParticipantScoreResponse
+    CompetitionDetail, CompetitionParticipantsRequest, ParticipantTotalScore, ParticipantScores, User, \
+    ParticipantFeedback, ParticipantScoreTotals, CompetitionParticipantsImportRequest, MyCompetitions, \
+    CompetitionRankingRequest, CompetitionRankingSettings, RankingMethod, CompetitionBallots
 from .auth import get_current_user
 
 router = APIRouter(
@@ -24,7 +37,7 @@ user_dependency = Annotated[dict, Depends(get_current_user)]
 async def create_competition(
     competition_request: CompetitionsRequest,
     user: user_dependency,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     if user is None:
         raise HTTPException(
@@ -38,8 +51,8 @@ async def create_competition(
     )
 
     session.add(competition_model)
-    session.commit()
-    session.refresh(competition_model)
+    await session.commit()
+    await session.refresh(competition_model)
 
     return {
         "id": competition_model.id,
@@ -47,64 +60,94 @@ async def create_competition(
     }
 
 
-@router.get("/", status_code=200)
-async def read_all(
-    user: user_dependency,
-    session: Session = Depends(get_session),
-):
-    if user is None:
-        raise HTTPException(status_code=401)
+def my_competitions_statement(user_id: int):
+    """The caller's competitions with member counts and the caller's own scoring progress."""
+    my_competitions = (
+        select(CompetitionParticipants.competition_id)
+        .where(CompetitionParticipants.user_id == user_id)
+    )
 
-    has_polled_subquery = (
-        select(ParticipantScores.id)
-        .where(
-            ParticipantScores.competition_id == Competitions.id,
-            ParticipantScores.scorer_id == user["id"],
+    # member counts are grouped once over the caller's competitions only; the caller's own
+    # progress is read from the ballot status kept with the scores, never from the scores
+    participant_counts = (
+        select(
+            CompetitionParticipants.competition_id,
+            func.count().label("participant_count"),
         )
-        .exists()
+        .where(CompetitionParticipants.competition_id.in_(my_competitions))
+        .group_by(CompetitionParticipants.competition_id)
+        .subquery()
     )
 
-    statement = (
+    return (
         select(
-            Competitions,
-            has_polled_subquery.label("has_polled")
+            Competitions.id,
+            Competitions.title,
+            Competitions.desc,
+            Competitions.creator_id,
+            participant_counts.c.participant_count,
+            func.coalesce(CompetitionBallots.scored_count, 0).label("scored_count"),
+            CompetitionBallots.submitted_at,
         )
-        .join(
-            CompetitionParticipants,
-            CompetitionParticipants.competition_id == Competitions.id
-        )
-        .where(CompetitionParticipants.user_id == user["id"])
+        .join(participant_counts, participant_counts.c.competition_id == Competitions.id)
+        .outerjoin(CompetitionBallots, and_(
+            CompetitionBallots.competition_id == Competitions.id,
+            CompetitionBallots.user_id == user_id,
+        ))
+        .order_by(Competitions.id)
     )
 
-    rows = session.exec(statement).all()
+
+@router.get("/", status_code=200, response_model=MyCompetitions)
+async def read_all(
+    user: user_dependency,
+    session: AsyncSession = Depends(get_read_session),
+):
+    if user is None:
+        raise HTTPException(status_code=401)
+
+    rows = (await session.exec(my_competitions_statement(user["id"]))).all()
 
     has_been_polled = []
     not_yet_voted = []
 
-    for competition, has_polled in rows:
-        if has_polled:
+    for row in rows:
+        # everyone but the caller can be scored
+        to_score = row.participant_count - 1
+        competition = {
+            "id": row.id,
+            "title": row.title,
+            "desc": row.desc,
+            "creator_id": row.creator_id,
+            "participant_count": row.participant_count,
+            "scored_count": row.scored_count,
+            "completion": min(1.0, row.scored_count / to_score) if to_score > 0 else 1.0,
+            "submitted_at": row.submitted_at,
+        }
+        if row.scored_count:
             has_been_polled.append(competition)
         else:
             not_yet_voted.append(competition)
 
-    return {
+    return ORJSONResponse({
         "has_been_polled": has_been_polled,
         "not_yet_voted": not_yet_voted,
-    }
+    })
 
-@router.get("/all", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, session: Session = Depends(get_session)):
+@router.get("/all", status_code=status.HTTP_200_OK, response_model=page_model(Competitions))
+async def read_all(user: user_dependency, page: Annotated[PageParams, Depends()],
+                   session: AsyncSession = Depends(get_read_session)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
 
-    statement = select(Competitions)
-    return session.exec(statement).all()
+    return ORJSONResponse(await keyset_page(session, Competitions, page))
 
-@router.get("/{competition_id}", status_code=status.HTTP_200_OK)
+@router.get("/{competition_id}", status_code=status.HTTP_200_OK, response_model=CompetitionDetail)
 async def read_competition(
+    request: Request,
     user: user_dependency,
     competition_id: Annotated[int, Path(gt=0)],
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     if not user:
         raise HTTPException(
@@ -112,42 +155,127 @@ async def read_competition(
             detail="Authentication failed"
         )
 
-    statement = (
-        select(Competitions)
-        .where(Competitions.id == competition_id)
-        .options(selectinload(Competitions.participants).selectinload(CompetitionParticipants.user))
-    )
+    async def build():
+        statement = (
+            select(Competitions)
+            .where(Competitions.id == competition_id)
+            .options(selectinload(Competitions.participants).selectinload(CompetitionParticipants.user))
+        )
+
+        competition = (await session.exec(statement)).one_or_none()
+
+        if not competition:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Competition not found"
+            )
+
+        return {
+            "competitions": {
+                "id": competition.id,
+                "title": competition.title,
+                "desc": competition.desc,
+                "participants": [
+                    {
+                        "id": participant.id,
+                        "user_id": participant.user.id if participant.user else None,
+                        "username": participant.user.username if participant.user else None
+                    }
+                    for participant in competition.participants
+                ]
+            }
+        }
+
+    return await response_cache.respond(request, competition_id, "detail", build,
+                                        lambda: current_version(session, competition_id), ttl=read_cache_ttl(request))
+
+IMPORT_CHUNK_SIZE = 5000
 
-    competition = session.exec(statement).one_or_none()
 
-    if not competition:
+async def _get_owned_competition(session, competition_id: int, user: dict,
+                                 action: str = "add participants") -> Competitions:
+    # ✅ Check competition exists
+    competition = await session.get(Competitions, competition_id)
+    if competition is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Competition not found"
         )
 
+    # ✅ Check creator
+    if competition.creator_id != user.get("id"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Only competition creator can {action}"
+        )
+    return competition
+
+
+async def _import_participants(session, competition_id: int, user_ids, usernames) -> dict:
+    """Resolve users by id/username, then insert the memberships that don't exist yet.
+
+    Set-based SELECTs and one multi-row ``INSERT ... ON CONFLICT DO NOTHING`` per chunk,
+    so existing members and repeated identifiers are skipped rather than duplicated.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    usernames = list(dict.fromkeys(usernames))
+
+    # ids and usernames are looked up separately so each IN list can use its own index
+    resolved: dict = {}
+    for column, identifiers in ((User.id, user_ids), (User.username, usernames)):
+        for start in range(0, len(identifiers), IMPORT_CHUNK_SIZE):
+            rows = (await session.exec(
+                select(column, User.id).where(column.in_(identifiers[start:start + IMPORT_CHUNK_SIZE]))
+            )).all()
+            resolved.update(dict(rows))
+
+    invalid = [identifier for identifier in [*user_ids, *usernames] if identifier not in resolved]
+    resolved_ids = list(dict.fromkeys(resolved[identifier] for identifier in [*user_ids, *usernames]
+                                      if identifier in resolved))
+
+    table = CompetitionParticipants.__table__
+    added = 0
+    for start in range(0, len(resolved_ids), IMPORT_CHUNK_SIZE):
+        statement = (
+            dialect_insert(session, table)
+            .values([{"competition_id": competition_id, "user_id": user_id}
+                     for user_id in resolved_ids[start:start + IMPORT_CHUNK_SIZE]])
+            .on_conflict_do_nothing(index_elements=["competition_id", "user_id"])
+            .returning(table.c.user_id)
+        )
+        added += len((await session.exec(statement)).all())
+    await session.commit()
+    if added:
+        await response_cache.invalidate(competition_id)
+
     return {
-        "competitions": {
-            "id": competition.id,
-            "title": competition.title,
-            "desc": competition.desc,
-            "participants": [
-                {
-                    "id": participant.id,
-                    "user_id": participant.user.id if participant.user else None,
-                    "username": participant.user.username if participant.user else None
-                }
-                for participant in competition.participants
-            ]
-        }
+        "added": added,
+        "skipped": len(resolved_ids) - added,
+        "invalid": len(invalid),
+        "invalid_identifiers": invalid,
     }
 
+
+def _read_csv_identifiers(file) -> tuple[list[int], list[str]]:
+    # one identifier per row (first column): digits are user ids, anything else a username
+    user_ids, usernames = [], []
+    for row in csv.reader(io.TextIOWrapper(file, encoding="utf-8-sig", newline="")):
+        value = row[0].strip() if row else ""
+        if not value or value.lower() in ("id", "user_id", "username"):
+            continue
+        if value.isdigit():
+            user_ids.append(int(value))
+        else:
+            usernames.append(value)
+    return user_ids, usernames
+
+
 @router.post("/{competition_id}/participant/add", status_code=status.HTTP_201_CREATED)
 async def add_competition_participants(
     competition_id: int,
     competition_participant_request: CompetitionParticipantsRequest,
     user: user_dependency,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     if user is None:
         raise HTTPException(
@@ -155,48 +283,74 @@ async def add_competition_participants(
             detail="Authentication Failed"
         )
 
-    # ✅ Check competition exists
-    competition = session.get(Competitions, competition_id)
-    if competition is None:
+    await _get_owned_competition(session, competition_id, user)
+
+    result = await _import_participants(session, competition_id, competition_participant_request.user_ids, [])
+
+    return {
+        "message": "Participants added successfully",
+        "count": result["added"],
+        "skipped": result["skipped"],
+        "invalid": result["invalid"],
+    }
+
+
+@router.post("/{competition_id}/participant/import", status_code=status.HTTP_201_CREATED)
+async def import_competition_participants(
+    competition_id: int,
+    import_request: CompetitionParticipantsImportRequest,
+    user: user_dependency,
+    session: AsyncSession = Depends(get_async_session)
+):
+    if user is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Competition not found"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication Failed"
         )
 
-    # ✅ Check creator
-    if competition.creator_id != user.get("id"):
+    await _get_owned_competition(session, competition_id, user)
+    return await _import_participants(session, competition_id, import_request.user_ids, import_request.usernames)
+
+
+@router.post("/{competition_id}/participant/import/csv", status_code=status.HTTP_201_CREATED)
+async def import_competition_participants_csv(
+    competition_id: int,
+    file: UploadFile,
+    user: user_dependency,
+    session: AsyncSession = Depends(get_async_session)
+):
+    if user is None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only competition creator can add participants"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication Failed"
         )
 
-    # ✅ Create participant rows
-    participants = [
-        CompetitionParticipants(
-            competition_id=competition_id,
-            user_id=user_id
-        )
-        for user_id in competition_participant_request.user_ids
-    ]
+    await _get_owned_competition(session, competition_id, user)
 
-    session.add_all(participants)
-    session.commit()
+    try:
+        user_ids, usernames = await run_in_threadpool(_read_csv_identifiers, file.file)
+    except (UnicodeDecodeError, csv.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not parse CSV file"
+        )
 
-    return {
-        "message": "Participants added successfully",
-        "count": len(participants)
-    }
+    return await _import_participants(session, competition_id, user_ids, usernames)
 
 
 
 @router.get(
     "/{competition_id}/scores",
-    status_code=status.HTTP_200_OK
+    status_code=status.HTTP_200_OK,
+    response_model=list[ParticipantTotalScore],
 )
 async def get_all_scores_by_competition(
+    request: Request,
     competition_id: int,
     user: user_dependency,
-    session: Session = Depends(get_session),
+    include_feedback: bool = False,
+    method: RankingMethod | None = None,
+    session: AsyncSession = Depends(get_read_session),
 ):
     if not user:
         raise HTTPException(
@@ -204,39 +358,202 @@ async def get_all_scores_by_competition(
             detail="Authentication failed"
         )
 
-    statement = (
-        select(
-            ParticipantScores.scored_id,
-            User.username,
-            ParticipantScores.score,
-            ParticipantScores.feedback,
+    async def build():
+        # totals come from the maintained aggregate, one row per scored participant
+        entries = await read_leaderboard(session, competition_id)
+
+        ranked_by, trim = await read_ranking_settings(session, competition_id)
+        ranked_by = method or ranked_by
+        if ranked_by != "total":
+            from PollApp.ranking import ranking_engine
+
+            values = await ranking_engine.rankings(session, competition_id, ranked_by, trim)
+            for entry in entries:
+                entry["ranking_score"] = values.get(entry["id"])
+            # a participant scored after the totals were read has no value yet: last
+            entries.sort(key=lambda entry: (entry["ranking_score"] is None, -(entry["ranking_score"] or 0),
+                                            -entry["total_score"], entry["id"]))
+        leaderboard = {entry["id"]: entry for entry in entries}
+
+        if include_feedback:
+            for entry in leaderboard.values():
+                entry["scores"] = []
+                entry["feedbacks"] = []
+
+            results = (await session.exec(
+                select(ParticipantScores.scored_id, ParticipantScores.score, ParticipantScores.feedback)
+                .where(ParticipantScores.competition_id == competition_id)
+            )).all()
+
+            for scored_id, score, feedback in results:
+                if scored_id in leaderboard:
+                    leaderboard[scored_id]["scores"].append(score)
+                    leaderboard[scored_id]["feedbacks"].append(feedback)
+
+        return list(leaderboard.values())
+
+    variant = "scores+feedback" if include_feedback else "scores"
+    if method is not None:
+        variant += f":{method}"
+    return await response_cache.respond(request, competition_id, variant, build,
+                                        lambda: current_version(session, competition_id), ttl=read_cache_ttl(request))
+
+
+@router.put("/{competition_id}/ranking", status_code=status.HTTP_200_OK)
+async def update_competition_ranking(
+    competition_id: int,
+    ranking_request: CompetitionRankingRequest,
+    user: user_dependency,
+    session: AsyncSession = Depends(get_async_session)
+):
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication Failed"
         )
-        .join(User, User.id == ParticipantScores.scored_id)
-        .where(ParticipantScores.competition_id == competition_id)
+
+    await _get_owned_competition(session, competition_id, user, "change its ranking")
+
+    statement = dialect_insert(session, CompetitionRankingSettings.__table__).values(
+        competition_id=competition_id, **ranking_request.model_dump()
     )
+    await session.exec(statement.on_conflict_do_update(
+        index_elements=["competition_id"],
+        set_={"method": statement.excluded.method, "trim": statement.excluded.trim},
+    ))
+    await session.commit()
+    # the cached leaderboards are in the old order
+    await response_cache.invalidate(competition_id)
+
+    return {"competition_id": competition_id, **ranking_request.model_dump()}
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    # clients have nothing to say on this channel; reading only tells us when they leave
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/{competition_id}/live")
+async def leaderboard_live(websocket: WebSocket, competition_id: int):
+    try:
+        await get_current_user(websocket)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+    try:
+        async with broadcaster.listen(competition_id) as queue:
+            while True:
+                message = asyncio.create_task(queue.get())
+                await asyncio.wait({message, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    message.cancel()
+                    return
+                if message.result() is None:
+                    await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                    return
+                await websocket.send_text(message.result())
+    finally:
+        disconnected.cancel()
+
+
+@router.get("/{competition_id}/live/sse", status_code=status.HTTP_200_OK)
+async def leaderboard_live_sse(competition_id: int, user: user_dependency):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication failed"
+        )
 
-    results = session.exec(statement).all()
+    async def events():
+        async with broadcaster.listen(competition_id) as queue:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"  # stops idle proxies from closing the stream
+                    continue
+                if message is None:
+                    return
+                yield f"data: {message}\n\n"
 
-    grouped: dict[int, dict] = defaultdict(
-        lambda: {
-            "scores": [],
-            "feedbacks": [],
-            "total_score": 0,
-        }
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get(
+    "/{competition_id}/export",
+    status_code=status.HTTP_200_OK
+)
+async def export_competition_scores(
+    competition_id: int,
+    user: user_dependency,
+    format: Literal["ndjson", "csv", "json"] = "ndjson",
+    kind: Literal["scores", "totals"] = "scores",
+    session: AsyncSession = Depends(get_async_session),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication failed"
+        )
+
+    if await session.get(Competitions, competition_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Competition not found"
+        )
+    # the export streams on a connection of its own; don't hold this one for the whole download
+    await session.commit()
+
+    statement = scores_statement(competition_id) if kind == "scores" else totals_statement(competition_id)
+    return ExportResponse(
+        stream_export(statement, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="competition-{competition_id}-{kind}.{format}"'},
     )
 
-    for scored_id, username, score, feedback in results:
-        grouped[scored_id]["id"] = scored_id
-        grouped[scored_id]["username"] = username
-        grouped[scored_id]["scores"].append(score)
-        grouped[scored_id]["feedbacks"].append(feedback)
-        grouped[scored_id]["total_score"] += score
 
-    # for data in grouped.values():
-    #     shuffle(data["scores"])
-    #     shuffle(data["feedbacks"])
+@router.get(
+    "/{competition_id}/scores/{scored_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=ParticipantFeedback,
+)
+async def get_participant_feedback(
+    competition_id: int,
+    scored_id: int,
+    user: user_dependency,
+    limit: Annotated[int, Query(gt=0, le=500)] = 50,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    session: AsyncSession = Depends(get_async_session),
+):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication failed"
+        )
 
-    return list(grouped.values())
+    statement = (
+        select(ParticipantScores.score, ParticipantScores.feedback)
+        .where(
+            ParticipantScores.competition_id == competition_id,
+            ParticipantScores.scored_id == scored_id,
+        )
+        .order_by(ParticipantScores.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    results = (await session.exec(statement)).all()
+
+    return ORJSONResponse({
+        "id": scored_id,
+        "scores": [score for score, _ in results],
+        "feedbacks": [feedback for _, feedback in results],
+        "limit": limit,
+        "offset": offset,
+    })
 
 #
 # @router.get("/{poll_id}", status_code=status.HTTP_200_OK)
@@ -1,12 +1,21 @@
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, Path, status, APIRouter
+from fastapi import Depends, Header, HTTPException, Path, Request, Response, status, APIRouter
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from PollApp.database import get_session
+from PollApp.database import get_async_session, dialect_insert
+from PollApp.pagination import PageParams, keyset_page, page_model
 from PollApp.models import Polls, PollRequest, Competitions, CompetitionsRequest, CompetitionParticipantsRequest, \
     CompetitionParticipants, ParticipantScores, ScoreRequest, BulkScoreRequest
+from PollApp.leaderboard import apply_ballot_deltas, apply_score_deltas, ballot_deltas, score_deltas
+from PollApp import idempotency
+from PollApp.ingest import score_ingest, submission_id_for
+from PollApp.broadcast import broadcaster
+from PollApp.response_cache import response_cache
+from PollApp.rate_limit import rate_limit
 from .auth import get_current_user
 
 router = APIRouter(
@@ -15,25 +24,31 @@ router = APIRouter(
 )
 
 user_dependency = Annotated[dict, Depends(get_current_user)]
+# clients may retry a submission with the same key and get the first response back
+idempotency_key_header = Annotated[str | None, Header(min_length=1, max_length=255)]
 
 
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, session: Session = Depends(get_session)):
+@router.get("/", status_code=status.HTTP_200_OK, response_model=page_model(ParticipantScores))
+async def read_all(user: user_dependency, page: Annotated[PageParams, Depends()],
+                   session: AsyncSession = Depends(get_async_session)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
 
-    statement = select(ParticipantScores)
-    return session.exec(statement).all()
+    return ORJSONResponse(await keyset_page(session, ParticipantScores, page))
 
-@router.post("/create/{comp_id}/{scored_id}", status_code=status.HTTP_201_CREATED)
+@router.post("/create/{comp_id}/{scored_id}", status_code=status.HTTP_201_CREATED,
+             dependencies=[rate_limit("scores")])
 async def create_score(
+    http_request: Request,
+    response: Response,
     competition_request: ScoreRequest,
     comp_id: int,
     scored_id: int,
     user: user_dependency,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
+    idempotency_key: idempotency_key_header = None,
 ):
     if user is None:
         raise HTTPException(
@@ -41,19 +56,16 @@ async def create_score(
             detail="Authentication Failed"
         )
 
-    existing_score = session.exec(
-        select(ParticipantScores).where(
-            ParticipantScores.competition_id == comp_id,
-            ParticipantScores.scorer_id == user.get("id"),
-            ParticipantScores.scored_id == scored_id
-        )
-    ).first()
-
-    if existing_score:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="You have already submitted a score for this user in this competition"
-        )
+    if idempotency_key is not None:
+        fingerprint = idempotency.request_hash(http_request.url.path, competition_request)
+        replay = await idempotency.lookup(session, user.get('id'), idempotency_key, fingerprint)
+        if replay is not None:
+            return replay
+        if score_ingest.enabled:
+            accepted = score_ingest.status(submission_id_for(user.get('id'), idempotency_key))
+            if accepted is not None:
+                response.status_code = status.HTTP_202_ACCEPTED
+                return accepted
 
     if user.get('id') == scored_id:
         raise HTTPException(
@@ -61,20 +73,20 @@ async def create_score(
             detail="You cannot score yourself"
         )
 
-    competition = session.get(Competitions, comp_id)
+    competition = await session.get(Competitions, comp_id)
     if not competition:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Competition not found"
         )
 
-    participant = session.exec(
+    participant = (await session.exec(
         select(CompetitionParticipants)
         .where(
             CompetitionParticipants.competition_id == comp_id,
             CompetitionParticipants.user_id == scored_id
         )
-    ).first()
+    )).first()
 
     if not participant:
         raise HTTPException(
@@ -82,52 +94,138 @@ async def create_score(
             detail="User is not a participant of this competition"
         )
 
-    score_model = ParticipantScores(
-        **competition_request.model_dump(),
-        competition_id=comp_id,
-        scored_id=scored_id,
-        scorer_id=user.get('id')
+    if score_ingest.enabled:
+        # written behind the response; a score that already exists shows up as skipped in its status
+        await session.rollback()  # release the connection while the spool syncs
+        response.status_code = status.HTTP_202_ACCEPTED
+        return await score_ingest.submit(
+            comp_id, user.get('id'), [{"scored_id": scored_id, **competition_request.model_dump()}],
+            submission_id_for(user.get('id'), idempotency_key) if idempotency_key is not None else None,
+        )
+
+    # conflict-safe insert: a concurrent duplicate hits uq_participant_scores_competition_scorer_scored
+    # and gets no row back instead of an IntegrityError
+    table = ParticipantScores.__table__
+    statement = (
+        dialect_insert(session, table)
+        .values(**competition_request.model_dump(), competition_id=comp_id, scored_id=scored_id,
+                scorer_id=user.get('id'))
+        .on_conflict_do_nothing(index_elements=["competition_id", "scorer_id", "scored_id"])
+        .returning(*table.c)
     )
 
+    if idempotency_key is not None:
+        replay = await idempotency.claim(session, user.get('id'), idempotency_key, fingerprint)
+        if replay is not None:
+            await session.rollback()
+            return replay
+
     try:
-        session.add(score_model)
-        session.commit()
-        session.refresh(score_model)
-    except Exception:
-        session.rollback()
+        row = (await session.exec(statement)).first()
+        if row is not None:
+            score = dict(row._mapping)
+            await apply_score_deltas(session, comp_id, {scored_id: (score["score"], 1)})
+            await apply_ballot_deltas(session, comp_id, {score["scorer_id"]: 1})
+            if idempotency_key is not None:
+                await idempotency.save(session, user.get('id'), idempotency_key, status.HTTP_201_CREATED, score)
+            await session.commit()
+    except SQLAlchemyError:
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create score"
         )
 
-    return score_model
+    if row is None:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You have already submitted a score for this user in this competition"
+        )
+
+    await response_cache.invalidate(comp_id)
+    await broadcaster.publish(comp_id, [scored_id])
+    return score
+
+
+@router.get("/submissions/{submission_id}", status_code=status.HTTP_200_OK)
+async def read_submission(submission_id: str, user: user_dependency):
+    """Progress of a submission accepted with 202 while score ingestion is on (kept by the worker that took it)."""
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+
+    submission = score_ingest.status(submission_id)
+    if submission is None or submission["scorer_id"] != user.get('id'):
+        raise HTTPException(status_code=404, detail='Submission not found.')
+    return submission
 
 
 @router.delete("/{participant_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_poll(participant_id: Annotated[int, Path(title="The ID of the participant to delete", gt=0)],
                       user: user_dependency,
-                      session: Session = Depends(get_session)):
+                      session: AsyncSession = Depends(get_async_session)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
 
     statement = select(CompetitionParticipants).where(CompetitionParticipants.id == participant_id)
-    participant_model = session.exec(statement).one_or_none()
+    participant_model = (await session.exec(statement)).one_or_none()
     if participant_model is None:
         raise HTTPException(status_code=404, detail='Poll not found.')
-    session.delete(participant_model)
-    session.commit()
+    await session.delete(participant_model)
+    await session.commit()
+    await response_cache.invalidate(participant_model.competition_id)
     return None
 
-@router.post("/bulk-create/{competition_id}")
+@router.delete("/{comp_id}/{scored_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_score(comp_id: int,
+                       scored_id: int,
+                       user: user_dependency,
+                       session: AsyncSession = Depends(get_async_session)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
+
+    statement = select(ParticipantScores).where(
+        ParticipantScores.competition_id == comp_id,
+        ParticipantScores.scorer_id == user.get('id'),
+        ParticipantScores.scored_id == scored_id,
+    )
+    score_model = (await session.exec(statement)).first()
+    if score_model is None:
+        raise HTTPException(status_code=404, detail='Score not found.')
+
+    await session.delete(score_model)
+    await apply_score_deltas(session, comp_id, {scored_id: (-score_model.score, -1)})
+    await apply_ballot_deltas(session, comp_id, {score_model.scorer_id: -1})
+    await session.commit()
+    await response_cache.invalidate(comp_id)
+    await broadcaster.publish(comp_id, [scored_id])
+    return None
+
+@router.post("/bulk-create/{competition_id}", dependencies=[rate_limit("ballots")])
 async def bulk_create_scores(
+    http_request: Request,
+    response: Response,
     competition_id: int,
     request: BulkScoreRequest,
     user: user_dependency,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
+    idempotency_key: idempotency_key_header = None,
 ):
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
 
+    # a retry is answered from the stored response before any validation or insert work
+    if idempotency_key is not None:
+        fingerprint = idempotency.request_hash(http_request.url.path, request)
+        replay = await idempotency.lookup(session, user.get('id'), idempotency_key, fingerprint)
+        if replay is not None:
+            return replay
+        if score_ingest.enabled:
+            accepted = score_ingest.status(submission_id_for(user.get('id'), idempotency_key))
+            if accepted is not None:
+                response.status_code = status.HTTP_202_ACCEPTED
+                return accepted
+
     # 1. Validate payload
     if not request.polls:
         raise HTTPException(status_code=400, detail="Empty poll list")
@@ -139,40 +237,120 @@ async def bulk_create_scores(
             detail="Total score must be less than 1000"
         )
 
-    # 2. Authorization check (example)
-    is_allowed = session.exec(
-        select(CompetitionParticipants)
+    scorer_id = user.get('id')
+    participant_ids = {p.participant_id for p in request.polls}
+
+    # 2. Validate the whole ballot in one query: which targets are participants, and
+    #    which of them this scorer has already scored (the caller's own row authorizes)
+    already_scored = (
+        select(ParticipantScores.id)
+        .where(
+            ParticipantScores.competition_id == competition_id,
+            ParticipantScores.scorer_id == scorer_id,
+            ParticipantScores.scored_id == CompetitionParticipants.user_id,
+        )
+        .exists()
+    )
+    membership = dict((await session.exec(
+        select(CompetitionParticipants.user_id, already_scored)
         .where(
             CompetitionParticipants.competition_id == competition_id,
-            CompetitionParticipants.user_id == user.get('id'),
+            CompetitionParticipants.user_id.in_(participant_ids | {scorer_id}),
         )
-    ).first()
+    )).all())
 
-    if not is_allowed:
+    if scorer_id not in membership:
         raise HTTPException(status_code=403, detail="Not allowed to score")
 
-    # 3. Prepare bulk insert
-    rows = [
-        ParticipantScores(
-            competition_id=competition_id,
-            scored_id=p.participant_id,
-            score=p.score,
-            feedback=p.feedback,
-            scorer_id=user.get('id'),
-        )
-        for p in request.polls
-    ]
+    results = []
+    values = []
+    seen = set()
+    for p in request.polls:
+        if p.participant_id == scorer_id:
+            item_status = "self"
+        elif p.participant_id not in membership:
+            item_status = "not_participant"
+        elif membership[p.participant_id]:
+            item_status = "already_scored"
+        elif p.participant_id in seen:
+            item_status = "duplicate"
+        else:
+            item_status = "created"
+            seen.add(p.participant_id)
+            values.append({
+                "competition_id": competition_id,
+                "scorer_id": scorer_id,
+                "scored_id": p.participant_id,
+                "score": p.score,
+                "feedback": p.feedback or "",
+            })
+        results.append({"participant_id": p.participant_id, "status": item_status})
+
+    if score_ingest.enabled:
+        await session.rollback()  # release the connection while the spool syncs
+        accepted = None
+        if values:
+            accepted = await score_ingest.submit(
+                competition_id, scorer_id, values,
+                submission_id_for(scorer_id, idempotency_key) if idempotency_key is not None else None,
+            )
+        for result in results:
+            if result["status"] == "created":
+                result["status"] = "queued"
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {
+            "status": "accepted",
+            "submission_id": accepted["submission_id"] if accepted else None,
+            "count": len(values),
+            "results": results,
+        }
 
-    # 4. Transaction-safe commit
+    if idempotency_key is not None:
+        replay = await idempotency.claim(session, scorer_id, idempotency_key, fingerprint)
+        if replay is not None:
+            await session.rollback()
+            return replay
+
+    # 3. One multi-row INSERT; rows a concurrent submission got to first are skipped
+    inserted = {}
     try:
-        session.add_all(rows)
-        session.commit()
+        if values:
+            # Core table insert: skips the ORM's per-row attribute bookkeeping
+            table = ParticipantScores.__table__
+            statement = (
+                dialect_insert(session, table)
+                .values(values)
+                .on_conflict_do_nothing(index_elements=["competition_id", "scorer_id", "scored_id"])
+                .returning(table.c.id, table.c.scorer_id, table.c.scored_id, table.c.score)
+            )
+            rows = (await session.exec(statement)).all()
+            await apply_score_deltas(session, competition_id, score_deltas(rows))
+            await apply_ballot_deltas(session, competition_id, ballot_deltas(rows))
+            inserted = {row.scored_id: row.id for row in rows}
+
+        for result in results:
+            if result["status"] == "created":
+                if result["participant_id"] in inserted:
+                    result["id"] = inserted[result["participant_id"]]
+                else:
+                    result["status"] = "already_scored"
+
+        body = {
+            "status": "ok",
+            "count": len(inserted),
+            "results": results,
+        }
+
+        # 4. Transaction-safe commit, together with the stored response for retries
+        if idempotency_key is not None:
+            await idempotency.save(session, scorer_id, idempotency_key, status.HTTP_200_OK, body)
+        await session.commit()
     except SQLAlchemyError:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail="Failed to submit scores")
 
-    return {
-        "status": "ok",
-        "count": len(rows),
-    }
+    if inserted:
+        await response_cache.invalidate(competition_id)
+        await broadcaster.publish(competition_id, inserted)
 
+    return body
@@ -1,10 +1,14 @@
 from typing import Annotated
 
 from fastapi import Depends, HTTPException, status, APIRouter
-from passlib.context import CryptContext
+from fastapi.responses import ORJSONResponse
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from PollApp.database import get_session
+from PollApp.database import get_async_session
+from PollApp.pagination import PageParams, keyset_page, page_model
+from PollApp.passwords import hash_password, verify_password
+from PollApp.replicas import get_read_session
 from PollApp.models import User, UserChangePassword
 from .auth import get_current_user
 
@@ -13,9 +17,9 @@ router = APIRouter(
     tags=['user']
 )
 
-db_dependency = Annotated[Session, Depends(get_session)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_session)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_session)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
 
 @router.get('/', status_code=status.HTTP_200_OK)
@@ -23,7 +27,7 @@ async def get_user(user: user_dependency, session: db_dependency):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
     statement = select(User).where(User.id == user.get('id'))
-    user_model = session.exec(statement).one_or_none()
+    user_model = (await session.exec(statement)).one_or_none()
     if user_model is not None:
         return user_model
     raise HTTPException(status_code=404, detail='User not found')
@@ -33,15 +37,12 @@ async def get_me(current_user: dict = Depends(get_current_user)):
     return current_user
 
 
-@router.get('/all', status_code=status.HTTP_200_OK)
-async def get_users(user: user_dependency, session: db_dependency):
+@router.get('/all', status_code=status.HTTP_200_OK, response_model=page_model(User, exclude=("hashed_password",)))
+async def get_users(user: user_dependency, page: Annotated[PageParams, Depends()], session: read_db_dependency):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
-    statement = select(User)
-    user_model = session.exec(statement).all()
-    if user_model is not None:
-        return user_model
-    raise HTTPException(status_code=404, detail='User not found')
+    # password hashes never leave the server, whatever fields= asks for
+    return ORJSONResponse(await keyset_page(session, User, page, exclude=("hashed_password",)))
 
 @router.put("/change-password", status_code=status.HTTP_204_NO_CONTENT)
 async def change_passwords(user_change_password: UserChangePassword,
@@ -51,15 +52,18 @@ async def change_passwords(user_change_password: UserChangePassword,
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication Failed')
 
     statement = select(User).where(User.id == user.get('id'))
-    user_model = session.exec(statement).one_or_none()
+    user_model = (await session.exec(statement)).one_or_none()
     if user_model is None:
         raise HTTPException(status_code=404, detail='User not found.')
+    # hand the connection back to the pool while bcrypt runs
+    await session.commit()
 
-    if not bcrypt_context.verify(user_change_password.password, user_model.hashed_password):
+    valid, _ = await verify_password(user_change_password.password, user_model.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail='Error on password change.')
 
-    user_model.hashed_password = bcrypt_context.hash(user_change_password.new_password)
+    user_model.hashed_password = await hash_password(user_change_password.new_password)
 
     session.add(user_model)
-    session.commit()
-    session.refresh(user_model)
\ No newline at end of file
+    await session.commit()
+    await session.refresh(user_model)
\ No newline at end of file
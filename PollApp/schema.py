@@ -0,0 +1,162 @@
+"""Getting the database schema in place before the app serves requests.
+
+SCHEMA_MODE picks what the app does at boot:
+
+- ``create`` (default): on an empty database, ``SQLModel.metadata.create_all``
+  and a stamp at the newest migration, so Alembic can take over from there.
+  On a stamped database, the ``check`` below. It refuses a database that has
+  the app's tables but no Alembic revision: ``create_all`` would only add the
+  missing tables, empty, and not the constraints or backfills the migrations
+  bring.
+- ``check``: one query comparing the database's Alembic revision with the
+  newest migration in ``alembic/versions``; refuses to start if they differ.
+- ``skip``: nothing; for deploys that run migrations in a release step.
+
+Migrations run outside the serving process::
+
+    alembic upgrade head              # release step
+    python -m PollApp.schema          # exits 1 unless the database is at head
+
+A database created before ``create`` stamped its revision is upgraded once
+with ``alembic stamp 0001 && alembic upgrade head`` (see ``alembic/README``).
+"""
+import os
+
+SCHEMA_MODE = os.getenv("SCHEMA_MODE", "create").lower()
+MIGRATIONS_DIR = os.getenv(
+    "MIGRATIONS_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic", "versions")
+)
+
+SCHEMA_MODES = ("create", "check", "skip")
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def _revision_ids(path: str) -> tuple[str | None, set[str]]:
+    """``revision`` and ``down_revision`` of one migration file, read without importing it."""
+    import ast
+
+    values = {}
+    for node in ast.parse(open(path).read(), path).body:
+        if isinstance(node, ast.AnnAssign):
+            targets, value = [node.target], node.value
+        elif isinstance(node, ast.Assign):
+            targets, value = node.targets, node.value
+        else:
+            continue
+        for target in targets:
+            if isinstance(target, ast.Name) and target.id in ("revision", "down_revision") and value is not None:
+                values[target.id] = ast.literal_eval(value)
+    down = values.get("down_revision")
+    return values.get("revision"), {down} if isinstance(down, str) else set(down or ())
+
+
+def head_revisions() -> set[str]:
+    # parsed rather than loaded through alembic, which alone takes longer to import than the check takes to run
+    import glob
+
+    revisions, parents = set(), set()
+    for path in glob.glob(os.path.join(MIGRATIONS_DIR, "*.py")):
+        revision, down = _revision_ids(path)
+        if revision is not None:
+            revisions.add(revision)
+            parents |= down
+    return revisions - parents
+
+
+def current_revisions() -> set[str]:
+    from sqlalchemy import text
+    from sqlalchemy.exc import DBAPIError
+
+    from PollApp.database import get_engine
+
+    try:
+        with get_engine().connect() as connection:
+            return {row[0] for row in connection.execute(text("SELECT version_num FROM alembic_version"))}
+    except DBAPIError:
+        return set()  # never migrated: no alembic_version table
+
+
+LEGACY_UPGRADE = "alembic stamp 0001 && alembic upgrade head"
+
+
+def check_schema():
+    """Raise ``SchemaOutOfDate`` unless the database is at the latest migration."""
+    expected, current = head_revisions(), current_revisions()
+    if current != expected:
+        raise SchemaOutOfDate(
+            f"database schema is at {', '.join(sorted(current)) or 'no revision'}, expected "
+            f"{', '.join(sorted(expected))}; run `alembic upgrade head` "
+            f"(`{LEGACY_UPGRADE}` on a database the app created without a revision)"
+        )
+
+
+def _existing_tables(connection) -> set[str]:
+    from sqlalchemy import inspect
+
+    # SQLite has no schemas; see database.py's schema_translate_map
+    return set(inspect(connection).get_table_names(schema=None if connection.dialect.name == "sqlite" else "public"))
+
+
+def _stamp(connection, revisions: set[str]):
+    """What ``alembic stamp`` writes, without importing alembic."""
+    from sqlalchemy import Column, MetaData, PrimaryKeyConstraint, String, Table, insert
+
+    table = Table("alembic_version", MetaData(), Column("version_num", String(32), nullable=False),
+                  PrimaryKeyConstraint("version_num", name="alembic_version_pkc"))
+    table.create(connection, checkfirst=True)
+    connection.execute(insert(table), [{"version_num": revision} for revision in sorted(revisions)])
+
+
+def create_schema():
+    """Create and stamp an empty database; otherwise the same as ``check_schema``."""
+    from sqlmodel import SQLModel
+    from sqlalchemy.exc import DBAPIError
+
+    import PollApp.models  # puts the app's tables on SQLModel.metadata
+    from PollApp.database import create_db_and_tables, get_engine
+
+    if current_revisions():
+        check_schema()
+        return
+    with get_engine().connect() as connection:
+        existing = _existing_tables(connection) & {table.name for table in SQLModel.metadata.sorted_tables}
+    if existing:
+        raise SchemaOutOfDate(
+            f"database has the app's tables ({', '.join(sorted(existing))}) but no migration revision; "
+            f"run `{LEGACY_UPGRADE}` to bring it up to date"
+        )
+
+    create_db_and_tables()
+    try:
+        with get_engine().begin() as connection:
+            _stamp(connection, head_revisions())
+    except DBAPIError:
+        # another worker booting against the same empty database stamped it first
+        check_schema()
+
+
+def prepare_schema(mode: str = SCHEMA_MODE):
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"SCHEMA_MODE must be one of {', '.join(SCHEMA_MODES)}, not {mode!r}")
+    if mode == "create":
+        create_schema()
+    elif mode == "check":
+        check_schema()
+
+
+def main():
+    import sys
+
+    try:
+        check_schema()
+    except SchemaOutOfDate as exc:
+        print(exc, file=sys.stderr)
+        sys.exit(1)
+    print(f"database schema is at head ({', '.join(sorted(head_revisions()))})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Where a cold start's time goes, printed once the app is ready to serve.
+
+``PollApp.main`` imports this module first, so the clock starts before
+FastAPI, SQLAlchemy and the routers load. Each phase is the time since the
+previous ``mark``. With STARTUP_IMPORT_TIMES=N the N slowest imports made
+while booting are listed as well: inclusive time per module, as
+``python -X importtime`` counts it, for the modules the app imports itself.
+"""
+import builtins
+import os
+import sys
+import time
+
+# list this many of the slowest imports in the startup report; 0 skips timing imports
+STARTUP_IMPORT_TIMES = int(os.getenv("STARTUP_IMPORT_TIMES", "0"))
+
+_started = time.perf_counter()
+_last = _started
+phases: list[tuple[str, float]] = []
+import_times: dict[str, float] = {}
+_ready = None
+_answered = False
+
+_original_import = builtins.__import__
+_depth = 0
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    _depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        if _depth == 0:
+            import_times[name] = import_times.get(name, 0.0) + time.perf_counter() - started
+
+
+if STARTUP_IMPORT_TIMES:
+    builtins.__import__ = _timed_import
+
+
+def _process_age() -> float | None:
+    """Seconds since this process was started (Linux only), so interpreter and server startup count too."""
+    try:
+        with open("/proc/self/stat") as f:
+            started_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - started_ticks / os.sysconf("SC_CLK_TCK")
+
+
+_before_import = _process_age()
+
+
+def mark(phase: str):
+    global _last
+    now = time.perf_counter()
+    phases.append((phase, now - _last))
+    _last = now
+
+
+def ready():
+    """Print the startup report; called by the lifespan once the app can serve."""
+    global _ready
+    mark("lifespan")
+    _ready = time.perf_counter()
+    builtins.__import__ = _original_import
+
+    total = _ready - _started
+    prefix = f"{_before_import:.3f}s interpreter and server, " if _before_import is not None else ""
+    print(f"startup: ready in {total + (_before_import or 0):.3f}s ({prefix}"
+          + ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in phases) + ")", flush=True)
+    if import_times:
+        slowest = sorted(import_times.items(), key=lambda item: item[1], reverse=True)[:STARTUP_IMPORT_TIMES]
+        print("startup: slowest imports: " + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in slowest),
+              flush=True)
+
+
+def answered():
+    """Note the first response served; called by the metrics middleware."""
+    global _answered
+    if _answered or _ready is None:
+        return
+    _answered = True
+    since_ready = time.perf_counter() - _ready
+    print(f"startup: first response {since_ready:.3f}s after ready", flush=True)
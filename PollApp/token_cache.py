@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# 0 disables the cache and decodes the JWT on every request
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+# redis://... shares revocations between workers; unset keeps them in this process
+TOKEN_REVOCATION_URL = os.getenv("TOKEN_REVOCATION_URL")
+# how often a cached token is re-checked against a shared revocation store
+TOKEN_REVOCATION_RECHECK_SECONDS = float(os.getenv("TOKEN_REVOCATION_RECHECK_SECONDS", "5"))
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class InMemoryRevocationStore:
+    shared = False
+
+    def __init__(self):
+        self._revoked: dict[str, float] = {}
+
+    async def revoke(self, key: str, expires_at: float):
+        now = time.time()
+        # nothing needs remembering once the token would have expired anyway
+        self._revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+        self._revoked[key] = expires_at
+
+    async def is_revoked(self, key: str) -> bool:
+        expires_at = self._revoked.get(key)
+        return expires_at is not None and expires_at > time.time()
+
+
+class RedisRevocationStore:
+    shared = True
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("TOKEN_REVOCATION_URL requires the 'redis' package")
+        self._redis = redis.from_url(url)
+
+    async def revoke(self, key: str, expires_at: float):
+        await self._redis.set(f"revoked-token:{key}", 1, ex=max(1, int(expires_at - time.time())))
+
+    async def is_revoked(self, key: str) -> bool:
+        return bool(await self._redis.exists(f"revoked-token:{key}"))
+
+
+class VerifiedTokenCache:
+    """LRU of verified token payloads keyed by token hash, evicted at the token's ``exp``.
+
+    Revocations made in this process evict immediately; a shared store is
+    consulted again at most every ``recheck_seconds`` per cached token.
+    """
+
+    def __init__(self, maxsize: int, revocations, recheck_seconds: float):
+        self.maxsize = maxsize
+        self.revocations = revocations
+        self.recheck_seconds = recheck_seconds if revocations.shared else float("inf")
+        self._entries: OrderedDict[str, list] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, token: str, verify) -> dict:
+        """Return the payload for ``token``, calling ``verify(token) -> (payload, exp)`` on a miss."""
+        key = token_key(token)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            payload, expires_at = verify(token)
+            entry = [payload, expires_at, float("-inf")]
+            if self.maxsize > 0:
+                with self._lock:
+                    self._entries[key] = entry
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+
+        if now - entry[2] >= self.recheck_seconds:
+            if await self.revocations.is_revoked(key):
+                self.evict(key)
+                return None
+            entry[2] = now
+
+        return entry[0]
+
+    async def revoke(self, token: str, expires_at: float):
+        key = token_key(token)
+        self.evict(key)
+        await self.revocations.revoke(key, expires_at)
+
+    def evict(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+token_cache = VerifiedTokenCache(
+    TOKEN_CACHE_SIZE,
+    RedisRevocationStore(TOKEN_REVOCATION_URL) if TOKEN_REVOCATION_URL else InMemoryRevocationStore(),
+    TOKEN_REVOCATION_RECHECK_SECONDS,
+)
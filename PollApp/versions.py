@@ -0,0 +1,33 @@
+"""Per-competition version numbers, so a client's cached copy can be validated without rebuilding it.
+
+Kept in the database rather than in worker memory, so every worker agrees on
+them: a write handled by one worker makes the ETags every other worker hands
+out for that competition stale too.
+
+Bumped in a transaction of its own after the write commits, the same point the
+response cache is invalidated at, so ballots don't queue on one hot row.
+Readers look the version up before reading anything else, so a response is
+never labelled with a version newer than its data.
+"""
+from PollApp.database import dialect_insert, get_async_engine, get_engine, open_session
+from PollApp.models import CompetitionVersions
+
+
+async def current_version(session, competition_id: int) -> int:
+    versions = await session.get(CompetitionVersions, competition_id)
+    return versions.version if versions is not None else 0
+
+
+async def bump_version(competition_id: int):
+    session = open_session(get_async_engine() or get_engine())
+    try:
+        statement = dialect_insert(session, CompetitionVersions.__table__).values(
+            competition_id=competition_id, version=1
+        )
+        await session.exec(statement.on_conflict_do_update(
+            index_elements=["competition_id"],
+            set_={"version": statement.table.c.version + 1},
+        ))
+        await session.commit()
+    finally:
+        await session.close()
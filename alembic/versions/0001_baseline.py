@@ -0,0 +1,87 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('role', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        schema='public',
+    )
+    op.create_index(op.f('ix_public_users_username'), 'users', ['username'], unique=True, schema='public')
+    op.create_table(
+        'competitions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('desc', sa.String(), nullable=False),
+        sa.Column('creator_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        schema='public',
+    )
+    op.create_table(
+        'competition_participants',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('competition_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['competition_id'], ['public.competitions.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['public.users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        schema='public',
+    )
+    op.create_table(
+        'participant_scores',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('competition_id', sa.Integer(), nullable=False),
+        sa.Column('scorer_id', sa.Integer(), nullable=False),
+        sa.Column('scored_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=False),
+        sa.Column('feedback', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['competition_id'], ['public.competitions.id']),
+        sa.ForeignKeyConstraint(['scored_id'], ['public.users.id']),
+        sa.ForeignKeyConstraint(['scorer_id'], ['public.users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        schema='public',
+    )
+    op.create_table(
+        'polls',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('poll_by', sa.String(), nullable=False),
+        sa.Column('poll', sa.Integer(), nullable=False),
+        sa.Column('poll_by_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['poll_by_id'], ['public.users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        schema='public',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('polls', schema='public')
+    op.drop_table('participant_scores', schema='public')
+    op.drop_table('competition_participants', schema='public')
+    op.drop_table('competitions', schema='public')
+    op.drop_index(op.f('ix_public_users_username'), table_name='users', schema='public')
+    op.drop_table('users', schema='public')
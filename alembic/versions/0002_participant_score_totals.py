@@ -0,0 +1,48 @@
+"""participant score totals
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the app's create_all may already have created the (empty) table
+    op.create_table(
+        'participant_score_totals',
+        sa.Column('competition_id', sa.Integer(), nullable=False),
+        sa.Column('scored_id', sa.Integer(), nullable=False),
+        sa.Column('total_score', sa.Integer(), nullable=False),
+        sa.Column('score_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['competition_id'], ['public.competitions.id']),
+        sa.ForeignKeyConstraint(['scored_id'], ['public.users.id']),
+        sa.PrimaryKeyConstraint('competition_id', 'scored_id'),
+        schema='public',
+        if_not_exists=True,
+    )
+
+    # backfill from the existing scores
+    op.execute('DELETE FROM public.participant_score_totals')
+    op.execute(
+        'INSERT INTO public.participant_score_totals (competition_id, scored_id, total_score, score_count) '
+        'SELECT competition_id, scored_id, SUM(score), COUNT(*) FROM public.participant_scores '
+        'GROUP BY competition_id, scored_id'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('participant_score_totals', schema='public')
@@ -0,0 +1,72 @@
+"""score and participant indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # DELETE ... USING is PostgreSQL's, as is the "public" schema every migration here writes to
+    # drop duplicates that slipped in before the constraints existed, keeping the oldest row
+    op.execute(
+        'DELETE FROM public.competition_participants a USING public.competition_participants b '
+        'WHERE a.id > b.id AND a.competition_id = b.competition_id AND a.user_id = b.user_id'
+    )
+    op.execute(
+        'DELETE FROM public.participant_scores a USING public.participant_scores b '
+        'WHERE a.id > b.id AND a.competition_id = b.competition_id '
+        'AND a.scorer_id = b.scorer_id AND a.scored_id = b.scored_id'
+    )
+    op.execute('DELETE FROM public.participant_score_totals')
+    op.execute(
+        'INSERT INTO public.participant_score_totals (competition_id, scored_id, total_score, score_count) '
+        'SELECT competition_id, scored_id, SUM(score), COUNT(*) FROM public.participant_scores '
+        'GROUP BY competition_id, scored_id'
+    )
+
+    # the app's create_all may already have created them along with the tables
+    inspector = sa.inspect(op.get_bind())
+    unique = {
+        constraint['name']
+        for table in ('competition_participants', 'participant_scores')
+        for constraint in inspector.get_unique_constraints(table, schema='public')
+    }
+    indexes = {index['name'] for index in inspector.get_indexes('participant_scores', schema='public')}
+    if 'uq_competition_participants_competition_user' not in unique:
+        op.create_unique_constraint(
+            'uq_competition_participants_competition_user', 'competition_participants',
+            ['competition_id', 'user_id'], schema='public',
+        )
+    if 'uq_participant_scores_competition_scorer_scored' not in unique:
+        op.create_unique_constraint(
+            'uq_participant_scores_competition_scorer_scored', 'participant_scores',
+            ['competition_id', 'scorer_id', 'scored_id'], schema='public',
+        )
+    if 'ix_participant_scores_competition_scored' not in indexes:
+        op.create_index(
+            'ix_participant_scores_competition_scored', 'participant_scores',
+            ['competition_id', 'scored_id'], unique=False, schema='public',
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_participant_scores_competition_scored', table_name='participant_scores', schema='public')
+    op.drop_constraint('uq_participant_scores_competition_scorer_scored', 'participant_scores',
+                       type_='unique', schema='public')
+    op.drop_constraint('uq_competition_participants_competition_user', 'competition_participants',
+                       type_='unique', schema='public')
@@ -0,0 +1,38 @@
+"""competition ranking settings
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the app's create_all may already have created the (empty) table
+    op.create_table(
+        'competition_ranking_settings',
+        sa.Column('competition_id', sa.Integer(), nullable=False),
+        sa.Column('method', sa.String(), nullable=False),
+        sa.Column('trim', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['competition_id'], ['public.competitions.id']),
+        sa.PrimaryKeyConstraint('competition_id'),
+        schema='public',
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('competition_ranking_settings', schema='public')
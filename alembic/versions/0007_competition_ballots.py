@@ -0,0 +1,48 @@
+"""competition ballots
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the app's create_all may already have created the (empty) table
+    op.create_table(
+        'competition_ballots',
+        sa.Column('competition_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('scored_count', sa.Integer(), nullable=False),
+        sa.Column('submitted_at', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['competition_id'], ['public.competitions.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['public.users.id']),
+        sa.PrimaryKeyConstraint('competition_id', 'user_id'),
+        schema='public',
+        if_not_exists=True,
+    )
+
+    # backfill from the existing scores; when they were submitted was never recorded
+    op.execute('DELETE FROM public.competition_ballots')
+    op.execute(
+        'INSERT INTO public.competition_ballots (competition_id, user_id, scored_count, submitted_at) '
+        'SELECT competition_id, scorer_id, COUNT(*), NULL FROM public.participant_scores '
+        'GROUP BY competition_id, scorer_id'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('competition_ballots', schema='public')
@@ -0,0 +1,63 @@
+"""Before/after throughput of the threadpool (sync driver) and native async session modes.
+
+    python -m benchmarks.async_db --requests 400 --concurrency 50
+
+Seeds one database, then runs the same load once per ``DATABASE_ASYNC`` value
+in a fresh interpreter (the engine is chosen at import time).
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks import common
+
+ENDPOINTS = [
+    ("GET", "/competitions/"),
+    ("GET", "/competitions/1"),
+    ("GET", "/competitions/1/scores"),
+]
+
+
+async def _measure(requests: int, concurrency: int) -> list[dict]:
+    rows = []
+    async with common.client() as http:
+        for method, path in ENDPOINTS:
+            await http.request(method, path)  # warm up
+            latencies, elapsed = await common.run_load(http, method, path, requests, concurrency)
+            rows.append(common.summarize(f"{path}", latencies, elapsed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--participants", type=int, default=60)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        common.configure()
+        print(json.dumps(asyncio.run(_measure(args.requests, args.concurrency))))
+        return
+
+    common.configure()
+    common.seed(participants=args.participants)
+
+    for mode in ("false", "true"):
+        env = dict(os.environ, DATABASE_ASYNC=mode)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.async_db", "--child",
+             "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        rows = json.loads(output.strip().splitlines()[-1])
+        print(f"\nDATABASE_ASYNC={mode}")
+        common.print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Per-request cost of resolving the session cookie, with and without the verified-token cache.
+
+    python -m benchmarks.auth_overhead --calls 20000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import common
+
+
+class _Request:
+    def __init__(self, token: str):
+        self.cookies = {"access_token": token}
+
+
+async def _resolve(get_current_user, token: str, calls: int) -> float:
+    request = _Request(token)
+    started = time.perf_counter()
+    for _ in range(calls):
+        await get_current_user(request)
+    return time.perf_counter() - started
+
+
+async def _measure(calls: int, requests: int) -> list[dict]:
+    from PollApp.routers import auth
+    from PollApp.token_cache import token_cache
+
+    token = common.auth_headers(1)["Cookie"].split("=", 1)[1]
+    rows = []
+    for label, size in (("decode every call", 0), ("cached", 10000)):
+        token_cache.maxsize = size
+        elapsed = await _resolve(auth.get_current_user, token, calls)
+        rows.append({"name": f"get_current_user {label}", "requests": calls,
+                     "rps": round(calls / elapsed, 1), "mean_ms": round(elapsed / calls * 1000, 4)})
+
+        async with common.client() as http:
+            latencies, elapsed = await common.run_load(http, "GET", "/user/me", requests, 1)
+        rows.append(common.summarize(f"/user/me {label}", latencies, elapsed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    common.configure()
+    common.seed(users=10, competitions=1, participants=5, scores=False)
+    common.print_table(asyncio.run(_measure(args.calls, args.requests)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Loading "my competitions" against large score tables: progress read from the ballot status vs counted from scores.
+
+    python -m benchmarks.ballot_status --competitions 200 --participants 60
+
+Seeds ``--competitions`` competitions with user 1 in each and a full ballot
+from every member in all but the last ``--unscored``, i.e.
+``participants * (participants - 1)`` score rows per scored competition.
+Then, with the response cache off:
+
+- times the listing statement as it was, the caller's scores counted per
+  competition out of ``participant_scores``, against the one
+  ``GET /competitions/`` runs now, a join to ``competition_ballots``, each
+  straight on the engine; then the endpoint itself;
+- checks both statements give the same count for every competition;
+- sends a ballot, a single score and a score deletion through the API and
+  checks the ballot status still equals a count over the scores, with
+  ``submitted_at`` set by the ballot.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import common
+
+
+def _scanning_statement(user_id: int):
+    """The listing before ``competition_ballots``: the caller's scores grouped per competition."""
+    from sqlmodel import func, select
+    from PollApp.models import CompetitionParticipants, Competitions, ParticipantScores
+
+    my_competitions = select(CompetitionParticipants.competition_id).where(CompetitionParticipants.user_id == user_id)
+    participant_counts = (
+        select(CompetitionParticipants.competition_id, func.count().label("participant_count"))
+        .where(CompetitionParticipants.competition_id.in_(my_competitions))
+        .group_by(CompetitionParticipants.competition_id)
+        .subquery()
+    )
+    scored_counts = (
+        select(ParticipantScores.competition_id, func.count().label("scored_count"))
+        .where(ParticipantScores.competition_id.in_(my_competitions), ParticipantScores.scorer_id == user_id)
+        .group_by(ParticipantScores.competition_id)
+        .subquery()
+    )
+    return (
+        select(Competitions.id, participant_counts.c.participant_count,
+               func.coalesce(scored_counts.c.scored_count, 0).label("scored_count"))
+        .join(participant_counts, participant_counts.c.competition_id == Competitions.id)
+        .outerjoin(scored_counts, scored_counts.c.competition_id == Competitions.id)
+        .order_by(Competitions.id)
+    )
+
+
+def _time_statements(repeats: int) -> list[dict]:
+    from PollApp.database import engine
+    from PollApp.routers.competitions import my_competitions_statement
+
+    rows, results = [], {}
+    for name, statement in (("counted from scores", _scanning_statement(1)),
+                            ("ballot status join", my_competitions_statement(1))):
+        with engine.connect() as conn:
+            conn.execute(statement).all()
+            latencies = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                results[name] = {row.id: row.scored_count for row in conn.execute(statement)}
+                latencies.append(time.perf_counter() - started)
+        rows.append(common.summarize(f"statement: {name}", latencies, sum(latencies)))
+    assert results["counted from scores"] == results["ballot status join"], "the ballot status disagrees"
+    return rows
+
+
+def _ballots_match_scores() -> dict:
+    from sqlmodel import func, select
+    from PollApp.database import engine
+    from PollApp.models import CompetitionBallots, ParticipantScores
+
+    with engine.connect() as conn:
+        counted = dict(((c, u), n) for c, u, n in conn.execute(
+            select(ParticipantScores.competition_id, ParticipantScores.scorer_id, func.count())
+            .group_by(ParticipantScores.competition_id, ParticipantScores.scorer_id)
+        ))
+        kept = {(row.competition_id, row.user_id): row for row in conn.execute(select(CompetitionBallots))}
+    assert counted == {key: row.scored_count for key, row in kept.items()}, "ballot status out of step with scores"
+    return kept
+
+
+async def _measure(args, seeded: dict) -> list[dict]:
+    from PollApp.response_cache import response_cache
+
+    response_cache.enabled = False
+    rows = []
+    async with common.client() as http:
+        latencies, elapsed = await common.run_load(http, "GET", "/competitions/", args.repeats, 1)
+        rows.append(common.summarize("GET /competitions/", latencies, elapsed))
+
+        # user 1 has not voted in the last competition; everyone has in the first
+        open_competition = seeded["competitions"]
+        members = seeded["members"][open_competition]
+        ballot = {"polls": [{"participant_id": m, "score": 6, "feedback": "ok"} for m in members[2:]]}
+        before = time.time()
+        (await http.post(f"/competitions/participant/score/bulk-create/{open_competition}",
+                         json=ballot)).raise_for_status()
+        (await http.post(f"/competitions/participant/score/create/{open_competition}/{members[1]}",
+                         json={"score": 4, "feedback": "late"})).raise_for_status()
+        (await http.delete(f"/competitions/participant/score/1/{seeded['members'][1][1]}")).raise_for_status()
+
+        kept = _ballots_match_scores()
+        assert kept[(open_competition, 1)].scored_count == len(members) - 1
+        assert kept[(open_competition, 1)].submitted_at >= before, "submitted_at was not stamped"
+        listing = (await http.get("/competitions/")).json()
+        polled = {c["id"]: c for c in listing["has_been_polled"]}
+        assert polled[open_competition]["completion"] == 1.0, polled[open_competition]
+        print(f"after a ballot, a score and a deletion: {len(kept)} ballot rows agree with the scores")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--competitions", type=int, default=200)
+    parser.add_argument("--participants", type=int, default=60)
+    parser.add_argument("--unscored", type=int, default=20, help="competitions nobody has voted in yet")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    common.configure()
+    seeded = common.seed(users=args.participants * 5, competitions=args.competitions,
+                         participants=args.participants, unscored_competitions=args.unscored)
+    print(f"seeded {seeded['scores']} scores")
+    _ballots_match_scores()
+    rows = _time_statements(args.repeats)
+    rows += asyncio.run(_measure(args, seeded))
+    common.print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
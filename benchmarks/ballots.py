@@ -0,0 +1,52 @@
+"""Latency of ``bulk-create`` for full ballots of 50-200 items.
+
+    python -m benchmarks.ballots --participants 201
+
+Every member of one competition submits a ballot scoring everyone else,
+``--concurrency`` ballots at a time.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import common
+
+
+async def _measure(members: list[int], ballot_size: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def submit(http, scorer):
+        targets = [m for m in members if m != scorer][:ballot_size]
+        body = {"polls": [{"participant_id": t, "score": 1, "feedback": "ok"} for t in targets]}
+        async with semaphore:
+            started = time.perf_counter()
+            response = await http.post(
+                "/competitions/participant/score/bulk-create/1", json=body, headers=common.auth_headers(scorer)
+            )
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+            assert response.json()["count"] == len(targets), response.text
+
+    async with common.client() as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(submit(http, scorer) for scorer in members))
+        elapsed = time.perf_counter() - started
+    return common.summarize(f"ballot of {ballot_size}", latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--participants", type=int, default=201)
+    parser.add_argument("--ballot-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    common.configure()
+    seeded = common.seed(users=args.participants, competitions=1, participants=args.participants, scores=False)
+    row = asyncio.run(_measure(seeded["members"][1], args.ballot_size, args.concurrency))
+    common.print_table([row])
+
+
+if __name__ == "__main__":
+    main()
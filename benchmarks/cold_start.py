@@ -0,0 +1,99 @@
+"""Time to first response from a freshly started uvicorn worker, per schema mode.
+
+    python -m benchmarks.cold_start --boots 10
+    DATABASE_URL=postgresql://localhost/pollapp_bench python -m benchmarks.cold_start --modes create,check
+    python -m benchmarks.cold_start --app-dir ../other-checkout   # the same against another commit
+
+Each boot starts ``uvicorn PollApp.main:app`` in a subprocess and polls
+``GET /`` until it answers ("first response", measured from spawning the
+process), then logs in ("first login": the first request that needs the
+database and bcrypt). The seeded database is stamped at the Alembic head so
+``SCHEMA_MODE=check`` can start. Modes take turns boot by boot; the last
+boot's startup report per mode is printed below the table.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks import common
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _boot(mode: str, app_dir: str, timeout: float) -> tuple[float, float, str]:
+    import httpx
+
+    port = _free_port()
+    env = {**os.environ, "SCHEMA_MODE": mode}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "PollApp.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=app_dir, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as http:
+            while True:
+                if server.poll() is not None or time.perf_counter() - started > timeout:
+                    raise RuntimeError(f"uvicorn did not answer (SCHEMA_MODE={mode}): {server.communicate()[0]}")
+                try:
+                    if http.get("/").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            first_response = time.perf_counter() - started
+            http.post("/auth/token", data={"username": "user1", "password": "password"}).raise_for_status()
+            first_login = time.perf_counter() - started
+    finally:
+        server.terminate()
+        output = server.communicate()[0]
+    report = "\n".join(line for line in output.splitlines() if line.startswith("startup:"))
+    return first_response, first_login, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boots", type=int, default=10, help="worker starts per mode")
+    parser.add_argument("--modes", default="create,check,skip", help="comma-separated SCHEMA_MODE values")
+    parser.add_argument("--app-dir", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help="checkout to start the app from")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--import-times", type=int, default=8, help="STARTUP_IMPORT_TIMES for the report")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    common.configure(BCRYPT_ROUNDS=args.bcrypt_rounds, STARTUP_IMPORT_TIMES=args.import_times)
+    common.seed(users=20, competitions=2, participants=10)
+    common.set_password("password")
+
+    from alembic import command
+    from alembic.config import Config
+
+    command.stamp(Config(os.path.join(args.app_dir, "alembic.ini")), "head")
+
+    modes = [m for m in args.modes.split(",") if m]
+    responses, logins, reports = {m: [] for m in modes}, {m: [] for m in modes}, {}
+    # modes take turns, so drift in machine load hits them all alike
+    for _ in range(args.boots):
+        for mode in modes:
+            first_response, first_login, reports[mode] = _boot(mode, args.app_dir, args.timeout)
+            responses[mode].append(first_response)
+            logins[mode].append(first_login)
+
+    rows = []
+    for mode in modes:
+        rows.append(common.summarize(f"{mode}: first response", responses[mode], sum(logins[mode])))
+        rows.append(common.summarize(f"{mode}: first login", logins[mode], sum(logins[mode])))
+    common.print_table(rows)
+    for mode, report in reports.items():
+        print(f"\nSCHEMA_MODE={mode}, last boot:\n{report}")
+
+
+if __name__ == "__main__":
+    main()
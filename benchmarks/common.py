@@ -0,0 +1,182 @@
+"""Shared helpers for the benchmark scripts.
+
+Every benchmark runs the ASGI app in-process against a throwaway SQLite
+database (or whatever ``DATABASE_URL`` already points at), so results can be
+compared across commits on the same machine.
+"""
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+
+
+def configure(**env) -> str:
+    """Point the app at a scratch database. Must run before importing ``PollApp``."""
+    if "DATABASE_URL" not in os.environ:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="pollapp-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    # every simulated client shares one address; benchmarks/rate_limit.py turns the limits back on
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    for key, value in env.items():
+        os.environ[key] = str(value)
+    return os.environ["DATABASE_URL"]
+
+
+def seed(users: int = 200, competitions: int = 5, participants: int = 50, scores: bool = True,
+         seed_value: int = 42, unscored_competitions: int = 0) -> dict:
+    """Insert users, competitions and a full ballot from every participant into an empty database.
+
+    Each competition gets ``participants`` members and every member scores every
+    other member, i.e. ``participants * (participants - 1)`` score rows, unless
+    ``scores`` is false. The last ``unscored_competitions`` competitions get
+    members but no ballots, leaving room for write benchmarks.
+    """
+    from sqlalchemy import insert
+    from PollApp.database import engine, create_db_and_tables
+    from PollApp.leaderboard import rebuild_ballots, rebuild_score_totals
+    from PollApp.models import User, Competitions, CompetitionParticipants, ParticipantScores
+
+    rng = random.Random(seed_value)
+    create_db_and_tables()
+
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"email": f"user{i}@example.com", "username": f"user{i}",
+             "hashed_password": "x", "role": "user"}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(insert(Competitions.__table__), [
+            {"title": f"Competition {c}", "desc": "benchmark", "creator_id": 1}
+            for c in range(1, competitions + 1)
+        ])
+
+        members = {}
+        score_rows = []
+        score_count = 0
+        for c in range(1, competitions + 1):
+            members[c] = [1] + rng.sample(range(2, users + 1), participants - 1)
+            conn.execute(insert(CompetitionParticipants.__table__),
+                         [{"competition_id": c, "user_id": u} for u in members[c]])
+            # flushed in chunks so a million-row ballot never sits in memory at once
+            for scorer in members[c] if scores and c <= competitions - unscored_competitions else []:
+                score_rows.extend(
+                    {"competition_id": c, "scorer_id": scorer, "scored_id": scored,
+                     "score": rng.randint(1, 10), "feedback": f"feedback from {scorer}"}
+                    for scored in members[c] if scored != scorer
+                )
+                if len(score_rows) >= 10_000:
+                    conn.execute(insert(ParticipantScores.__table__), score_rows)
+                    score_count += len(score_rows)
+                    score_rows = []
+        if score_rows:
+            conn.execute(insert(ParticipantScores.__table__), score_rows)
+            score_count += len(score_rows)
+        rebuild_score_totals(conn)
+        rebuild_ballots(conn)
+
+    return {"users": users, "competitions": competitions, "members": members, "scores": score_count}
+
+
+def set_password(password: str = "password"):
+    """Give every seeded user the same real bcrypt hash, for scenarios that log in."""
+    from sqlalchemy import update
+    from PollApp.database import engine
+    from PollApp.models import User
+    from PollApp.passwords import crypt_context
+
+    with engine.begin() as conn:
+        conn.execute(update(User).values(hashed_password=crypt_context().hash(password)))
+
+
+def auth_headers(user_id: int, username: str | None = None, role: str = "user") -> dict:
+    """Cookie header for a request made on behalf of another user than the client's."""
+    from PollApp.routers.auth import create_access_token
+
+    token = create_access_token(username or f"user{user_id}", user_id, role, timedelta(hours=1))
+    return {"Cookie": f"access_token={token}"}
+
+
+@contextmanager
+def statements():
+    """Collects the SQL run inside the block, on whichever engine serves the app."""
+    from sqlalchemy import event
+    from PollApp.database import get_async_engine, get_engine
+
+    engine = get_async_engine().sync_engine if get_async_engine() is not None else get_engine()
+    seen = []
+
+    def collect(conn, cursor, statement, *args):
+        seen.append(statement)
+
+    event.listen(engine, "before_cursor_execute", collect)
+    try:
+        yield seen
+    finally:
+        event.remove(engine, "before_cursor_execute", collect)
+
+
+@asynccontextmanager
+async def client(user_id: int = 1, username: str = "user1", role: str = "user"):
+    """An ``httpx.AsyncClient`` talking to the app in-process, logged in as ``user_id``."""
+    import httpx
+    from PollApp.database import dispose_engines
+    from PollApp.main import app
+    from PollApp.routers.auth import create_access_token
+
+    token = create_access_token(username, user_id, role, timedelta(hours=1))
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://benchmark",
+        cookies={"access_token": token},
+    ) as http:
+        yield http
+
+    # ASGITransport does not run the lifespan, so release aiosqlite/asyncpg worker threads here
+    await dispose_engines()
+
+
+async def run_load(http, method: str, path: str, requests: int, concurrency: int, **kwargs):
+    """Fire ``requests`` calls with at most ``concurrency`` in flight; return (latencies, elapsed)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await http.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.is_error:  # a 304 is a successful revalidation
+                response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+def summarize(name: str, latencies: list[float], elapsed: float) -> dict:
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    return {
+        "name": name,
+        "requests": len(ordered),
+        "rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+        "p50_ms": round(pct(50), 2),
+        "p95_ms": round(pct(95), 2),
+        "p99_ms": round(pct(99), 2),
+    }
+
+
+def print_table(rows: list[dict]):
+    columns = ["name", "requests", "rps", "mean_ms", "p50_ms", "p95_ms", "p99_ms"]
+    print(" | ".join(f"{c:>24}" if c == "name" else f"{c:>10}" for c in columns))
+    for row in rows:
+        print(" | ".join(f"{str(row.get(c, '')):>24}" if c == "name" else f"{str(row.get(c, '')):>10}" for c in columns))
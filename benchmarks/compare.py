@@ -0,0 +1,77 @@
+"""Diff two ``benchmarks.suite`` reports, scenario by scenario.
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/head.json --fail-over 10
+
+Latency deltas are positive when the head is slower, throughput deltas when it
+is faster. With ``--fail-over PCT`` the exit status is 1 if any p95 got more
+than PCT percent slower, so the comparison can gate a CI job.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "rps")
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _delta(base: float, head: float) -> float | None:
+    return round((head - base) / base * 100, 1) if base else None
+
+
+def compare(base: dict, head: dict) -> list[dict]:
+    base_rows = {(row["scenario"], row["name"]): row for row in base["results"]}
+    rows = []
+    for row in head["results"]:
+        before = base_rows.get((row["scenario"], row["name"]))
+        if before is None:
+            continue
+        rows.append({"name": row["name"], **{
+            metric: (before[metric], row[metric], _delta(before[metric], row[metric])) for metric in METRICS
+        }})
+    return rows
+
+
+def _describe(report: dict) -> str:
+    env, scale = report["environment"], report["scale"]
+    commit = (env["commit"] or "unknown")[:12] + ("+dirty" if env["dirty"] else "")
+    return f"{commit} on {env['database']}, scale {scale['name']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--fail-over", type=float, help="fail if any p95 regressed by more than this percentage")
+    args = parser.parse_args()
+
+    base, head = _load(args.base), _load(args.head)
+    print(f"base: {_describe(base)}\nhead: {_describe(head)}")
+    for section in ("scale", "environment"):
+        keys = ("database", "database_async", "cpus") if section == "environment" else base[section].keys()
+        differing = [key for key in keys if base[section].get(key) != head[section].get(key)]
+        if differing:
+            print(f"warning: {section} differs ({', '.join(differing)}); numbers are not directly comparable")
+
+    print(" | ".join([f"{'name':>24}"] + [f"{metric:>24}" for metric in METRICS]))
+    regressions = []
+    for row in compare(base, head):
+        cells = []
+        for metric in METRICS:
+            before, after, delta = row[metric]
+            cells.append(f"{f'{before} -> {after} ({delta:+}%)' if delta is not None else f'{before} -> {after}':>24}")
+        print(" | ".join([f"{row['name']:>24}"] + cells))
+        p95_delta = row["p95_ms"][2]
+        if args.fail_over is not None and p95_delta is not None and p95_delta > args.fail_over:
+            regressions.append(f"{row['name']} p95 {p95_delta:+}%")
+
+    if regressions:
+        print(f"regressed beyond {args.fail_over}%: {'; '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
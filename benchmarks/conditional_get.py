@@ -0,0 +1,123 @@
+"""Compression and version-ETag revalidation for leaderboards and lists.
+
+    python -m benchmarks.conditional_get --participants 300 --requests 500 --concurrency 20
+
+Reports the body size per Accept-Encoding for each path and the latency of
+serving it. Then, with the response cache off (every worker's cache cold),
+revalidates with the ETag of the current version and checks that:
+
+- the answer is a 304 that read no score or participant rows, only the
+  version;
+- a write made behind this worker's back (another worker: rows committed
+  and the version bumped, this worker's cache untouched) turns the next
+  revalidation into a 200 with the new data, even with the cache on.
+"""
+import argparse
+import asyncio
+
+from benchmarks import common
+
+PATHS = {
+    "detail": "/competitions/1",
+    "scores": "/competitions/1/scores",
+    "scores+feedback": "/competitions/1/scores?include_feedback=true",
+    "competitions page": "/competitions/all?limit=1000",
+    "users page": "/user/all?limit=1000",
+}
+ENCODINGS = ("identity", "gzip", "br")
+
+
+async def _sizes(http, requests: int, concurrency: int) -> list[dict]:
+    from PollApp.compression import COMPRESSION_MINIMUM_SIZE
+
+    rows = []
+    for name, path in PATHS.items():
+        sizes = []
+        for encoding in ENCODINGS:
+            headers = {"Accept-Encoding": encoding}
+            response = await http.get(path, headers=headers)
+            response.raise_for_status()
+            expected = encoding if len(response.content) >= COMPRESSION_MINIMUM_SIZE else "identity"
+            assert response.headers.get("content-encoding", "identity") == expected, (path, encoding)
+            # httpx hands back the decoded body; what crossed the wire is counted separately
+            sizes.append(f"{encoding} {response.num_bytes_downloaded}")
+            latencies, elapsed = await common.run_load(http, "GET", path, requests, concurrency, headers=headers)
+            rows.append(common.summarize(f"{name} {encoding}", latencies, elapsed))
+        print(f"{name}: bytes on the wire: " + ", ".join(sizes))
+    return rows
+
+
+async def _revalidation(http, requests: int, concurrency: int, newcomer: int) -> list[dict]:
+    from PollApp.response_cache import response_cache
+    from PollApp.versions import bump_version
+
+    rows = []
+    response_cache.enabled = False
+    for name in ("detail", "scores"):
+        path = PATHS[name]
+        etag = (await http.get(path)).headers["etag"]
+        headers = {"If-None-Match": etag}
+        with common.statements() as seen:
+            response = await http.get(path, headers=headers)
+        assert response.status_code == 304, response.status_code
+        touched = [s for s in seen if "participant" in s.lower()]
+        assert not touched, f"a 304 read rows: {touched}"
+        latencies, elapsed = await common.run_load(http, "GET", path, requests, concurrency, headers=headers)
+        rows.append(common.summarize(f"{name} 304, cache off", latencies, elapsed))
+        latencies, elapsed = await common.run_load(http, "GET", path, requests, concurrency)
+        rows.append(common.summarize(f"{name} 200, cache off", latencies, elapsed))
+    print(f"a 304 ran {len(seen)} statement(s): {seen}")
+
+    # another worker's write: rows committed and the version bumped, this worker's cached copy left alone
+    response_cache.enabled = True
+    path = PATHS["scores"]
+    before = await http.get(path)
+    etag = before.headers["etag"]
+    from sqlalchemy import insert
+    from PollApp.database import get_engine
+    from PollApp.leaderboard import rebuild_ballots, rebuild_score_totals
+    from PollApp.models import CompetitionParticipants, ParticipantScores
+
+    with get_engine().begin() as conn:
+        conn.execute(insert(CompetitionParticipants.__table__), [{"competition_id": 1, "user_id": newcomer}])
+        conn.execute(insert(ParticipantScores.__table__), [
+            {"competition_id": 1, "scorer_id": 1, "scored_id": newcomer, "score": 10, "feedback": "elsewhere"}
+        ])
+        rebuild_score_totals(conn, 1)
+        rebuild_ballots(conn, 1)
+    await bump_version(1)
+
+    stale = await http.get(path)
+    revalidated = await http.get(path, headers={"If-None-Match": etag})
+    assert stale.json() == before.json(), "the unconditional read was expected to come from this worker's cache"
+    assert revalidated.status_code == 200 and revalidated.headers["etag"] != etag, revalidated.status_code
+    assert any(entry["id"] == newcomer for entry in revalidated.json()), "revalidation missed the other worker's write"
+    print(f"after another worker's write: {etag} -> {revalidated.headers['etag']}")
+    return rows
+
+
+async def _measure(args, seeded: dict) -> list[dict]:
+    from PollApp.response_cache import response_cache
+
+    newcomer = max(set(range(2, seeded["users"] + 1)) - set(seeded["members"][1]))
+    async with common.client() as http:
+        rows = await _sizes(http, args.requests, args.concurrency)
+        rows += await _revalidation(http, args.requests, args.concurrency, newcomer)
+    print(response_cache.stats())
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--participants", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    common.configure()
+    seeded = common.seed(users=args.participants * 2, competitions=1, participants=args.participants)
+    common.print_table(asyncio.run(_measure(args, seeded)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Query plans and timings for the participant/score lookups, with and without the composite indexes.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.explain_indexes --participants 200
+
+On PostgreSQL the "before" pass drops the indexes inside a transaction that is
+rolled back afterwards. SQLite cannot drop inline unique constraints, so only
+the current plans are shown there.
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlmodel import select
+
+from benchmarks import common
+
+INDEXES = [
+    ("participant_scores", "uq_participant_scores_competition_scorer_scored", "constraint"),
+    ("participant_scores", "ix_participant_scores_competition_scored", "index"),
+    ("competition_participants", "uq_competition_participants_competition_user", "constraint"),
+]
+
+
+def _queries(competition_id: int, scorer_id: int, scored_id: int):
+    from PollApp.models import Competitions, CompetitionParticipants, ParticipantScores
+
+    has_polled = (
+        select(ParticipantScores.id)
+        .where(ParticipantScores.competition_id == Competitions.id, ParticipantScores.scorer_id == scorer_id)
+        .exists()
+    )
+    return {
+        "duplicate score check": select(ParticipantScores.id).where(
+            ParticipantScores.competition_id == competition_id,
+            ParticipantScores.scorer_id == scorer_id,
+            ParticipantScores.scored_id == scored_id,
+        ),
+        "has_polled listing": select(Competitions.id, has_polled.label("has_polled"))
+        .join(CompetitionParticipants, CompetitionParticipants.competition_id == Competitions.id)
+        .where(CompetitionParticipants.user_id == scorer_id),
+        "feedback page": select(ParticipantScores.score, ParticipantScores.feedback)
+        .where(ParticipantScores.competition_id == competition_id, ParticipantScores.scored_id == scored_id)
+        .order_by(ParticipantScores.id)
+        .limit(50),
+        "membership check": select(CompetitionParticipants.id).where(
+            CompetitionParticipants.competition_id == competition_id,
+            CompetitionParticipants.user_id == scored_id,
+        ),
+    }
+
+
+def _sql(conn, statement) -> str:
+    translate = conn.get_execution_options().get("schema_translate_map")
+    kwargs = {"schema_translate_map": translate, "render_schema_translate": True} if translate else {}
+    return str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}, **kwargs))
+
+
+def _report(conn, queries: dict, repeat: int) -> dict:
+    explain = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN ANALYZE "
+    timings = {}
+    for name, statement in queries.items():
+        sql = _sql(conn, statement)
+        print(f"--- {name}")
+        for row in conn.exec_driver_sql(explain + sql):
+            print("   ", row[-1])
+
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.exec_driver_sql(sql).all()
+            samples.append(time.perf_counter() - started)
+        timings[name] = statistics.median(samples) * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--competitions", type=int, default=3)
+    parser.add_argument("--participants", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    common.configure()
+    seeded = common.seed(users=args.participants * 2, competitions=args.competitions, participants=args.participants)
+    print(f"seeded {seeded['scores']} scores across {args.competitions} competitions")
+
+    from PollApp.database import engine
+
+    scorer, scored = seeded["members"][1][:2]
+    queries = _queries(1, scorer, scored)
+
+    with engine.connect() as conn:
+        if conn.dialect.name != "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+        print("\n=== with indexes")
+        after = _report(conn, queries, args.repeat)
+
+        before = None
+        if conn.dialect.name != "sqlite":
+            for table, name, kind in INDEXES:
+                if kind == "constraint":
+                    conn.execute(text(f"ALTER TABLE public.{table} DROP CONSTRAINT {name}"))
+                else:
+                    conn.execute(text(f"DROP INDEX public.{name}"))
+            print("\n=== without indexes")
+            before = _report(conn, queries, args.repeat)
+            conn.rollback()
+
+    print(f"\n{'query':>24} | {'before ms':>10} | {'after ms':>10}")
+    for name, after_ms in after.items():
+        before_ms = f"{before[name]:.3f}" if before else "n/a"
+        print(f"{name:>24} | {before_ms:>10} | {after_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Peak Python heap while downloading one large competition: streamed export vs the materialised list.
+
+    python -m benchmarks.export_memory --participants 1001     # ~1M score rows
+
+Peak memory is measured with ``tracemalloc`` around each download only, so the
+seeding step does not count; it slows both paths by the same factor.
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from benchmarks import common
+
+
+async def _download(app, cookie: str, path: str, params: dict) -> tuple[int, float, float]:
+    """Call the ASGI app directly and drop each body chunk on arrival; return bytes, seconds and peak MiB.
+
+    httpx's ASGITransport buffers the whole body before returning, which would
+    hide whether the endpoint itself streams.
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(params).encode(), "server": ("benchmark", 80), "client": ("127.0.0.1", 1),
+        "headers": [(b"host", b"benchmark"), (b"cookie", f"access_token={cookie}".encode())],
+    }
+    received = 0
+    status = None
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    finished.set()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    assert status == 200, status
+    return received, elapsed, (peak - baseline) / 2 ** 20
+
+
+async def _measure(scores: int, skip_list: bool) -> list[tuple]:
+    from PollApp.database import async_engine
+    from PollApp.main import app
+
+    cases = [
+        ("export ndjson", "/competitions/1/export", {"format": "ndjson"}),
+        ("export csv", "/competitions/1/export", {"format": "csv"}),
+        ("export totals csv", "/competitions/1/export", {"format": "csv", "kind": "totals"}),
+    ]
+    if not skip_list:
+        cases.append(("scores?include_feedback", "/competitions/1/scores", {"include_feedback": "true"}))
+
+    cookie = common.auth_headers(1)["Cookie"].split("=", 1)[1]
+    rows = []
+    tracemalloc.start()
+    for name, path, params in cases:
+        received, elapsed, peak = await _download(app, cookie, path, params)
+        rows.append((name, scores, received // 2 ** 20, round(elapsed, 2), round(peak, 1)))
+    tracemalloc.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--participants", type=int, default=1001)
+    parser.add_argument("--skip-list", action="store_true", help="skip the materialising /scores endpoint")
+    args = parser.parse_args()
+
+    common.configure()
+    seeded = common.seed(users=args.participants, competitions=1, participants=args.participants)
+
+    rows = asyncio.run(_measure(seeded["scores"], args.skip_list))
+    print(f"{'name':>24} | {'rows':>8} | {'MiB sent':>8} | {'seconds':>8} | {'peak MiB':>8}")
+    for row in rows:
+        print(f"{row[0]:>24} | " + " | ".join(f"{value:>8}" for value in row[1:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Concurrent duplicate score submissions, with and without ``Idempotency-Key``.
+
+    python -m benchmarks.idempotent_retries --participants 101 --duplicates 8
+
+Every member submits their ballot ``--duplicates`` times at once (``--concurrency``
+members at a time), as a client
+retrying after a timeout would. With a key, every copy must get the same
+response and exactly one must have done the work (the rest are replays); the
+table compares the first execution with concurrent copies and with a retry
+sent after it finished. Without a key the copies
+race the unique constraint and must come back "already_scored", never a 500.
+The same is checked for single-score ``create`` calls. Ends by counting the
+score rows, which must equal one full ballot per member.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from benchmarks import common
+
+
+async def _ballots(http, competition_id: int, members: list[int], duplicates: int, concurrency: int, keyed: bool):
+    semaphore = asyncio.Semaphore(concurrency)
+    first, replays, late, statuses = [], [], [], {}
+
+    async def submit(scorer, key, retry=False):
+        body = {"polls": [{"participant_id": m, "score": 1, "feedback": "retry"} for m in members if m != scorer]}
+        headers = common.auth_headers(scorer)
+        if key:
+            headers["Idempotency-Key"] = key
+        started = time.perf_counter()
+        response = await http.post(f"/competitions/participant/score/bulk-create/{competition_id}",
+                                   json=body, headers=headers)
+        elapsed = time.perf_counter() - started
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        response.raise_for_status()
+        if not response.headers.get("idempotent-replayed"):
+            first.append(elapsed)
+        else:
+            (late if retry else replays).append(elapsed)
+        return response.json()
+
+    async def member(scorer):
+        key = str(uuid.uuid4()) if keyed else None
+        async with semaphore:
+            bodies = await asyncio.gather(*(submit(scorer, key) for _ in range(duplicates)))
+        if keyed:
+            assert all(body == bodies[0] for body in bodies), f"replays differ for {scorer}"
+            assert bodies[0]["count"] == len(members) - 1, bodies[0]
+            # a retry that arrives after the first copy finished is a single lookup
+            assert await submit(scorer, key, retry=True) == bodies[0]
+        else:
+            assert sum(body["count"] for body in bodies) == len(members) - 1, bodies
+
+    started = time.perf_counter()
+    await asyncio.gather(*(member(scorer) for scorer in members))
+    elapsed = time.perf_counter() - started
+    return first, replays, late, statuses, elapsed
+
+
+async def _singles(http, competition_id: int, members: list[int], duplicates: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = {}
+
+    async def create(scorer):
+        async with semaphore:
+            responses = await asyncio.gather(*(
+                http.post(f"/competitions/participant/score/create/{competition_id}/{members[0]}",
+                          json={"score": 3, "feedback": "retry"}, headers=common.auth_headers(scorer))
+                for _ in range(duplicates)
+            ))
+        for response in responses:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(create(scorer) for scorer in members[1:]))
+    assert statuses.get(201) == len(members) - 1 and 500 not in statuses, statuses
+    return statuses
+
+
+async def _measure(seeded: dict, duplicates: int, concurrency: int) -> list[dict]:
+    from sqlmodel import Session, func, select
+    from PollApp.database import engine
+    from PollApp.models import ParticipantScores
+
+    rows = []
+    async with common.client() as http:
+        for competition_id, keyed in ((1, True), (2, False)):
+            members = seeded["members"][competition_id]
+            first, replays, late, statuses, elapsed = await _ballots(http, competition_id, members, duplicates,
+                                                                concurrency, keyed)
+            label = "keyed" if keyed else "no key"
+            print(f"{label}: {len(members)} members x {duplicates} copies, statuses {statuses}")
+            rows.append(common.summarize(f"{label}: executed", first, elapsed))
+            if replays:
+                rows.append(common.summarize(f"{label}: concurrent copy", replays, elapsed))
+                rows.append(common.summarize(f"{label}: later retry", late, elapsed))
+        print(f"single creates, no key: statuses {await _singles(http, 3, seeded['members'][3], duplicates, concurrency)}")
+
+    with Session(engine) as session:
+        for competition_id in (1, 2):
+            count = session.exec(select(func.count()).select_from(ParticipantScores)
+                                 .where(ParticipantScores.competition_id == competition_id)).one()
+            expected = len(seeded["members"][competition_id]) * (len(seeded["members"][competition_id]) - 1)
+            assert count == expected, (competition_id, count, expected)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--participants", type=int, default=101)
+    parser.add_argument("--duplicates", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4, help="members submitting at the same time")
+    args = parser.parse_args()
+
+    common.configure()
+    seeded = common.seed(users=args.participants, competitions=3, participants=args.participants, scores=False)
+    common.print_table(asyncio.run(_measure(seeded, args.duplicates, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Leaderboard read cost with 100k+ scores in one competition.
+
+    python -m benchmarks.leaderboard --participants 320 --requests 50
+
+Compares the aggregate-backed totals against ``include_feedback=true``, which
+still walks every ``participant_scores`` row of the competition. Both are
+timed with the response cache off, so every request builds its response; the
+last row is the totals again with the cache on, i.e. what a hit costs.
+"""
+import argparse
+import asyncio
+
+from benchmarks import common
+
+
+async def _measure(requests: int, concurrency: int) -> list[dict]:
+    from PollApp.response_cache import response_cache
+
+    rows = []
+    async with common.client() as http:
+        for name, path, cached in [
+            ("totals (aggregate)", "/competitions/1/scores", False),
+            ("totals + all feedback", "/competitions/1/scores?include_feedback=true", False),
+            ("feedback page", "/competitions/1/scores/1?limit=50", False),
+            ("totals, response cache hit", "/competitions/1/scores", True),
+        ]:
+            response_cache.enabled = cached
+            await http.get(path)
+            latencies, elapsed = await common.run_load(http, "GET", path, requests, concurrency)
+            rows.append(common.summarize(name, latencies, elapsed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--participants", type=int, default=320)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=5)
+    args = parser.parse_args()
+
+    common.configure()
+    seeded = common.seed(users=args.participants, competitions=1, participants=args.participants)
+    print(f"seeded {seeded['scores']} scores in competition 1")
+    common.print_table(asyncio.run(_measure(args.requests, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Latency and payload size of the keyset-paginated list endpoints, first page vs deep pages.
+
+    python -m benchmarks.list_pages --participants 150
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import common
+
+PATH = "/competitions/participant/score/"
+
+
+async def _walk(http, params: dict) -> tuple[list[float], float, int, int]:
+    """Follow ``next_after`` to the end; return per-page latencies, elapsed, pages and bytes."""
+    latencies, received, after = [], 0, None
+    started = time.perf_counter()
+    while True:
+        page_started = time.perf_counter()
+        response = await http.get(PATH, params={**params, **({"after": after} if after is not None else {})})
+        latencies.append(time.perf_counter() - page_started)
+        response.raise_for_status()
+        received += len(response.content)
+        after = response.json()["next_after"]
+        if after is None:
+            return latencies, time.perf_counter() - started, len(latencies), received
+
+
+async def _measure(limit: int) -> list[dict]:
+    rows = []
+    async with common.client() as http:
+        await http.get(PATH, params={"limit": 1})
+        for label, params in (("all fields", {"limit": limit}),
+                              ("fields=scored_id,score", {"limit": limit, "fields": "scored_id,score"})):
+            latencies, elapsed, pages, received = await _walk(http, params)
+            row = common.summarize(f"walk {label}", latencies, elapsed)
+            row["requests"] = f"{pages} ({received // 1024} KiB)"
+            rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--participants", type=int, default=150)
+    parser.add_argument("--competitions", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    common.configure()
+    common.seed(users=args.participants * 2, competitions=args.competitions, participants=args.participants)
+    common.print_table(asyncio.run(_measure(args.limit)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Leaderboard push to hundreds of WebSocket subscribers while ballots keep arriving.
+
+    python -m benchmarks.live_fanout --subscribers 300 --writers 8 --seconds 10
+
+Runs uvicorn in-process on a free port and connects real ``websockets``
+clients. Background writers submit scores for random participants; every
+second a probe score for a reserved participant is written, and the table
+reports how long that score took to reach each subscriber ("score -> screen").
+Every subscriber must see every probe, so the run doubles as a check on the
+snapshot + delta protocol.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks import common
+
+
+class Subscriber:
+    def __init__(self, probe_id: int):
+        self.probe_id = probe_id
+        self.probe_seen: dict[int, float] = {}  # probe score_count -> arrival time
+        self.messages = 0
+        self.snapshot = False
+
+    async def run(self, url: str, cookie: str, ready: asyncio.Event, stop: asyncio.Event):
+        from websockets.asyncio.client import connect
+
+        async with connect(url, additional_headers={"Cookie": cookie}, max_queue=None) as websocket:
+            ready.set()
+            while not stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(websocket.recv(), timeout=0.2)
+                except asyncio.TimeoutError:
+                    continue
+                message = json.loads(raw)
+                self.messages += 1
+                self.snapshot = self.snapshot or message["type"] == "snapshot"
+                for entry in message["entries"]:
+                    if entry["id"] == self.probe_id:
+                        self.probe_seen.setdefault(entry["score_count"], time.perf_counter())
+
+
+async def _writer(http, members: list[int], probe_id: int, stop: asyncio.Event, written: list[int]):
+    rng = random.Random()
+    while not stop.is_set():
+        scorer, scored = rng.sample([m for m in members if m != probe_id], 2)
+        response = await http.post(f"/competitions/participant/score/create/1/{scored}",
+                                   json={"score": rng.randint(1, 10), "feedback": "live"},
+                                   headers=common.auth_headers(scorer))
+        if response.status_code == 201:
+            written[0] += 1
+
+
+async def _measure(args, members: list[int]) -> list[dict]:
+    import httpx
+    import uvicorn
+    from PollApp.broadcast import broadcaster
+    from PollApp.main import app
+
+    probe_id = members[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", ws="websockets"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    stop = asyncio.Event()
+    cookie = common.auth_headers(1)["Cookie"]
+    subscribers = [Subscriber(probe_id) for _ in range(args.subscribers)]
+    readiness = [asyncio.Event() for _ in subscribers]
+    listeners = [asyncio.create_task(s.run(f"ws://127.0.0.1:{port}/competitions/1/live", cookie, ready, stop))
+                 for s, ready in zip(subscribers, readiness)]
+    for ready in readiness:
+        await ready.wait()
+
+    written = [0]
+    probes: dict[int, float] = {}
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as http:
+        writers = [asyncio.create_task(_writer(http, members, probe_id, stop, written)) for _ in range(args.writers)]
+        started = time.perf_counter()
+        scorers = iter(m for m in members if m != probe_id)
+        while time.perf_counter() - started < args.seconds:
+            await asyncio.sleep(1)
+            sent = time.perf_counter()
+            response = await http.post(f"/competitions/participant/score/create/1/{probe_id}",
+                                       json={"score": 5, "feedback": "probe"},
+                                       headers=common.auth_headers(next(scorers)))
+            response.raise_for_status()
+            probes[len(probes) + 1] = sent
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(args.interval * 4 + 0.5)  # let the last probe land
+        stop.set()
+        await asyncio.gather(*writers, *listeners)
+
+    server.should_exit = True
+    await serving
+
+    lags = [s.probe_seen[count] - sent for s in subscribers for count, sent in probes.items() if count in s.probe_seen]
+    missing = sum(1 for s in subscribers for count in probes if count not in s.probe_seen)
+    stats = broadcaster.stats()
+    row = common.summarize("score -> screen", lags, elapsed)
+    row["requests"] = f"{len(lags)} seen / {missing} missed"
+    row["rps"] = round(written[0] / elapsed, 1)
+    print(f"{args.subscribers} subscribers, {written[0]} ballots ({row['rps']}/s), "
+          f"{stats['flushes']} leaderboard reads, {stats['messages']} messages pushed, "
+          f"{stats['dropped']} slow subscribers dropped, "
+          f"snapshots received: {sum(s.snapshot for s in subscribers)}/{args.subscribers}")
+    return [row]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=300)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--participants", type=int, default=200)
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0.5, help="LEADERBOARD_PUSH_INTERVAL")
+    args = parser.parse_args()
+
+    common.configure(LEADERBOARD_PUSH_INTERVAL=args.interval)
+    seeded = common.seed(users=args.participants + 1, competitions=1, participants=args.participants, scores=False)
+    common.print_table(asyncio.run(_measure(args, seeded["members"][1])))
+
+
+if __name__ == "__main__":
+    main()
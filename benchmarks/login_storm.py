@@ -0,0 +1,65 @@
+"""Latency of an ordinary endpoint while a burst of logins is hashing passwords.
+
+    BCRYPT_ROUNDS=12 PASSWORD_HASH_WORKERS=2 python -m benchmarks.login_storm --logins 40
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import common
+
+PROBE_PATH = "/competitions/all"
+
+
+async def _probe(http, requests: int, interval: float) -> list[float]:
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        (await http.get(PROBE_PATH)).raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def _measure(logins: int, users: int, probes: int) -> list[dict]:
+    async with common.client() as http:
+        await http.get(PROBE_PATH)
+        started = time.perf_counter()
+        quiet = await _probe(http, probes, 0.01)
+        rows = [common.summarize(f"{PROBE_PATH} idle", quiet, time.perf_counter() - started)]
+
+        login_latencies = []
+
+        async def login(i):
+            user_id = i % users + 1
+            started = time.perf_counter()
+            response = await http.post("/auth/token", data={"username": f"user{user_id}", "password": "password"})
+            login_latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+        started = time.perf_counter()
+        storm = asyncio.gather(*(login(i) for i in range(logins)))
+        during = await _probe(http, probes, 0.01)
+        await storm
+        elapsed = time.perf_counter() - started
+        rows.append(common.summarize(f"{PROBE_PATH} in storm", during, elapsed))
+        rows.append(common.summarize("/auth/token", login_latencies, elapsed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--probes", type=int, default=50)
+    args = parser.parse_args()
+
+    common.configure()
+    common.seed(users=args.users, competitions=3, participants=min(10, args.users))
+
+    common.set_password("password")
+    common.print_table(asyncio.run(_measure(args.logins, args.users, args.probes)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Loading "my competitions" with participant counts for a user in many competitions.
+
+    python -m benchmarks.my_competitions --competitions 500
+
+"before" replays what the frontend used to do: ``GET /competitions/`` and then
+``GET /competitions/{id}`` for every competition to count its participants
+(response cache off, as before it existed). "after" is the single
+``GET /competitions/`` that now carries the counts and progress.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import common
+
+
+async def _before(http) -> int:
+    listing = (await http.get("/competitions/")).json()
+    competitions = listing["has_been_polled"] + listing["not_yet_voted"]
+    counts = {}
+    for competition in competitions:
+        detail = (await http.get(f"/competitions/{competition['id']}")).json()
+        counts[competition["id"]] = len(detail["competitions"]["participants"])
+    return 1 + len(competitions)
+
+
+async def _after(http) -> int:
+    listing = (await http.get("/competitions/")).json()
+    assert all("participant_count" in c for c in listing["has_been_polled"] + listing["not_yet_voted"])
+    return 1
+
+
+async def _measure(repeats: int) -> list[dict]:
+    from sqlalchemy import event
+    from PollApp.database import async_engine, engine
+    from PollApp.response_cache import response_cache
+
+    statements = [0]
+
+    def count(*_):
+        statements[0] += 1
+
+    sync_engine = async_engine.sync_engine if async_engine is not None else engine
+    event.listen(sync_engine, "before_cursor_execute", count)
+    response_cache.enabled = False
+
+    rows = []
+    async with common.client() as http:
+        await _after(http)
+        for name, load in (("before", _before), ("after", _after)):
+            latencies = []
+            statements[0] = 0
+            started = time.perf_counter()
+            for _ in range(repeats):
+                load_started = time.perf_counter()
+                requests = await load(http)
+                latencies.append(time.perf_counter() - load_started)
+            row = common.summarize(f"{name}: page load", latencies, time.perf_counter() - started)
+            row["requests"] = f"{requests} HTTP / {statements[0] // repeats} SQL"
+            rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--competitions", type=int, default=500)
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    common.configure()
+    # user 1 is a member of every seeded competition
+    common.seed(users=args.participants * 10, competitions=args.competitions, participants=args.participants)
+    common.print_table(asyncio.run(_measure(args.repeats)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Bulk participant import of a large roster, as JSON and as a CSV upload.
+
+    python -m benchmarks.participant_import --users 10000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import common
+
+
+async def _measure(users: int) -> list[tuple[str, float, dict]]:
+    half = users // 2
+    ids = list(range(1, half + 1))
+    names = [f"user{i}" for i in range(half + 1, users + 1)]
+    csv_body = "username\n" + "\n".join(names + [str(i) for i in ids]) + "\n"
+
+    results = []
+    async with common.client() as http:
+        for name, call in [
+            ("json import (new)", lambda: http.post("/competitions/1/participant/import",
+                                                    json={"user_ids": ids, "usernames": names})),
+            ("csv import (all existing)", lambda: http.post("/competitions/1/participant/import/csv",
+                                                            files={"file": ("roster.csv", csv_body, "text/csv")})),
+        ]:
+            started = time.perf_counter()
+            response = await call()
+            elapsed = time.perf_counter() - started
+            response.raise_for_status()
+            results.append((name, elapsed, response.json()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10_000)
+    args = parser.parse_args()
+
+    common.configure()
+    common.seed(users=args.users, competitions=1, participants=1, scores=False)
+
+    for name, elapsed, body in asyncio.run(_measure(args.users)):
+        print(f"{name:>28}: {elapsed * 1000:8.1f} ms  added={body['added']} "
+              f"skipped={body['skipped']} invalid={body['invalid']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""SQL statements per request for every router endpoint, at two data sizes; exits 1 if any count grows.
+
+    python -m benchmarks.query_counts [pytest options]
+
+The check itself is ``tests/test_query_counts.py`` and runs with the rest of
+the test suite; this runs that module alone, one line per request.
+"""
+import os
+import sys
+
+
+def main():
+    import pytest
+
+    tests = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "test_query_counts.py")
+    sys.exit(pytest.main(["-v", tests, *sys.argv[1:]]))
+
+
+if __name__ == "__main__":
+    main()
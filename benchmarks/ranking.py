@@ -0,0 +1,131 @@
+"""Statistical rankings: compute time per method at a million scores, then through the scores endpoint.
+
+    python -m benchmarks.ranking --scores 1000000 --participants 300
+
+First the ranking methods alone, on ``--scores`` synthetic scores (a square
+of judges by participants, random scores 0-10). Each repeat starts from a
+fresh copy, so nothing is memoised; "index" is mapping user ids onto array
+positions, paid once per change before the first method runs. Fails if any
+method's slowest run exceeds ``--budget`` seconds.
+
+Then ``GET /competitions/{id}/scores`` with the response cache off, on a
+seeded competition: by total, by each method loaded cold (all rows read from
+the database), memoised, and right after one more ballot, which only reads
+that ballot's rows. Checks that each leaderboard comes back in the order of
+its method's values.
+"""
+import argparse
+import asyncio
+import math
+import time
+
+from benchmarks import common
+
+
+def _time_methods(scores: int, repeats: int, budget: float) -> list[dict]:
+    import numpy as np
+
+    from PollApp.ranking import METHODS, CompetitionScores
+
+    side = math.isqrt(scores)
+    rng = np.random.default_rng(42)
+    rows = [(i + 1, i // side, side + i % side, value)
+            for i, value in enumerate(rng.integers(0, 11, side * side).tolist())]
+    started = time.perf_counter()
+    loaded = CompetitionScores.from_rows(rows)
+    print(f"{len(rows)} scores ({side} judges x {side} participants) loaded into arrays in "
+          f"{time.perf_counter() - started:.3f}s")
+
+    timings = {name: [] for name in ("index", *METHODS)}
+    for _ in range(repeats):
+        fresh = CompetitionScores(loaded.ids, loaded.scorer_ids, loaded.scored_ids, loaded.scores, loaded.total)
+        started = time.perf_counter()
+        fresh._dense_ids()
+        timings["index"].append(time.perf_counter() - started)
+        for method in METHODS:
+            started = time.perf_counter()
+            fresh.rank(method, 0.1)
+            timings[method].append(time.perf_counter() - started)
+
+    slow = {name: max(runs) for name, runs in timings.items() if max(runs) > budget}
+    assert not slow, f"over the {budget}s budget at {len(rows)} scores: {slow}"
+    return [common.summarize(f"{name} @ {len(rows)}", runs, sum(runs)) for name, runs in timings.items()]
+
+
+async def _leaderboard(http, competition_id: int, method: str | None = None) -> tuple[list[dict], float]:
+    started = time.perf_counter()
+    response = await http.get(f"/competitions/{competition_id}/scores",
+                              params={"method": method} if method else None)
+    response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    entries = response.json()
+    if method:
+        values = [entry["ranking_score"] for entry in entries]
+        assert values == sorted(values, reverse=True), f"{method} leaderboard out of order"
+    return entries, elapsed
+
+
+async def _measure_endpoint(seeded: dict, repeats: int) -> list[dict]:
+    from PollApp.ranking import METHODS, ranking_engine
+    from PollApp.response_cache import response_cache
+
+    response_cache.enabled = False
+    competition_id = 1
+    members = seeded["members"][competition_id]
+    newcomers = iter(sorted(set(range(2, seeded["users"] + 1)) - set(members)))
+    rows = []
+
+    async with common.client() as http:
+        totals = [(await _leaderboard(http, competition_id))[1] for _ in range(repeats)]
+        rows.append(common.summarize("total", totals, sum(totals)))
+
+        (await http.put(f"/competitions/{competition_id}/ranking",
+                        json={"method": "trimmed_mean", "trim": 0.2})).raise_for_status()
+        entries, _ = await _leaderboard(http, competition_id)
+        assert "ranking_score" in entries[0], "the competition's own method was not applied"
+
+        for method in METHODS:
+            cold, warm, after_ballot = [], [], []
+            for _ in range(repeats):
+                ranking_engine._competitions.clear()
+                cold.append((await _leaderboard(http, competition_id, method))[1])
+                warm.append((await _leaderboard(http, competition_id, method))[1])
+
+                scorer = next(newcomers)
+                (await http.post(f"/competitions/{competition_id}/participant/add",
+                                 json={"user_ids": [scorer]})).raise_for_status()
+                ballot = {"polls": [{"participant_id": m, "score": 7, "feedback": "late"} for m in members]}
+                (await http.post(f"/competitions/participant/score/bulk-create/{competition_id}", json=ballot,
+                                 headers=common.auth_headers(scorer))).raise_for_status()
+                loaded_before = ranking_engine.rows_loaded
+                after_ballot.append((await _leaderboard(http, competition_id, method))[1])
+                assert ranking_engine.rows_loaded - loaded_before == len(members), "the ballot was not loaded alone"
+            rows.append(common.summarize(f"{method}: cold", cold, sum(cold)))
+            rows.append(common.summarize(f"{method}: memoised", warm, sum(warm)))
+            rows.append(common.summarize(f"{method}: new ballot", after_ballot, sum(after_ballot)))
+    print(ranking_engine.stats())
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scores", type=int, default=1_000_000, help="synthetic scores for the compute timings")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds any one method may take")
+    parser.add_argument("--participants", type=int, default=300, help="members of the seeded competition")
+    args = parser.parse_args()
+
+    # before the first PollApp import, which the compute timings make too
+    common.configure()
+    rows = _time_methods(args.scores, args.repeats, args.budget)
+
+    # spare users join one at a time to cast the extra ballots
+    seeded = common.seed(users=args.participants + 6 * args.repeats + 1, competitions=1,
+                         participants=args.participants)
+    print(f"seeded {seeded['scores']} scores")
+    rows += asyncio.run(_measure_endpoint(seeded, args.repeats))
+    common.print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Token-bucket rate limits: what each request pays for them, and what a throttled client gets back.
+
+    python -m benchmarks.rate_limit --calls 200000 --logins 30
+
+First, in microseconds per call: the in-memory store taking a token from one
+hot bucket and from ``--keys`` distinct buckets, and the route dependency's
+work (client address plus the take). Then through the app, with real bcrypt
+hashes, a login policy of 5 per 2 seconds and one trusted proxy:
+
+- a burst of ``--logins`` logins from one address: all but the first 5 get a
+  429 with ``Retry-After``, without hashing a password;
+- another address (``X-Forwarded-For``) still gets in, and so does the first
+  once ``Retry-After`` has passed;
+- a scorer past the ballots policy is turned away while another is not;
+- a login for an unknown user (one query, no hash), every request from a new
+  address, with the limiter on and off.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import common
+
+LOGIN_POLICY = "5/2"
+BALLOTS_POLICY = "3/60"
+
+
+async def _per_call_us(calls: int, fn) -> float:
+    started = time.perf_counter()
+    for i in range(calls):
+        await fn(i)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def _time_store(calls: int, keys: int) -> list[str]:
+    from starlette.requests import Request
+    from PollApp.rate_limit import InMemoryRateLimitStore, RateLimitPolicy, RateLimiter, client_ip
+
+    unlimited = RateLimitPolicy("bench", 10**12, 1.0, "ip")
+    store = InMemoryRateLimitStore(keys)
+    limiter = RateLimiter(store)
+    request = Request({"type": "http", "method": "POST", "path": "/auth/token", "client": ("10.1.2.3", 4321),
+                       "headers": [(b"x-forwarded-for", b"203.0.113.7")]})
+
+    async def dependency(i):
+        await limiter.check(unlimited, f"ip:{client_ip(request)}")
+
+    hot = await _per_call_us(calls, lambda i: store.take("hot", unlimited.capacity, unlimited.rate))
+    spread = await _per_call_us(calls, lambda i: store.take(f"ip:{i % keys}", unlimited.capacity, unlimited.rate))
+    full = await _per_call_us(calls, dependency)
+    return [
+        f"store, one bucket: {hot:.2f} us/call",
+        f"store, {keys} buckets: {spread:.2f} us/call",
+        f"dependency (address + check): {full:.2f} us/call",
+    ]
+
+
+async def _login(http, username: str, address: str | None = None):
+    headers = {"X-Forwarded-For": address} if address else None
+    started = time.perf_counter()
+    response = await http.post("/auth/token", data={"username": username, "password": "password"}, headers=headers)
+    return response, time.perf_counter() - started
+
+
+async def _unknown_logins(http, requests: int, concurrency: int, first_address: int) -> tuple[list[float], float]:
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with gate:
+            address = first_address + i
+            response, elapsed = await _login(http, "nobody", f"198.51.{address // 256 % 256}.{address % 256}")
+            assert response.status_code == 401, response.status_code
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+async def _measure(args, seeded: dict) -> list[dict]:
+    from PollApp.rate_limit import POLICIES, rate_limiter
+
+    login = POLICIES["login"]
+    rows = []
+    async with common.client() as http:
+        results = await asyncio.gather(*(_login(http, "user1") for _ in range(args.logins)))
+        served = [elapsed for response, elapsed in results if response.status_code == 200]
+        limited = [(response, elapsed) for response, elapsed in results if response.status_code == 429]
+        assert len(served) + len(limited) == args.logins, [response.status_code for response, _ in results]
+        # a token or two may come back while the burst is being admitted
+        assert login.capacity <= len(served) <= login.capacity + 1, f"{len(served)} logins served"
+        retry_after = max(int(response.headers["retry-after"]) for response, _ in limited)
+        rows.append(common.summarize("login served", served, max(served)))
+        rows.append(common.summarize("login 429", [elapsed for _, elapsed in limited], max(served)))
+        print(f"burst of {args.logins}: {len(served)} served, {len(limited)} limited, Retry-After {retry_after}s")
+
+        other, _ = await _login(http, "user2", "203.0.113.9")
+        assert other.status_code == 200, f"another address was throttled: {other.status_code}"
+        await asyncio.sleep(retry_after)
+        again, _ = await _login(http, "user1")
+        assert again.status_code == 200, f"still throttled after Retry-After: {again.status_code}"
+
+        members = seeded["members"][1]
+        ballot = {"polls": [{"participant_id": m, "score": 5} for m in members[2:4]]}
+        path = "/competitions/participant/score/bulk-create/1"
+        statuses = [(await http.post(path, json=ballot, headers=common.auth_headers(members[0]))).status_code
+                    for _ in range(POLICIES["ballots"].capacity + 1)]
+        assert statuses[-1] == 429 and 429 not in statuses[:-1], statuses
+        other_scorer = await http.post(path, json=ballot, headers=common.auth_headers(members[1]))
+        assert other_scorer.status_code != 429, "one scorer's limit throttled another"
+        print(f"scorer over the limit: {statuses}; another scorer: {other_scorer.status_code}")
+
+        for label, enabled in (("limiter off", False), ("limiter on", True), ("limiter off again", False)):
+            rate_limiter.enabled = enabled
+            latencies, elapsed = await _unknown_logins(http, args.requests, args.concurrency, len(rows) * args.requests)
+            rows.append(common.summarize(f"unknown-user login, {label}", latencies, elapsed))
+    print(rate_limiter.stats())
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200_000, help="store and dependency calls to time")
+    parser.add_argument("--keys", type=int, default=100_000, help="distinct buckets for the spread timing")
+    parser.add_argument("--logins", type=int, default=30, help="logins in the burst from one address")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    common.configure(RATE_LIMIT_ENABLED=1, RATE_LIMIT_LOGIN=LOGIN_POLICY, RATE_LIMIT_BALLOTS=BALLOTS_POLICY,
+                     RATE_LIMIT_TRUSTED_PROXIES=1)
+    for line in asyncio.run(_time_store(args.calls, args.keys)):
+        print(line)
+
+    seeded = common.seed(users=20, competitions=1, participants=10, scores=False)
+    common.set_password("password")
+    common.print_table(asyncio.run(_measure(args, seeded)))
+
+
+if __name__ == "__main__":
+    main()
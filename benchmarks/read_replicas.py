@@ -0,0 +1,138 @@
+"""Read-replica routing: spread, read-your-writes, failover and reads under write load.
+
+    python -m benchmarks.read_replicas --readers 20 --writers 10
+
+Uses SQLite files as stand-ins for replicas: after seeding, the primary is
+copied twice, so both replicas are snapshots that never catch up, and a
+third replica points at a path that cannot be opened. Checks that:
+
+- reads are spread round-robin over the live replicas and the dead one is
+  skipped without failing a request;
+- a client that just submitted a score reads its own write from the
+  primary, and reads from the (stale) replicas again once the sticky
+  window has passed;
+
+then measures read latency (response cache off) while ballots are written
+to the primary, with replicas off and on.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import time
+
+from benchmarks import common
+
+
+async def _spread(http, requests: int) -> dict:
+    from PollApp.replicas import replicas
+
+    before = list(replicas.reads)
+    for _ in range(requests):
+        (await http.get("/competitions/all?limit=10")).raise_for_status()
+    reads = [after - start for after, start in zip(replicas.reads, before)]
+    # two live replicas take turns; the dead one is skipped after its first failure
+    assert reads[2] == 0 and abs(reads[0] - reads[1]) <= requests // 10 + 1, reads
+    assert replicas.failures[2] >= 1, replicas.failures
+    return {"reads per replica": reads, "dead replica failures": replicas.failures[2]}
+
+
+async def _read_your_writes(competition_id: int, scorer: int, scored: int, max_lag: float) -> dict:
+    async def my_progress(http) -> int:
+        listing = (await http.get("/competitions/")).json()
+        return next(c["scored_count"] for c in listing["has_been_polled"] + listing["not_yet_voted"]
+                    if c["id"] == competition_id)
+
+    async with common.client(user_id=scorer, username=f"user{scorer}") as http:
+        assert await my_progress(http) == 0
+        (await http.post(f"/competitions/participant/score/create/{competition_id}/{scored}",
+                         json={"score": 5, "feedback": "replica"})).raise_for_status()
+        right_after = await my_progress(http)  # the cookie from the write pins this to the primary
+        await asyncio.sleep(max_lag + 0.5)
+        after_window = await my_progress(http)  # back on a replica, which never saw the write
+    assert right_after == 1 and after_window == 0, (right_after, after_window)
+    return {"scored right after the write": right_after, "scored on a replica later": after_window}
+
+
+async def _under_writes(http, competition_id: int, members: list[int], readers: int, writers: int,
+                        reads: int) -> tuple[list[float], float]:
+    """Reads through ``http`` while another client (its own cookie jar: writes make it sticky) writes ballots."""
+    latencies = []
+    done = asyncio.Event()
+
+    async def write(scorer):
+        body = {"polls": [{"participant_id": m, "score": 1, "feedback": "load"} for m in members if m != scorer]}
+        await write_http.post(f"/competitions/participant/score/bulk-create/{competition_id}", json=body,
+                              headers=common.auth_headers(scorer))
+
+    async def writer(scorers):
+        for scorer in scorers:
+            if done.is_set():
+                return
+            await write(scorer)
+
+    async def reader():
+        for i in range(reads):
+            path = "/competitions/1/scores" if i % 2 else "/competitions/all?limit=50"
+            started = time.perf_counter()
+            (await http.get(path)).raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async with common.client() as write_http:
+        started = time.perf_counter()
+        write_tasks = [asyncio.create_task(writer(members[w::writers])) for w in range(writers)]
+        await asyncio.gather(*(reader() for _ in range(readers)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*write_tasks)
+    return latencies, elapsed
+
+
+async def _measure(args, seeded: dict) -> list[dict]:
+    from PollApp.replicas import replicas
+    from PollApp.response_cache import response_cache
+
+    response_cache.enabled = False
+    rows = []
+    async with common.client() as http:
+        print(await _spread(http, args.spread_requests))
+        last = seeded["competitions"]
+        print(await _read_your_writes(last, seeded["members"][last][0], seeded["members"][last][1], args.max_lag))
+
+        for mode, competition_id in (("primary only", last - 2), ("replicas", last - 1)):
+            replicas.enabled = mode == "replicas"
+            latencies, elapsed = await _under_writes(http, competition_id, seeded["members"][competition_id],
+                                                     args.readers, args.writers, args.reads)
+            rows.append(common.summarize(f"{mode}: reads", latencies, elapsed))
+    print(replicas.stats())
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--writers", type=int, default=10)
+    parser.add_argument("--reads", type=int, default=25, help="reads per reader")
+    parser.add_argument("--participants", type=int, default=60)
+    parser.add_argument("--spread-requests", type=int, default=100)
+    parser.add_argument("--max-lag", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" in os.environ:
+        parser.error("runs against scratch SQLite copies; unset DATABASE_URL")
+    database_url = common.configure(DATABASE_REPLICA_MAX_LAG=args.max_lag)
+    primary = database_url.removeprefix("sqlite:///")
+    copies = [os.path.join(os.path.dirname(primary), f"replica{i}.db") for i in range(2)]
+    os.environ["DATABASE_REPLICA_URLS"] = ",".join(
+        [f"sqlite:///{path}" for path in copies] + ["sqlite:////nonexistent-dir/replica.db"]
+    )
+
+    seeded = common.seed(users=args.participants * 4, competitions=6, participants=args.participants,
+                         unscored_competitions=3)
+    for path in copies:
+        shutil.copyfile(primary, path)
+    common.print_table(asyncio.run(_measure(args, seeded)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Competition detail and leaderboard throughput with the response cache off, on, and revalidated by ETag.
+
+    python -m benchmarks.response_cache --participants 300 --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+
+from benchmarks import common
+
+PATHS = {
+    "detail": "/competitions/1",
+    "scores": "/competitions/1/scores",
+    "scores+feedback": "/competitions/1/scores?include_feedback=true",
+}
+
+
+async def _measure(requests: int, concurrency: int) -> list[dict]:
+    from PollApp.response_cache import response_cache
+
+    rows = []
+    async with common.client() as http:
+        for name, path in PATHS.items():
+            for label, enabled, revalidate in (("no cache", False, False), ("cached", True, False),
+                                               ("cached + If-None-Match", True, True)):
+                response_cache.enabled = enabled
+                headers = {}
+                if revalidate:
+                    headers["If-None-Match"] = (await http.get(path)).headers["etag"]
+                await http.get(path, headers=headers)
+                latencies, elapsed = await common.run_load(http, "GET", path, requests, concurrency, headers=headers)
+                rows.append(common.summarize(f"{name} {label}", latencies, elapsed))
+    print(response_cache.stats())
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--participants", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    common.configure()
+    common.seed(users=args.participants * 2, competitions=1, participants=args.participants)
+    common.print_table(asyncio.run(_measure(args.requests, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Closing-bell load: commit-per-request score submission against the write-behind ingestion queue.
+
+    python -m benchmarks.score_ingest --judges 60 --participants 20 --concurrency 30
+
+Every judge scores every participant with single ``create`` calls, and then
+submits a full ballot in a second competition, as fast as ``--concurrency``
+allows. "direct" is the default path (one transaction and commit per request);
+"queued" turns on ``score_ingest`` (202 once the submission is in the fsynced
+spool, rows written in batches). "stored after" is how long the last row took to
+reach the database, and the row counts are checked against what was
+accepted. Direct submissions that time out waiting for a connection are
+counted as failures rather than stopping the run. A last step leaves an orphaned spool behind, as a
+crashed worker would, and checks that its submissions are replayed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+
+from benchmarks import common
+
+
+async def _submit(http, requests: list[tuple[str, int, dict]], concurrency: int, expected_status: int):
+    """Returns (latencies, elapsed, rows accepted, failed requests)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    accepted = [0]
+    failures = []
+
+    async def one(path, scorer, body):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await http.post(path, json=body, headers=common.auth_headers(scorer))
+            except Exception as exc:  # e.g. pool checkout timeouts while writers queue on the database
+                failures.append(type(exc).__name__)
+                return
+            finally:
+                latencies.append(time.perf_counter() - started)
+            if response.status_code != expected_status:
+                failures.append(str(response.status_code))
+                return
+            accepted[0] += len(body.get("polls") or [body])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    return latencies, time.perf_counter() - started, accepted[0], failures
+
+
+def _singles(competition_id: int, judges: list[int], participants: list[int]):
+    return [(f"/competitions/participant/score/create/{competition_id}/{scored}", judge,
+             {"score": 1 + (judge + scored) % 10, "feedback": "bell"})
+            for judge in judges for scored in participants if scored != judge]
+
+
+def _ballots(competition_id: int, judges: list[int], participants: list[int]):
+    return [(f"/competitions/participant/score/bulk-create/{competition_id}", judge,
+             {"polls": [{"participant_id": scored, "score": 1, "feedback": "bell"}
+                        for scored in participants if scored != judge]})
+            for judge in judges]
+
+
+def _count_scores(competition_id: int) -> int:
+    from sqlmodel import Session, func, select
+    from PollApp.database import engine
+    from PollApp.models import ParticipantScores
+
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(ParticipantScores)
+                            .where(ParticipantScores.competition_id == competition_id)).one()
+
+
+async def _measure(args, members: dict[int, list[int]]) -> list[dict]:
+    from PollApp.ingest import score_ingest
+
+    rows = []
+    async with common.client() as http:
+        for mode, offset in (("direct", 0), ("queued", 2)):
+            score_ingest.enabled = mode == "queued"
+            for kind, competition_id, build, direct_status in (
+                ("single", 1 + offset, _singles, 201),
+                ("ballot", 2 + offset, _ballots, 200),
+            ):
+                judges = members[competition_id]
+                participants = judges[:args.participants]
+                requests = build(competition_id, judges, participants)
+
+                started = time.perf_counter()
+                latencies, elapsed, accepted, failures = await _submit(
+                    http, requests, args.concurrency, 202 if score_ingest.enabled else direct_status
+                )
+                row = common.summarize(f"{mode}: {kind}", latencies, elapsed)
+                if score_ingest.enabled:
+                    await score_ingest.drain()
+                stored_after = time.perf_counter() - started
+                # every accepted row must be in the database, queued or not
+                count = _count_scores(competition_id)
+                assert count == accepted, (mode, kind, count, accepted)
+                row["requests"] = f"{len(requests)}, {len(failures)} failed"
+                rows.append(row)
+                print(f"{mode} {kind}: {accepted} rows stored after {stored_after:.2f}s"
+                      + (f", failures: {dict(Counter(failures))}" if failures else ""))
+        print(score_ingest.stats())
+    await score_ingest.close()
+    return rows
+
+
+async def _recovery(spool_dir: str, competition_id: int, judge: int, participants: list[int]):
+    """Replay a spool left behind by a worker that died before writing it."""
+    from PollApp.ingest import score_ingest
+
+    orphan = {"op": "submit", "id": "orphan", "competition_id": competition_id, "scorer_id": judge,
+              "accepted_at": time.time(), "rows": [[scored, 7, "replayed"] for scored in participants]}
+    with open(os.path.join(spool_dir, "worker-crashed.spool"), "w") as f:
+        f.write(json.dumps(orphan) + "\n" + '{"op": "sub')  # torn last line, as a crash mid-append leaves
+
+    started = time.perf_counter()
+    before = _count_scores(competition_id)
+    async with common.client() as http:
+        await score_ingest.start()  # what the lifespan does on boot: adopt the orphan
+        await score_ingest.drain()
+        status = (await http.get("/competitions/participant/score/submissions/orphan",
+                                 headers=common.auth_headers(judge))).json()
+    replayed = _count_scores(competition_id) - before
+    assert status["status"] == "stored" and replayed == len(participants), (status, replayed)
+    assert not os.path.exists(os.path.join(spool_dir, "worker-crashed.spool"))
+    print(f"recovered an orphaned spool: {replayed} rows replayed in {time.perf_counter() - started:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--judges", type=int, default=60)
+    parser.add_argument("--participants", type=int, default=20, help="participants each judge scores")
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--flush-interval", type=float, default=0.05)
+    parser.add_argument("--fsync", choices=("true", "false"), default="true")
+    args = parser.parse_args()
+
+    import tempfile
+
+    spool_dir = tempfile.mkdtemp(prefix="pollapp-spool-")
+    common.configure(SCORE_INGEST_BATCH_SIZE=args.batch_size, SCORE_INGEST_FLUSH_INTERVAL=args.flush_interval,
+                     SCORE_INGEST_FSYNC=args.fsync, SCORE_INGEST_SPOOL_DIR=spool_dir)
+    seeded = common.seed(users=args.judges, competitions=5, participants=args.judges, scores=False)
+    common.print_table(asyncio.run(_measure(args, seeded["members"])))
+
+    members = seeded["members"][5]
+    asyncio.run(_recovery(spool_dir, 5, members[0], members[1:args.participants + 1]))
+
+
+if __name__ == "__main__":
+    main()
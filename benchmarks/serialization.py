@@ -0,0 +1,118 @@
+"""Response serialisation cost for 10k-row payloads, per encoding path.
+
+    python -m benchmarks.serialization --rows 10000
+
+Builds a leaderboard and a list page of ``--rows`` entries from real
+SQLAlchemy rows (an in-memory SQLite table), then times, in-process:
+
+- "rows -> dicts": turning row tuples into the dicts handlers return;
+- "jsonable_encoder + json": FastAPI's path for a returned dict with no
+  ``response_model`` and the stock ``JSONResponse``;
+- "response_model + orjson": FastAPI's path with the route's declared
+  ``response_model`` (validate, then serialise) and ``ORJSONResponse``;
+- "orjson (fast path)": what the handlers do now, returning an
+  ``ORJSONResponse`` of the dicts, which FastAPI sends as is.
+
+Checks the fast path's body against the response model's serialisation of
+the same payload, so the documented models and the bodies cannot drift.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks import common
+
+
+def _rows(count: int) -> tuple[list, list]:
+    from sqlalchemy import create_engine, insert, select
+    from PollApp.models import User
+
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine.execution_options(schema_translate_map={"public": None}))
+    with engine.begin() as conn:
+        conn = conn.execution_options(schema_translate_map={"public": None})
+        conn.execute(insert(User.__table__), [
+            {"email": f"user{i}@example.com", "username": f"user{i}", "hashed_password": "x", "role": "user"}
+            for i in range(1, count + 1)
+        ])
+        columns = [column for column in User.__table__.columns if column.name != "hashed_password"]
+        page_rows = conn.execute(select(*columns).order_by(User.id)).all()
+        leaderboard_rows = conn.execute(
+            select(User.id, User.username, User.id * 7, User.id % 10 + 1).order_by(User.id)
+        ).all()
+    engine.dispose()
+    return page_rows, leaderboard_rows
+
+
+def _route_field(path: str):
+    from PollApp.main import app
+
+    return next(route.response_field for route in app.routes if getattr(route, "path", None) == path)
+
+
+def _time(runs: int, fn) -> list[float]:
+    fn()
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    common.configure()
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+
+    page_rows, leaderboard_rows = _rows(args.rows)
+    names = list(page_rows[0]._fields)
+
+    def page_dicts():
+        return {"items": [dict(zip(names, row)) for row in page_rows], "limit": len(page_rows), "next_after": None}
+
+    def leaderboard_dicts():
+        return [
+            {"id": scored_id, "username": username, "total_score": total, "score_count": count,
+             "average_score": total / count}
+            for scored_id, username, total, count in leaderboard_rows
+        ]
+
+    payloads = (
+        ("page", "/user/all", page_dicts),
+        ("leaderboard", "/competitions/{competition_id}/scores", leaderboard_dicts),
+    )
+
+    rows = []
+    for label, path, build in payloads:
+        payload = build()
+        field = _route_field(path)
+
+        def through_model():
+            content = asyncio.run(serialize_response(field=field, response_content=payload, exclude_unset=True))
+            return ORJSONResponse(content).body
+
+        fast = ORJSONResponse(payload).body
+        assert json.loads(fast) == json.loads(through_model()), f"{path}: body differs from its response model"
+        assert json.loads(fast) == json.loads(JSONResponse(jsonable_encoder(payload)).body)
+
+        for name, fn in (
+            ("rows -> dicts", build),
+            ("jsonable_encoder + json", lambda: JSONResponse(jsonable_encoder(payload)).body),
+            ("response_model + orjson", through_model),
+            ("orjson (fast path)", lambda: ORJSONResponse(payload).body),
+        ):
+            latencies = _time(args.runs, fn)
+            rows.append(common.summarize(f"{label}: {name}", latencies, sum(latencies)))
+    common.print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""The standard scenarios at a named scale, with a JSON report to compare across commits.
+
+    python -m benchmarks.suite --scale small
+    DATABASE_URL=postgresql://localhost/pollapp_bench python -m benchmarks.suite --scale medium --drop-existing
+    python -m benchmarks.compare base.json head.json --fail-over 10
+
+Seeds an empty database deterministically (same ``--seed``, same rows), then
+runs competition listing, leaderboard reads, ballot submission and a login
+storm through the ASGI app in-process. The report goes to
+``benchmarks/results/<commit>.json`` unless ``--output`` says otherwise, and
+records the commit, backend and scale next to every scenario's p50/p95/p99 and
+requests/sec so two reports can be diffed with ``benchmarks.compare``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks import common
+
+SCALES = {
+    # competitions are seeded with full ballots except the last one, which the ballot scenario fills
+    "small": {"users": 500, "competitions": 20, "participants": 30, "requests": 300, "concurrency": 10,
+              "logins": 20},
+    "medium": {"users": 5_000, "competitions": 100, "participants": 100, "requests": 1_000, "concurrency": 20,
+               "logins": 50},
+    "large": {"users": 20_000, "competitions": 50, "participants": 200, "requests": 3_000, "concurrency": 50,
+              "logins": 100},
+}
+
+SCENARIOS = ("listing", "leaderboard", "ballots", "logins")
+
+
+async def _listing(http, scale: dict) -> list[dict]:
+    rows = []
+    for name, path in (("GET /competitions/", "/competitions/"),
+                       ("GET /competitions/all", "/competitions/all?limit=100")):
+        await http.get(path)
+        latencies, elapsed = await common.run_load(http, "GET", path, scale["requests"], scale["concurrency"])
+        rows.append(common.summarize(name, latencies, elapsed))
+    return rows
+
+
+async def _leaderboard(http, scale: dict) -> list[dict]:
+    from PollApp.response_cache import response_cache
+
+    rows = []
+    paths = (("scores", "/competitions/1/scores", scale["requests"]),
+             ("scores+feedback", "/competitions/1/scores?include_feedback=true", scale["requests"] // 5))
+    # cold measures the query path; warm what a reader sees between writes
+    for label, enabled in (("cold", False), ("warm", True)):
+        response_cache.enabled = enabled
+        for name, path, requests in paths:
+            await http.get(path)
+            latencies, elapsed = await common.run_load(http, "GET", path, requests, scale["concurrency"])
+            rows.append(common.summarize(f"{name} {label}", latencies, elapsed))
+    response_cache.enabled = True
+    return rows
+
+
+async def _ballots(http, scale: dict, competition_id: int, members: list[int]) -> list[dict]:
+    semaphore = asyncio.Semaphore(scale["concurrency"])
+    latencies = []
+
+    async def submit(scorer):
+        body = {"polls": [{"participant_id": m, "score": 1 + m % 10, "feedback": "suite"}
+                          for m in members if m != scorer]}
+        async with semaphore:
+            started = time.perf_counter()
+            response = await http.post(f"/competitions/participant/score/bulk-create/{competition_id}", json=body,
+                                       headers=common.auth_headers(scorer))
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(submit(scorer) for scorer in members))
+    return [common.summarize(f"ballot of {len(members) - 1}", latencies, time.perf_counter() - started)]
+
+
+async def _logins(http, scale: dict) -> list[dict]:
+    semaphore = asyncio.Semaphore(scale["concurrency"])
+    latencies = []
+
+    async def login(i):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await http.post("/auth/token", data={"username": f"user{i % scale['users'] + 1}",
+                                                            "password": "password"})
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(scale["logins"])))
+    return [common.summarize("POST /auth/token", latencies, time.perf_counter() - started)]
+
+
+async def _run(scenarios: list[str], scale: dict, seeded: dict) -> list[dict]:
+    last = seeded["competitions"]
+    rows = []
+    async with common.client() as http:
+        for scenario in scenarios:
+            if scenario == "listing":
+                produced = await _listing(http, scale)
+            elif scenario == "leaderboard":
+                produced = await _leaderboard(http, scale)
+            elif scenario == "ballots":
+                produced = await _ballots(http, scale, last, seeded["members"][last])
+            else:
+                produced = await _logins(http, scale)
+            rows += [{"scenario": scenario, **row} for row in produced]
+    return rows
+
+
+def _git(*args) -> str | None:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(database_url: str) -> dict:
+    from sqlalchemy.engine import make_url
+
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "database": make_url(database_url).get_backend_name(),
+        "database_async": os.getenv("DATABASE_ASYNC", ""),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    for key in SCALES["small"]:
+        parser.add_argument(f"--{key}", type=int, help=f"override the scale's {key}")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--drop-existing", action="store_true",
+                        help="drop every table in DATABASE_URL first (it must otherwise be empty)")
+    parser.add_argument("--output", help="report path (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    scale = {key: getattr(args, key) or value for key, value in SCALES[args.scale].items()}
+
+    database_url = common.configure(BCRYPT_ROUNDS=args.bcrypt_rounds)
+    if args.drop_existing:
+        from sqlmodel import SQLModel
+        from PollApp import models  # noqa: F401  registers every table on the metadata
+        from PollApp.database import engine
+
+        SQLModel.metadata.drop_all(engine)
+
+    started = time.perf_counter()
+    seeded = common.seed(users=scale["users"], competitions=scale["competitions"],
+                         participants=scale["participants"], seed_value=args.seed, unscored_competitions=1)
+    if "logins" in scenarios:
+        common.set_password("password")
+    seed_seconds = time.perf_counter() - started
+    print(f"seeded {scale['users']} users, {scale['competitions']} competitions, {seeded['scores']} scores "
+          f"in {seed_seconds:.1f}s", file=sys.stderr)
+
+    rows = asyncio.run(_run(scenarios, scale, seeded))
+    common.print_table(rows)
+
+    report = {
+        "environment": environment(database_url),
+        "scale": {"name": args.scale, "seed": args.seed, "bcrypt_rounds": args.bcrypt_rounds,
+                  "scores": seeded["scores"], **scale},
+        "seed_seconds": round(seed_seconds, 2),
+        "results": rows,
+    }
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         f"{(report['environment']['commit'] or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
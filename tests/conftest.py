@@ -0,0 +1,8 @@
+"""The tests run the app in-process against a scratch SQLite database, with the benchmarks' helpers."""
+import os
+
+from benchmarks import common
+
+# a throwaway database whatever DATABASE_URL the shell has; set before anything imports PollApp
+os.environ.pop("DATABASE_URL", None)
+common.configure(BCRYPT_ROUNDS=4)
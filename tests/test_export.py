@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+from benchmarks import common
+
+
+def test_abandoned_export_returns_its_connection(monkeypatch):
+    from sqlmodel import SQLModel
+    from PollApp import export
+    from PollApp.database import engine
+
+    SQLModel.metadata.drop_all(engine)
+    common.seed(users=30, competitions=1, participants=30)
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 100)  # 870 scores: several chunks
+    response = export.ExportResponse(export.stream_export(export.scores_statement(1), "ndjson"))
+    chunks = []
+
+    async def receive():
+        await asyncio.Event().wait()  # the client never says it left; the failing send tells
+
+    async def send(message):
+        if message["type"] == "http.response.body" and chunks:
+            raise OSError("connection reset by peer")
+        chunks.append(message)
+
+    async def run():
+        with pytest.raises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        return engine.pool.checkedout()
+
+    assert asyncio.run(run()) == 0
+    assert [message["type"] for message in chunks] == ["http.response.start"]
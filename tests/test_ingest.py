@@ -0,0 +1,59 @@
+import asyncio
+
+from sqlalchemy.exc import OperationalError
+
+from benchmarks import common
+
+
+def _stored(competition_id: int, scorer_id: int, scored_id: int):
+    from sqlmodel import Session, select
+    from PollApp.database import engine
+    from PollApp.models import ParticipantScores
+
+    with Session(engine) as session:
+        return session.exec(select(ParticipantScores).where(
+            ParticipantScores.competition_id == competition_id,
+            ParticipantScores.scorer_id == scorer_id,
+            ParticipantScores.scored_id == scored_id,
+        )).first()
+
+
+def test_failed_write_is_retried(monkeypatch, tmp_path):
+    from sqlmodel import SQLModel
+    from PollApp.database import engine
+    from PollApp.ingest import score_ingest
+
+    SQLModel.metadata.drop_all(engine)
+    scorer, scored = common.seed(users=10, competitions=1, participants=5, scores=False)["members"][1][:2]
+
+    monkeypatch.setattr(score_ingest, "enabled", True)
+    monkeypatch.setattr(score_ingest, "spool_dir", str(tmp_path))
+    write, failed = score_ingest._write, []
+
+    async def write_failing_once(batch):
+        if not failed:
+            failed.append(batch)
+            raise OperationalError("INSERT INTO participant_scores", {}, Exception("database went away"))
+        return await write(batch)
+
+    monkeypatch.setattr(score_ingest, "_write", write_failing_once)
+
+    async def submit():
+        async with common.client() as http:
+            try:
+                response = await http.post(f"/competitions/participant/score/create/1/{scored}",
+                                           json={"score": 7, "feedback": "retried"},
+                                           headers=common.auth_headers(scorer))
+                assert response.status_code == 202, response.text
+                await score_ingest.drain()
+                return (await http.get(f"/competitions/participant/score/submissions/{response.json()['submission_id']}",
+                                       headers=common.auth_headers(scorer))).json()
+            finally:
+                await score_ingest.close()
+
+    submission = asyncio.run(submit())
+    assert len(failed) == 1
+    # stored by the flusher's retry, not by close()
+    assert submission["status"] == "stored", submission
+    row = _stored(1, scorer, scored)
+    assert row is not None and row.score == 7
@@ -0,0 +1,232 @@
+"""SQL statements per request for every router endpoint, at two data sizes.
+
+Seeds a fresh database at each size (``SMALL`` / ``LARGE`` participants per
+competition, four users per participant, a competition per four
+participants), then sends each request in ``CASES`` once, in order, and
+counts the statements it runs with ``common.statements()``. Request bodies
+grow with the data too: participant imports, ballots and list pages cover
+every row there is, so a per-row query shows up as a count that differs
+between the sizes.
+
+A case fails when its count differs, or when it does not get its expected
+status (it never reached the code being counted); a route in
+``PollApp/routers`` without a case fails ``test_every_route_has_a_case``, so a
+new endpoint gets one. The response cache is off, so every read builds its
+response.
+"""
+import asyncio
+import io
+from typing import Callable, NamedTuple
+
+import pytest
+
+from benchmarks import common
+
+# participants per competition in the two runs
+SMALL, LARGE = 8, 32
+
+
+class Call(NamedTuple):
+    url: str
+    status: int = 200
+    json: dict | None = None
+    data: dict | None = None
+    files: dict | None = None
+    headers: dict | None = None
+
+
+class Case(NamedTuple):
+    method: str
+    route: str
+    build: Callable[[dict], Call]
+    # tells apart two cases on the same route
+    note: str = ""
+
+
+def _admin() -> dict:
+    return common.auth_headers(1, role="admin")
+
+
+def _ballot(d: dict, scorer: int) -> dict:
+    return {"polls": [{"participant_id": m, "score": 5, "feedback": "ok"} for m in d["open_members"] if m != scorer]}
+
+
+# in the order they are sent; later cases see earlier writes
+CASES = [
+    Case("GET", "/user/", lambda d: Call("/user/")),
+    Case("GET", "/user/me", lambda d: Call("/user/me")),
+    Case("GET", "/user/all", lambda d: Call("/user/all?limit=1000")),
+    Case("PUT", "/user/change-password",
+     lambda d: Call("/user/change-password", 204, json={"password": "password", "new_password": "password"})),
+    Case("POST", "/auth/register", lambda d: Call("/auth/register", json={
+        "username": "newcomer", "email": "newcomer@example.com", "password": "password", "role": "user"})),
+    Case("POST", "/auth/token", lambda d: Call("/auth/token", data={"username": "user1", "password": "password"})),
+    Case("POST", "/auth/logout", lambda d: Call("/auth/logout")),
+
+    Case("GET", "/admin/poll", lambda d: Call("/admin/poll?limit=1000", headers=_admin())),
+    Case("GET", "/admin/pool", lambda d: Call("/admin/pool", headers=_admin())),
+    Case("GET", "/admin/password-hashing", lambda d: Call("/admin/password-hashing", headers=_admin())),
+    Case("GET", "/admin/token-cache", lambda d: Call("/admin/token-cache", headers=_admin())),
+    Case("GET", "/admin/live", lambda d: Call("/admin/live", headers=_admin())),
+    Case("GET", "/admin/response-cache", lambda d: Call("/admin/response-cache", headers=_admin())),
+    Case("GET", "/admin/ingest", lambda d: Call("/admin/ingest", headers=_admin())),
+    Case("GET", "/admin/replicas", lambda d: Call("/admin/replicas", headers=_admin())),
+    Case("GET", "/admin/rate-limit", lambda d: Call("/admin/rate-limit", headers=_admin())),
+    Case("GET", "/admin/ranking", lambda d: Call("/admin/ranking", headers=_admin())),
+
+    Case("GET", "/competitions/", lambda d: Call("/competitions/")),
+    Case("GET", "/competitions/all", lambda d: Call("/competitions/all?limit=1000")),
+    Case("GET", "/competitions/{competition_id}", lambda d: Call("/competitions/1")),
+    Case("GET", "/competitions/{competition_id}/scores", lambda d: Call("/competitions/1/scores")),
+    Case("GET", "/competitions/{competition_id}/scores",
+     lambda d: Call("/competitions/1/scores?include_feedback=true"), " (feedback)"),
+    Case("GET", "/competitions/{competition_id}/scores",
+     lambda d: Call("/competitions/1/scores?method=median"), " (median)"),
+    Case("PUT", "/competitions/{competition_id}/ranking",
+     lambda d: Call("/competitions/2/ranking", json={"method": "borda", "trim": 0.1})),
+    Case("GET", "/competitions/{competition_id}/scores", lambda d: Call("/competitions/2/scores"), " (borda)"),
+    Case("GET", "/competitions/{competition_id}/scores/{scored_id}",
+     lambda d: Call(f"/competitions/1/scores/{d['members'][1][1]}?limit=500")),
+    Case("GET", "/competitions/{competition_id}/export", lambda d: Call("/competitions/1/export")),
+    Case("GET", "/competitions/{competition_id}/export",
+     lambda d: Call("/competitions/1/export?format=csv&kind=totals"), " (csv totals)"),
+    Case("GET", "/competitions/participant/", lambda d: Call("/competitions/participant/?limit=1000")),
+    Case("GET", "/competitions/participant/score/", lambda d: Call("/competitions/participant/score/?limit=1000")),
+    Case("GET", "/competitions/participant/score/submissions/{submission_id}",
+     lambda d: Call("/competitions/participant/score/submissions/unknown", 404)),
+
+    Case("POST", "/competitions/create",
+     lambda d: Call("/competitions/create", 201, json={"title": "Created", "desc": "query counts"})),
+    Case("POST", "/competitions/{competition_id}/participant/add",
+     lambda d: Call(f"/competitions/{d['open']}/participant/add", 201, json={"user_ids": d["to_add"]})),
+    Case("POST", "/competitions/{competition_id}/participant/import",
+     lambda d: Call(f"/competitions/{d['open']}/participant/import", 201,
+                    json={"user_ids": d["to_import"], "usernames": [f"user{u}" for u in d["to_import_by_name"]]})),
+    Case("POST", "/competitions/{competition_id}/participant/import/csv",
+     lambda d: Call(f"/competitions/{d['open']}/participant/import/csv", 201, files={"file": (
+         "members.csv", io.BytesIO("username\n".encode() + "".join(f"user{u}\n" for u in d["to_upload"]).encode()),
+         "text/csv")})),
+    Case("POST", "/competitions/participant/score/create/{comp_id}/{scored_id}",
+     lambda d: Call(f"/competitions/participant/score/create/{d['open']}/{d['open_members'][0]}", 201,
+                    json={"score": 5, "feedback": "ok"}, headers=common.auth_headers(d["open_members"][1]))),
+    Case("POST", "/competitions/participant/score/bulk-create/{competition_id}",
+     lambda d: Call(f"/competitions/participant/score/bulk-create/{d['open']}",
+                    json=_ballot(d, d["open_members"][2]), headers=common.auth_headers(d["open_members"][2]))),
+    Case("POST", "/competitions/participant/score/bulk-create/{competition_id}",
+     lambda d: Call(f"/competitions/participant/score/bulk-create/{d['open']}", json=_ballot(d, d["open_members"][3]),
+                    headers={**common.auth_headers(d["open_members"][3]), "Idempotency-Key": "ballot"}),
+     " (idempotent)"),
+    Case("POST", "/competitions/participant/score/bulk-create/{competition_id}",
+     lambda d: Call(f"/competitions/participant/score/bulk-create/{d['open']}", json=_ballot(d, d["open_members"][3]),
+                    headers={**common.auth_headers(d["open_members"][3]), "Idempotency-Key": "ballot"}),
+     " (replay)"),
+
+    Case("DELETE", "/competitions/participant/score/{comp_id}/{scored_id}",
+     lambda d: Call(f"/competitions/participant/score/1/{d['members'][1][1]}", 204)),
+    Case("DELETE", "/competitions/participant/{participant_id}",
+     lambda d: Call(f"/competitions/participant/{d['participants']}", 204)),
+    Case("DELETE", "/competitions/participant/score/{participant_id}",
+     lambda d: Call(f"/competitions/participant/score/{d['participants'] - 1}", 204)),
+    Case("DELETE", "/admin/poll/{poll_id}", lambda d: Call("/admin/poll/1", 204, headers=_admin())),
+]
+
+# routes with nothing to count: both only wait for pushes from other requests
+NOT_COUNTED = {
+    ("WEBSOCKET", "/competitions/{competition_id}/live"),
+    ("GET", "/competitions/{competition_id}/live/sse"),
+}
+
+
+def _uncovered() -> list[str]:
+    from fastapi.routing import APIRoute, APIWebSocketRoute
+    from PollApp.main import app
+
+    routes = set()
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.endpoint.__module__.startswith("PollApp.routers."):
+            routes.update((method, route.path) for method in route.methods)
+        elif isinstance(route, APIWebSocketRoute) and route.endpoint.__module__.startswith("PollApp.routers."):
+            routes.add(("WEBSOCKET", route.path))
+    covered = {(case.method, case.route) for case in CASES} | NOT_COUNTED
+    return sorted(f"{method} {path}" for method, path in routes - covered)
+
+
+def _seed(participants: int) -> dict:
+    from sqlalchemy import insert
+    from sqlmodel import SQLModel
+    from PollApp.database import engine
+    from PollApp.models import Polls
+
+    SQLModel.metadata.drop_all(engine)
+    users = participants * 4
+    competitions = max(3, participants // 4)
+    # the last competition has members but no ballots yet, for the ballots sent below
+    seeded = common.seed(users=users, competitions=competitions, participants=participants,
+                         unscored_competitions=1)
+    common.set_password("password")
+    with engine.begin() as conn:
+        conn.execute(insert(Polls.__table__), [
+            {"name": f"poll {i}", "poll_by": "user1", "poll": i, "poll_by_id": 1} for i in range(1, participants + 1)
+        ])
+
+    open_competition = competitions
+    outsiders = sorted(set(range(2, users + 1)) - set(seeded["members"][open_competition]))
+    share = participants // 2
+    to_add, to_import, to_import_by_name, to_upload = (outsiders[i * share:(i + 1) * share] for i in range(4))
+    return {
+        **seeded,
+        "open": open_competition,
+        "to_add": to_add,
+        "to_import": to_import,
+        "to_import_by_name": to_import_by_name,
+        "to_upload": to_upload,
+        # everyone in the open competition once the imports above have run
+        "open_members": seeded["members"][open_competition] + to_add + to_import + to_import_by_name + to_upload,
+        "participants": competitions * participants,
+    }
+
+
+class Sent(NamedTuple):
+    statements: int
+    expected: int
+    status: int
+    body: str
+
+
+async def _send_all(data: dict) -> list[Sent]:
+    sent = []
+    async with common.client() as http:
+        for case in CASES:
+            call = case.build(data)
+            with common.statements() as seen:
+                response = await http.request(case.method, call.url, json=call.json, data=call.data,
+                                              files=call.files, headers=call.headers)
+            sent.append(Sent(len(seen), call.status, response.status_code, response.text[:200]))
+    return sent
+
+
+@pytest.fixture(scope="module")
+def runs() -> dict[int, list[Sent]]:
+    from PollApp.ranking import ranking_engine
+    from PollApp.response_cache import response_cache
+
+    runs = {}
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(response_cache, "enabled", False)
+        for size in (SMALL, LARGE):
+            ranking_engine._competitions.clear()
+            runs[size] = asyncio.run(_send_all(_seed(size)))
+    return runs
+
+
+def test_every_route_has_a_case():
+    assert _uncovered() == []
+
+
+@pytest.mark.parametrize("index", range(len(CASES)), ids=[f"{case.method} {case.route}{case.note}" for case in CASES])
+def test_statement_count_does_not_grow_with_the_data(runs, index):
+    small, large = runs[SMALL][index], runs[LARGE][index]
+    for size, sent in ((SMALL, small), (LARGE, large)):
+        assert sent.status == sent.expected, f"at {size}: {sent.body}"
+    assert small.statements == large.statements, \
+        f"{small.statements} statements at {SMALL} participants, {large.statements} at {LARGE}"
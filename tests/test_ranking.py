@@ -0,0 +1,39 @@
+import asyncio
+
+from benchmarks import common
+
+
+def test_rankings_follow_a_replaced_score_of_the_same_value(monkeypatch):
+    from sqlmodel import SQLModel
+    from PollApp.database import engine
+    from PollApp.response_cache import response_cache
+
+    SQLModel.metadata.drop_all(engine)
+    a, b, c, d = common.seed(users=10, competitions=1, participants=4, scores=False)["members"][1]
+    monkeypatch.setattr(response_cache, "enabled", False)
+
+    async def score(http, judge, scored, value):
+        response = await http.post(f"/competitions/participant/score/create/1/{scored}",
+                                   json={"score": value, "feedback": "ok"}, headers=common.auth_headers(judge))
+        assert response.status_code == 201, response.text
+
+    async def means(http):
+        response = await http.get("/competitions/1/scores?method=mean")
+        assert response.status_code == 200, response.text
+        return {entry["id"]: entry["ranking_score"] for entry in response.json()}
+
+    async def run():
+        async with common.client() as http:
+            await score(http, a, b, 9)
+            await score(http, a, c, 1)
+            await score(http, d, b, 5)
+            before = await means(http)
+            # the same number of scores and the same sum, so the totals alone cannot tell
+            response = await http.delete(f"/competitions/participant/score/1/{b}", headers=common.auth_headers(d))
+            assert response.status_code == 204, response.text
+            await score(http, d, c, 5)
+            return before, await means(http)
+
+    before, after = asyncio.run(run())
+    assert (before[b], before[c]) == (7, 1)
+    assert (after[b], after[c]) == (9, 3)
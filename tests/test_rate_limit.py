@@ -0,0 +1,54 @@
+import logging
+
+from starlette.requests import Request
+
+from PollApp import rate_limit
+
+
+def _request(forwarded: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "method": "POST", "path": "/auth/token", "client": ("10.1.2.3", 4321),
+                    "headers": headers})
+
+
+def test_untrusted_forwarded_for_is_ignored_with_one_warning(monkeypatch, caplog):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUSTED_PROXIES", 0)
+    monkeypatch.setattr(rate_limit, "_warned_forwarded", False)
+
+    with caplog.at_level(logging.WARNING, logger=rate_limit.__name__):
+        assert rate_limit.client_ip(_request()) == "10.1.2.3"
+        assert not caplog.records
+        assert rate_limit.client_ip(_request("203.0.113.7")) == "10.1.2.3"
+        assert rate_limit.client_ip(_request("198.51.100.4")) == "10.1.2.3"
+    assert len(caplog.records) == 1
+    assert "RATE_LIMIT_TRUSTED_PROXIES" in caplog.records[0].getMessage()
+
+
+def test_trusted_proxy_reports_the_address_it_saw(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUSTED_PROXIES", 1)
+
+    assert rate_limit.client_ip(_request("198.51.100.4, 203.0.113.7")) == "203.0.113.7"
+    assert rate_limit.client_ip(_request()) == "10.1.2.3"
+
+
+def test_judge_scoring_one_at_a_time_is_not_limited(monkeypatch):
+    import asyncio
+
+    from sqlmodel import SQLModel
+    from benchmarks import common
+    from PollApp.database import engine
+
+    SQLModel.metadata.drop_all(engine)
+    judge, *participants = common.seed(users=130, competitions=1, participants=121, scores=False)["members"][1]
+    # twice what the scores policy allowed when single scores and ballots shared one bucket
+    limiter = rate_limit.RateLimiter(rate_limit.InMemoryRateLimitStore(100))
+    monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+
+    async def score_everyone():
+        async with common.client() as http:
+            return [(await http.post(f"/competitions/participant/score/create/1/{scored}",
+                                     json={"score": 5, "feedback": "ok"}, headers=common.auth_headers(judge))
+                     ).status_code for scored in participants]
+
+    assert set(asyncio.run(score_everyone())) == {201}
+    assert limiter.allowed == len(participants)
@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import text
+
+from PollApp.schema import SchemaOutOfDate, current_revisions, head_revisions, prepare_schema
+
+
+@pytest.fixture
+def empty_database():
+    from sqlmodel import SQLModel
+    from PollApp.database import create_db_and_tables, engine
+
+    def empty():
+        create_db_and_tables()  # registers every table, so drop_all drops them all
+        SQLModel.metadata.drop_all(engine)
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+    empty()
+    yield engine
+    empty()
+
+
+def test_create_stamps_an_empty_database(empty_database):
+    prepare_schema("create")
+    assert current_revisions() == head_revisions()
+    prepare_schema("create")  # a second worker, or the next boot
+    prepare_schema("check")
+
+
+def test_create_refuses_tables_without_a_revision(empty_database):
+    from PollApp.database import create_db_and_tables
+
+    create_db_and_tables()
+    with pytest.raises(SchemaOutOfDate, match="alembic stamp 0001 && alembic upgrade head"):
+        prepare_schema("create")
+
+
+def test_create_refuses_an_older_revision(empty_database):
+    prepare_schema("create")
+    with empty_database.begin() as connection:
+        connection.execute(text("UPDATE alembic_version SET version_num = '0002'"))
+    with pytest.raises(SchemaOutOfDate, match="alembic upgrade head"):
+        prepare_schema("create")